@@ -0,0 +1,149 @@
+import math
+import threading
+import time
+
+# Request header carrying how many milliseconds the client is willing to wait
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+
+
+class OverloadedError(Exception):
+    """Raised when a request is shed because the server is saturated"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passed before `stage` could start"""
+
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded before {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Point in time after which the client no longer wants the answer"""
+    __slots__ = ('expires_at',)
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, value, default_ms=0):
+        """Build a deadline from a header in milliseconds; None when neither is set"""
+        try:
+            milliseconds = float(value) if value else default_ms
+        except ValueError:
+            milliseconds = default_ms
+        return cls(milliseconds / 1000.0) if milliseconds > 0 else None
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+
+class AdmissionController:
+    """Bound how many requests run at once and how many may wait for a slot.
+
+    Up to `max_concurrency` requests run; up to `max_queue` more wait at most
+    `queue_timeout` seconds (or until their deadline) for a slot. Anything
+    beyond that is shed straight away with an OverloadedError carrying a
+    Retry-After estimate, so latency stays bounded instead of growing with
+    the backlog.
+    """
+
+    def __init__(self, max_concurrency, max_queue=64, queue_timeout=1.0):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout)
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._shed = 0
+        self._expired = 0
+        # Moving average of how long an admitted request holds its slot
+        self._service_time = 0.0
+
+    def admit(self, deadline=None):
+        """Wait for a slot; use as `with controller.admit(deadline):`"""
+        with self._lock:
+            if self._active >= self.max_concurrency and self._waiting >= self.max_queue:
+                self._shed += 1
+                raise OverloadedError("Server is overloaded", self._retry_after())
+            self._waiting += 1
+
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline.remaining()))
+        acquired = self._slots.acquire(timeout=timeout)
+
+        with self._lock:
+            self._waiting -= 1
+            if acquired and deadline is not None and deadline.expired():
+                self._slots.release()
+                acquired = False
+            if not acquired:
+                if deadline is not None and deadline.expired():
+                    self._expired += 1
+                    raise DeadlineExceeded('admission')
+                self._shed += 1
+                raise OverloadedError("Server is overloaded", self._retry_after())
+            self._active += 1
+            self._admitted += 1
+        return _Admission(self)
+
+    def record_expired(self):
+        """Count a request dropped for its deadline after it was admitted"""
+        with self._lock:
+            self._expired += 1
+
+    def stats(self):
+        """Return the limits, current occupancy and shed/expired counters"""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "active": self._active,
+                "waiting": self._waiting,
+                "admitted": self._admitted,
+                "shed": self._shed,
+                "expired": self._expired,
+                "service_time_ms": self._service_time * 1000,
+            }
+
+    def _retry_after(self):
+        """Seconds until the current backlog should have drained; caller holds the lock"""
+        backlog = self._active + self._waiting
+        return max(1, math.ceil(backlog * self._service_time / self.max_concurrency))
+
+    def _release(self, seconds):
+        with self._lock:
+            self._active -= 1
+            self._service_time = seconds if not self._service_time else 0.9 * self._service_time + 0.1 * seconds
+        self._slots.release()
+
+
+class _Admission:
+    """Slot held by one admitted request, released when the `with` block ends"""
+    __slots__ = ('controller', 'start')
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.controller._release(time.perf_counter() - self.start)
+        return False
@@ -0,0 +1,202 @@
+import asyncio
+import io
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP `scope` whose whole `body` was received"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        # The body is complete, so its real length replaces any chunked encoding
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """Run a WSGI app to completion and return its status code, headers and body"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        return chunks.append
+
+    chunks = []
+    result = wsgi_app(environ, start_response)
+    try:
+        chunks.extend(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], b''.join(chunks)
+
+
+class AsgiBridge:
+    """Serve a WSGI app over ASGI without holding a thread per connection.
+
+    The event loop receives the request body and writes the response; only
+    the call into `wsgi_app`, where decoding and inference happen, runs on a
+    pool of `threads` threads. Slow uploads and idle keep-alive connections
+    therefore cost a socket and a coroutine instead of a thread. At most
+    `max_pending` requests are handed to the pool at once, running or waiting
+    for a thread; more are answered 429 straight away. Bodies larger than
+    `max_body` bytes get a 413, and uploads that send nothing for
+    `body_timeout` seconds a 408. Requests for `inline_paths`, such as the
+    health probes, are answered on the event loop so a busy pool cannot
+    delay them.
+    """
+
+    def __init__(self, wsgi_app, threads, max_pending=None, max_body=32 * 1024 * 1024, body_timeout=30.0,
+                 inline_paths=()):
+        self.wsgi_app = wsgi_app
+        self.threads = max(1, int(threads))
+        self.max_pending = max(1, int(max_pending or self.threads))
+        self.max_body = int(max_body)
+        self.body_timeout = float(body_timeout)
+        self.inline_paths = frozenset(inline_paths)
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi-worker')
+        self._lock = threading.Lock()
+        self._receiving = 0
+        self._pending = 0
+        self._requests = 0
+        self._rejected = {"busy": 0, "too_large": 0, "body_timeout": 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            # WebSocket routes need the Flask server (flask-sock), refuse the handshake
+            await receive()
+            await send({'type': 'websocket.close', 'code': 1003})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        with self._lock:
+            self._requests += 1
+            self._receiving += 1
+        try:
+            body, error = await self._read_body(scope, receive)
+        finally:
+            with self._lock:
+                self._receiving -= 1
+        if error is not None:
+            await self._send_error(send, *error)
+            return
+        if body is None:
+            # The client went away while uploading, nobody is waiting for an answer
+            return
+
+        environ = wsgi_environ(scope, body)
+        if scope['path'] in self.inline_paths:
+            status, headers, content = call_wsgi(self.wsgi_app, environ)
+        else:
+            with self._lock:
+                busy = self._pending >= self.max_pending
+                if busy:
+                    self._rejected["busy"] += 1
+                else:
+                    self._pending += 1
+            if busy:
+                await self._send_error(send, 429, "Server is overloaded. Please try again later.",
+                                       [(b'retry-after', b'1')])
+                return
+            try:
+                status, headers, content = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, call_wsgi, self.wsgi_app, environ)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def _read_body(self, scope, receive):
+        """The request body, or None and the (status, message) to answer instead.
+
+        Both are None when the client disconnected before the body was complete.
+        """
+        for name, value in scope.get('headers', []):
+            if name == b'content-length' and value.isdigit() and int(value) > self.max_body:
+                self._count_rejection("too_large")
+                return None, (413, "Request body is too large")
+
+        chunks = []
+        size = 0
+        while True:
+            try:
+                message = await asyncio.wait_for(receive(), self.body_timeout)
+            except asyncio.TimeoutError:
+                self._count_rejection("body_timeout")
+                return None, (408, "Request body timed out")
+            if message['type'] == 'http.disconnect':
+                return None, None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                self._count_rejection("too_large")
+                return None, (413, "Request body is too large")
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks), None
+
+    def _count_rejection(self, reason):
+        with self._lock:
+            self._rejected[reason] += 1
+
+    @staticmethod
+    async def _send_error(send, status, message, headers=()):
+        body = json.dumps({"error": message}).encode()
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'), *headers]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def stats(self):
+        """Return the pool limits, requests in each phase and rejection counters"""
+        with self._lock:
+            return {
+                "threads": self.threads,
+                "max_pending": self.max_pending,
+                "receiving": self._receiving,
+                "pending": self._pending,
+                "requests": self._requests,
+                **{f"rejected_{reason}": count for reason, count in self._rejected.items()},
+            }
@@ -1,26 +1,53 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, send_from_directory
 from flask_cors import CORS
 import base64
+import json
 import numpy as np
 import cv2
-import tensorflow as tf
 import threading
 import time
 import os
 import logging
-from io import BytesIO
-from PIL import Image
-import mediapipe as mp
+import importlib.util
+from contextlib import contextmanager
 from datetime import datetime
+from batching import BatchScheduler, QueueFullError
+from sessions import SessionManager, SessionLimitError
+from hands_pool import HandsPool, process_image
+from inference import load_inference_backend, backend_for_model
+from cache import PerceptualCache, dhash
+from metrics import MetricsRegistry, PROMETHEUS_CONTENT_TYPE
+from debug_writer import DebugImageWriter
+from model_slot import ModelSlot, ServedModel
+from admission import AdmissionController, Deadline, DeadlineExceeded, OverloadedError, DEADLINE_HEADER
+from latest_frame import LatestFrameGate, FrameSuperseded
+from frame_diff import FrameChangeGate
+from hand_prefilter import HandPrefilter
+from preprocess import (DEFAULT_INPUT_FORMAT, InputBuffers, InputFormat, crop_into, letterbox_into_batch,
+                        normalize_into, resize_canvas, square_crop)
+from class_thresholds import read_class_thresholds
+from model_registry import NORMALIZATIONS, ModelLoadError, ModelRegistry, UnknownModelError
+from startup import StartupTracker
+from landmarks import FEATURE_SIZE, landmark_features, parse_landmark_container, parse_landmark_json
+# The model files, labels and hand detection settings live in recognition.py,
+# which the offline tools import without starting a server
+import recognition
+from recognition import (DETECTION_MAX_SIDE, HAND_PREFILTER_SIZE, HAND_PREFILTER_THRESHOLD, INFERENCE_BACKEND,
+                         INFERENCE_THREADS, LANDMARK_MODEL_PATH, MODEL_PATH, SMALL_MODEL_PATH, SMALL_MODEL_THRESHOLD,
+                         SMALL_MODEL_THRESHOLDS, create_static_hands, create_tracking_hands, labels, mediapipe_hands)
 
-# Configure logging
+# WebSocket support for the streaming endpoint is optional
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+# Configure logging: to stderr, and to LOG_FILE unless it is set to ''
+LOG_FILE = os.environ.get('LOG_FILE', 'sign_language_server.log')
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("sign_language_server.log"),
-        logging.StreamHandler()
-    ]
+    handlers=([logging.FileHandler(LOG_FILE)] if LOG_FILE else []) + [logging.StreamHandler()]
 )
 logger = logging.getLogger(__name__)
 
@@ -28,283 +55,1412 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Global variables
-model = None
-model_loaded = False
-model_loading = False
-labels = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 
-          'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z',
-          'space', 'del', 'nothing']
-
-# Set up MediaPipe hands
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-hands = mp_hands.Hands(
-    static_image_mode=True,
-    max_num_hands=1,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
+# The served model is swapped atomically on reload, see model_slot.py
+model_slot = ModelSlot()
+landmark_slot = ModelSlot()
+small_slot = ModelSlot()
+model_load_lock = threading.Lock()
+small_model_load_lock = threading.Lock()
+model_load_error = None
+
+# Traced (Keras) and optimized (ONNX) models are cached here so later starts
+# skip that work; entries are keyed by model checksum and runtime version ('' disables)
+MODEL_CACHE_DIR = os.environ.get('MODEL_CACHE_DIR', 'model_cache')
+
+# Micro-batching configuration: concurrent requests are coalesced into one
+# forward pass of up to BATCH_MAX_SIZE images, waiting at most BATCH_MAX_WAIT_MS
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 16))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+BATCH_MAX_QUEUE = int(os.environ.get('BATCH_MAX_QUEUE', 256))
+
+# Prediction cache keyed by a perceptual hash of the hand crop, so frames of a
+# held sign reuse the previous prediction (PHASH_CACHE_SIZE=0 disables it).
+# Entries are kept per client session and requests without a session id skip
+# the cache, so one user's frames never answer another's. PHASH_MAX_DISTANCE
+# defaults to 0, an exact match of the 64-bit hash: fist signs such as A, E, M,
+# N, S and T differ by a few hash bits, so a wider tolerance can return the
+# previous sign's prediction while a user moves between them
+PHASH_CACHE_SIZE = int(os.environ.get('PHASH_CACHE_SIZE', 1024))
+PHASH_MAX_DISTANCE = int(os.environ.get('PHASH_MAX_DISTANCE', 0))
+PHASH_TTL = float(os.environ.get('PHASH_TTL', 2))
+
+# Debug captures are written by a background thread into a bounded directory
+DEBUG_IMAGE_DIR = os.environ.get('DEBUG_IMAGE_DIR', 'debug_images')
+DEBUG_QUEUE_SIZE = int(os.environ.get('DEBUG_QUEUE_SIZE', 32))
+DEBUG_MAX_MB = float(os.environ.get('DEBUG_MAX_MB', 200))
+DEBUG_MAX_AGE_HOURS = float(os.environ.get('DEBUG_MAX_AGE_HOURS', 24))
+
+# Content types accepted as a raw image request body by /detect-sign
+BINARY_IMAGE_TYPES = ('image/jpeg', 'image/webp', 'image/png', 'application/octet-stream')
+
+# /detect-sign/batch: binary container of length-prefixed images and the
+# largest number of images accepted in one request
+BATCH_CONTAINER_TYPE = 'application/x-image-batch'
+BATCH_MAX_IMAGES = int(os.environ.get('BATCH_MAX_IMAGES', 64))
+
+# Streaming sessions: each one keeps its own MediaPipe tracker alive
+STREAM_MAX_SESSIONS = int(os.environ.get('STREAM_MAX_SESSIONS', 32))
+STREAM_IDLE_TIMEOUT = float(os.environ.get('STREAM_IDLE_TIMEOUT', 30))
+
+# Number of MediaPipe detectors shared by request threads (defaults to the CPU count)
+HANDS_POOL_SIZE = int(os.environ.get('HANDS_POOL_SIZE', os.cpu_count() or 1))
+
+# Admission control for /detect-sign: at most ADMISSION_MAX_CONCURRENCY requests
+# run at once and ADMISSION_MAX_QUEUE more wait up to ADMISSION_QUEUE_TIMEOUT_MS
+# for a slot, the rest are answered 429. Clients can send their own deadline in
+# the X-Request-Deadline-Ms header; DEFAULT_DEADLINE_MS applies otherwise (0: none)
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get('ADMISSION_MAX_CONCURRENCY', HANDS_POOL_SIZE * 2))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 64))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', 1000))
+DEFAULT_DEADLINE_MS = float(os.environ.get('DEFAULT_DEADLINE_MS', 0))
+
+# Requests carrying a session id (X-Session-Id header or session_id field) run
+# one at a time per session and only the newest waiting frame is kept
+SESSION_HEADER = 'X-Session-Id'
+LATEST_FRAME_MAX_SESSIONS = int(os.environ.get('LATEST_FRAME_MAX_SESSIONS', 1024))
+LATEST_FRAME_IDLE_TIMEOUT = float(os.environ.get('LATEST_FRAME_IDLE_TIMEOUT', 60))
+
+# Frame-difference gating for session frames (X-Session-Id or the stream): when
+# less than FRAME_DIFF_THRESHOLD of a FRAME_DIFF_SIZE pixels wide grayscale
+# thumbnail changed by more than FRAME_DIFF_PIXEL_DELTA levels since the
+# session's last processed frame, its previous result is returned (0: off)
+FRAME_DIFF_THRESHOLD = float(os.environ.get('FRAME_DIFF_THRESHOLD', 0.001))
+FRAME_DIFF_PIXEL_DELTA = int(os.environ.get('FRAME_DIFF_PIXEL_DELTA', 16))
+FRAME_DIFF_SIZE = int(os.environ.get('FRAME_DIFF_SIZE', 64))
+
+# Binary /detect-sign/landmarks bodies hold 21 x 3 little-endian float32 values per hand
+LANDMARK_CONTAINER_TYPE = 'application/x-hand-landmarks'
+LANDMARK_MAX_HANDS = int(os.environ.get('LANDMARK_MAX_HANDS', 256))
+
+# Landmark-first cascade: while a landmark model is loaded, hands it classifies
+# with at least CASCADE_LANDMARK_THRESHOLD confidence are answered without the
+# CNN (CASCADE=0 always runs the CNN); evaluate_cascade.py helps pick the threshold
+CASCADE = os.environ.get('CASCADE', '1') == '1'
+CASCADE_LANDMARK_THRESHOLD = float(os.environ.get('CASCADE_LANDMARK_THRESHOLD', 0.9))
+
+# Sign languages: MODEL_PATH serves DEFAULT_LANGUAGE, the models listed in the
+# MODEL_REGISTRY manifest (English, Sinhala and Tamil by default) are loaded on
+# first use and the least recently used ones are unloaded once their estimated
+# memory exceeds MODEL_MEMORY_BUDGET_MB. Requests choose with the `language`
+# and optional `model_version` parameters. A relative MODEL_REGISTRY is
+# resolved against this directory, and the manifest's paths against the manifest
+DEFAULT_LANGUAGE = os.environ.get('DEFAULT_LANGUAGE', 'en').lower()
+MODEL_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   os.environ.get('MODEL_REGISTRY', 'models.json'))
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get('MODEL_MEMORY_BUDGET_MB', 512))
+# A registry model that failed to load answers 503 with its error and is
+# retried after MODEL_RETRY_BACKOFF seconds, doubling up to MODEL_RETRY_MAX_BACKOFF
+MODEL_RETRY_BACKOFF = float(os.environ.get('MODEL_RETRY_BACKOFF', 30))
+MODEL_RETRY_MAX_BACKOFF = float(os.environ.get('MODEL_RETRY_MAX_BACKOFF', 600))
+
+# /reload-model may roll out another model file only from RELOAD_MODEL_DIR
+# (names are resolved inside it); without it, or for any path outside it,
+# a client-supplied model_path is answered 400
+RELOAD_MODEL_DIR = os.environ.get('RELOAD_MODEL_DIR', '')
+
+# Pre-forked serving, see gunicorn.conf.py: the parent process loads the model
+# with prefork_load_model() instead of a background thread at import time
+PREFORK = os.environ.get('PREFORK', '0') == '1'
+
+# Pre-forked workers probe their model every WORKER_WATCHDOG_INTERVAL seconds
+# and exit, to be restarted, after WORKER_WATCHDOG_FAILURES failed probes
+WORKER_WATCHDOG_INTERVAL = float(os.environ.get('WORKER_WATCHDOG_INTERVAL', 10))
+WORKER_WATCHDOG_TIMEOUT = float(os.environ.get('WORKER_WATCHDOG_TIMEOUT', 30))
+WORKER_WATCHDOG_FAILURES = int(os.environ.get('WORKER_WATCHDOG_FAILURES', 3))
+
+# Startup: the port is bound as soon as this module is imported. MediaPipe
+# (which takes seconds to import) and the model are loaded by background
+# threads, and /ready answers 200 once both can serve
+startup = StartupTracker(required=('model', 'hand_detector'))
+
+# Per-stage latency histograms and outcome counters, exported on /metrics
+metrics = MetricsRegistry('translator')
+metrics.describe('hand_detection_total', "Images by hand detection outcome")
+metrics.describe('low_confidence_total', "Predictions below the confidence threshold")
+metrics.describe('model_loading_rejections_total', "Requests answered 503 while the model was loading")
+metrics.describe('model_load_failure_rejections_total', "Requests answered 503 because their model failed to load")
+metrics.describe('requests_total', "Detection requests by endpoint and HTTP status")
+metrics.describe('requests_shed_total', "Requests answered 429 because the server was saturated")
+metrics.describe('requests_expired_total', "Requests dropped because their deadline passed, by stage")
+metrics.describe('frames_superseded_total', "Session frames skipped because a newer frame arrived")
+metrics.describe('frames_unchanged_total', "Session frames answered with the previous result because they barely changed")
+metrics.describe('cascade_total', "Detected hands by the classifier that answered (landmark, small, cnn or cache)")
+metrics.describe('small_model_escalations_total', "Crops the small model was not confident about, passed to the full model")
+
+debug_writer = DebugImageWriter(
+    directory=DEBUG_IMAGE_DIR,
+    max_queue=DEBUG_QUEUE_SIZE,
+    max_bytes=DEBUG_MAX_MB * 1024 * 1024,
+    max_age=DEBUG_MAX_AGE_HOURS * 3600
+)
+
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENCY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000.0
+)
+
+frame_gate = LatestFrameGate(
+    max_sessions=LATEST_FRAME_MAX_SESSIONS,
+    idle_timeout=LATEST_FRAME_IDLE_TIMEOUT
+)
+
+frame_changes = FrameChangeGate(
+    threshold=FRAME_DIFF_THRESHOLD,
+    pixel_delta=FRAME_DIFF_PIXEL_DELTA,
+    size=FRAME_DIFF_SIZE,
+    max_sessions=max(LATEST_FRAME_MAX_SESSIONS, STREAM_MAX_SESSIONS),
+    idle_timeout=max(LATEST_FRAME_IDLE_TIMEOUT, STREAM_IDLE_TIMEOUT)
+)
+
+# Per-thread preprocessing buffers, so requests do not allocate model inputs;
+# models with other input sizes get their own, see input_buffers_for()
+input_buffers = InputBuffers(224)
+sized_input_buffers = {224: input_buffers}
+
+prediction_cache = PerceptualCache(
+    max_entries=PHASH_CACHE_SIZE,
+    max_distance=PHASH_MAX_DISTANCE,
+    ttl=PHASH_TTL
+)
+
+hand_prefilter = HandPrefilter(threshold=HAND_PREFILTER_THRESHOLD, size=HAND_PREFILTER_SIZE)
+
+# MediaPipe graphs are not safe for concurrent process() calls, so request
+# threads check a detector out of a pool sized to the number of CPU cores
+hands_pool = HandsPool(create_static_hands, size=HANDS_POOL_SIZE)
+
+# Stats of the server running the app, by component name; backend_asgi.py adds its own
+server_stats = {}
+
+stream_sessions = SessionManager(
+    create_tracking_hands,
+    max_sessions=STREAM_MAX_SESSIONS,
+    idle_timeout=STREAM_IDLE_TIMEOUT
 )
 
-def load_model_async():
-    """Load the TensorFlow model in a separate thread"""
-    global model, model_loaded, model_loading
+def create_batch_scheduler(backend):
+    """Route predictions of `backend` through a new batching scheduler"""
+    return BatchScheduler(
+        backend.predict,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        max_queue_size=BATCH_MAX_QUEUE
+    )
+
+def load_model_async(model_path=None):
+    """Load the sign language model in a separate thread.
     
-    if model_loading:
-        logger.info("Model is already loading...")
-        return
+    The new model is loaded and warmed up while the current one keeps
+    serving, then swapped in atomically. Callers must hold model_load_lock,
+    see start_model_load().
+    """
+    global model_load_error
     
-    model_loading = True
-    logger.info("Loading sign language detection model...")
+    logger.info(f"Loading sign language detection model {model_path or MODEL_PATH}...")
     
     try:
-        # Load the model - replace with path to your H5 model
-        model_path = 'sign_language_model.h5'
+        # MODEL_PATH is served by the configured inference backend, a file rolled
+        # out with /reload-model by the backend for its extension
+        kind = backend_for_model(model_path) if model_path else INFERENCE_BACKEND
+        model_path = model_path or MODEL_PATH
         
         # Check if model file exists
         if not os.path.exists(model_path):
-            logger.error(f"Error: Model file '{model_path}' not found.")
-            model_loading = False
-            return
+            raise FileNotFoundError(f"Model file '{model_path}' not found.")
         
-        # Load the model
-        model = tf.keras.models.load_model(model_path)
+        start = time.perf_counter()
+        backend = load_inference_backend(kind, model_path, num_threads=INFERENCE_THREADS, cache_dir=MODEL_CACHE_DIR)
         
         # Warm up the model with a dummy prediction
         dummy_input = np.zeros((1, 224, 224, 3), dtype=np.float32)
-        model.predict(dummy_input)
+        backend.predict(dummy_input)
+        
+        # Each model gets its own batching scheduler so that batches never mix models
+        served = ServedModel(backend, create_batch_scheduler(backend), model_path, time.perf_counter() - start,
+                             labels=labels, language=DEFAULT_LANGUAGE, input_format=DEFAULT_INPUT_FORMAT)
+        
+        model_slot.swap(served)
+        
+        # Cached predictions belong to the previous model
+        prediction_cache.clear()
         
-        model_loaded = True
-        logger.info("Sign language detection model loaded successfully!")
+        model_load_error = None
+        startup.mark('model')
+        logger.info(f"Sign language detection model loaded successfully! "
+                    f"(version {served.version}, {served.load_seconds:.2f} s"
+                    f"{', cached artifact' if backend.cache_hit else ''})")
     except Exception as e:
         logger.error(f"Error loading model: {str(e)}")
-        model_loaded = False
+        model_load_error = str(e)
+        startup.fail('model', e)
     finally:
-        model_loading = False
+        model_load_lock.release()
 
-# Start loading the model in a background thread when server starts
-threading.Thread(target=load_model_async).start()
+def start_model_load(model_path=None):
+    """Load a model in the background unless a load is already running"""
+    if not model_load_lock.acquire(blocking=False):
+        logger.info("Model is already loading...")
+        return False
+    threading.Thread(target=load_model_async, args=(model_path,), name="model-loader").start()
+    return True
 
-def detect_and_crop_hand(image):
-    """Detect and crop the hand region using MediaPipe"""
-    # Convert BGR image to RGB
-    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    image_height, image_width, _ = rgb_image.shape
+def load_registry_model(spec):
+    """Load and warm the model of another language for the registry"""
+    start = time.perf_counter()
+    backend = load_inference_backend(spec.backend or backend_for_model(spec.model_path), spec.model_path,
+                                     num_threads=INFERENCE_THREADS, cache_dir=MODEL_CACHE_DIR)
+    input_shape = tuple(backend.input_shape)
+    if len(input_shape) != 3 or input_shape[0] != input_shape[1] or input_shape[2] != 3:
+        raise ValueError(f"expected a square 3-channel image input, got {input_shape}")
     
-    # Process the image and find hands
-    results = hands.process(rgb_image)
+    classes = backend.predict(np.zeros((1, *input_shape), dtype=np.float32)).shape[-1]
+    if classes != len(spec.labels):
+        raise ValueError(f"model predicts {classes} classes, but {len(spec.labels)} labels are listed")
     
-    if results.multi_hand_landmarks:
-        # Get the first detected hand
-        hand_landmarks = results.multi_hand_landmarks[0]
-        
-        # Find bounding box coordinates
-        x_min, y_min = image_width, image_height
-        x_max, y_max = 0, 0
-        
-        for landmark in hand_landmarks.landmark:
-            x, y = int(landmark.x * image_width), int(landmark.y * image_height)
-            x_min = min(x_min, x)
-            y_min = min(y_min, y)
-            x_max = max(x_max, x)
-            y_max = max(y_max, y)
-        
-        # Add padding
-        padding = int(max(image_width, image_height) * 0.1)
-        x_min = max(0, x_min - padding)
-        y_min = max(0, y_min - padding)
-        x_max = min(image_width, x_max + padding)
-        y_max = min(image_height, y_max + padding)
-        
-        # Crop the hand region
-        hand_region = image[y_min:y_max, x_min:x_max]
-        
-        # Make it square by finding the max dimension
-        width, height = x_max - x_min, y_max - y_min
-        max_dim = max(width, height)
-        
-        # Create a square black background
-        square_hand = np.zeros((max_dim, max_dim, 3), dtype=np.uint8)
+    scale, offset = NORMALIZATIONS[spec.normalization]
+    input_format = InputFormat(input_shape[0], rgb=spec.rgb, scale=scale, offset=offset, fit=spec.fit)
+    return ServedModel(backend, create_batch_scheduler(backend), spec.model_path, time.perf_counter() - start,
+                       labels=spec.labels, language=spec.language, input_format=input_format)
+
+model_registry = ModelRegistry(load_registry_model, memory_budget=MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+                               retry_backoff=MODEL_RETRY_BACKOFF, max_backoff=MODEL_RETRY_MAX_BACKOFF)
+if os.path.exists(MODEL_REGISTRY_PATH):
+    try:
+        model_registry.load_manifest(MODEL_REGISTRY_PATH)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read the model registry {MODEL_REGISTRY_PATH}: {str(e)}")
+
+def load_landmark_model():
+    """Load and warm the landmark classifier, if its model file exists"""
+    if not os.path.exists(LANDMARK_MODEL_PATH):
+        logger.info(f"No landmark model at '{LANDMARK_MODEL_PATH}', /detect-sign/landmarks is disabled")
+        return
+    
+    try:
+        start = time.perf_counter()
+        backend = load_inference_backend(backend_for_model(LANDMARK_MODEL_PATH), LANDMARK_MODEL_PATH,
+                                         num_threads=INFERENCE_THREADS, cache_dir=MODEL_CACHE_DIR)
+        if tuple(backend.input_shape) != (FEATURE_SIZE,):
+            raise ValueError(f"expected an input of {FEATURE_SIZE} features, got {backend.input_shape}")
+        classes = backend.predict(np.zeros((1, FEATURE_SIZE), dtype=np.float32)).shape[-1]
+        if classes != len(labels):
+            raise ValueError(f"model predicts {classes} classes, expected {len(labels)}")
         
-        # Place the hand region in the center of the square
-        offset_x = (max_dim - width) // 2
-        offset_y = (max_dim - height) // 2
-        square_hand[offset_y:offset_y+height, offset_x:offset_x+width] = hand_region
+        served = ServedModel(backend, create_batch_scheduler(backend), LANDMARK_MODEL_PATH, time.perf_counter() - start)
+        landmark_slot.swap(served)
+        logger.info(f"Landmark model loaded (version {served.version}, {served.load_seconds:.2f} s)")
+    except Exception as e:
+        logger.error(f"Error loading landmark model: {str(e)}")
+
+def start_landmark_model_load():
+    threading.Thread(target=load_landmark_model, name="landmark-model-loader", daemon=True).start()
+
+def load_small_model(model_path=None):
+    """Load and warm the small first-tier CNN and its class thresholds, if the model file exists.
+    
+    Like load_model_async() the new model is swapped in while the current
+    one keeps serving. Callers must hold small_model_load_lock, see
+    start_small_model_load().
+    """
+    model_path = model_path or SMALL_MODEL_PATH
+    try:
+        if not os.path.exists(model_path):
+            logger.info(f"No small model at '{model_path}', every hand goes to the full model")
+            return
         
-        # Create a debug image with landmarks drawn on it
-        debug_image = rgb_image.copy()
-        mp_drawing.draw_landmarks(debug_image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+        start = time.perf_counter()
+        backend = load_inference_backend(backend_for_model(model_path), model_path,
+                                         num_threads=INFERENCE_THREADS, cache_dir=MODEL_CACHE_DIR)
+        input_shape = tuple(backend.input_shape)
+        if len(input_shape) != 3 or input_shape[0] != input_shape[1] or input_shape[2] != 3:
+            raise ValueError(f"expected a square 3-channel image input, got {input_shape}")
+        if input_shape[0] > DEFAULT_INPUT_FORMAT.size:
+            raise ValueError(f"input size {input_shape[0]} is larger than the full model's {DEFAULT_INPUT_FORMAT.size}")
+        classes = backend.predict(np.zeros((1, *input_shape), dtype=np.float32)).shape[-1]
+        if classes != len(labels):
+            raise ValueError(f"model predicts {classes} classes, expected {len(labels)}")
         
-        # Draw bounding box
-        cv2.rectangle(debug_image, (x_min, y_min), (x_max, y_max), (0, 255, 0), 2)
+        served = ServedModel(backend, create_batch_scheduler(backend), model_path, time.perf_counter() - start,
+                             labels=labels, language=DEFAULT_LANGUAGE, input_format=InputFormat(input_shape[0]))
+        served.thresholds = small_model_thresholds(served.version)
+        small_slot.swap(served)
         
-        return square_hand, True, debug_image
+        # Cached predictions may have been answered by the previous small model
+        prediction_cache.clear()
+        logger.info(f"Small model loaded (version {served.version}, {input_shape[0]}x{input_shape[0]}, "
+                    f"{served.load_seconds:.2f} s)")
+    except Exception as e:
+        logger.error(f"Error loading small model: {str(e)}")
+    finally:
+        small_model_load_lock.release()
+
+def small_model_thresholds(version):
+    """Per-class thresholds of the small model, from SMALL_MODEL_THRESHOLDS when it exists"""
+    if not os.path.exists(SMALL_MODEL_THRESHOLDS):
+        return np.full(len(labels), SMALL_MODEL_THRESHOLD, dtype=np.float32)
+    
+    thresholds, data = read_class_thresholds(SMALL_MODEL_THRESHOLDS, labels, SMALL_MODEL_THRESHOLD)
+    if data.get('model_version') not in (None, version):
+        logger.warning(f"{SMALL_MODEL_THRESHOLDS} was calibrated for small model version {data['model_version']}, "
+                       f"not {version}; run calibrate_small_model.py again")
+    logger.info(f"Small model thresholds from {SMALL_MODEL_THRESHOLDS}, "
+                f"{int(np.isinf(thresholds).sum())} classes always go to the full model")
+    return thresholds
+
+def start_small_model_load(model_path=None):
+    """Load the small model in the background unless a load is already running"""
+    if not small_model_load_lock.acquire(blocking=False):
+        logger.info("Small model is already loading...")
+        return False
+    threading.Thread(target=load_small_model, args=(model_path,), name="small-model-loader", daemon=True).start()
+    return True
+
+def warm_hand_detector():
+    """Import MediaPipe and run one pooled detector so the first request skips both"""
+    with hands_pool.checkout() as detector:
+        process_image(detector, np.zeros((DETECTION_MAX_SIDE or 480, DETECTION_MAX_SIDE or 480, 3), dtype=np.uint8))
+
+def prefork_load_model():
+    """Load and warm the model in the parent process before workers are forked.
+    
+    Workers then share the weights copy-on-write instead of each loading its
+    own copy. TensorFlow is not fork-safe once it has run a graph, so for the
+    Keras backend only the TensorFlow import is shared and every worker loads
+    the model itself in after_fork(). ONNX and TFLite sessions are only
+    shared when they run on one thread (INFERENCE_THREADS=1), since their
+    thread pools do not survive the fork either. MediaPipe is imported here
+    too so the workers share its modules, but its graphs are only created
+    after the fork.
+    """
+    mediapipe_hands()
+    if INFERENCE_BACKEND == 'keras':
+        import tensorflow
+        logger.info(f"Pre-imported TensorFlow {tensorflow.__version__}, workers load the model after fork")
+        return
+    if INFERENCE_THREADS != 1:
+        logger.warning(f"INFERENCE_THREADS is {INFERENCE_THREADS or 'unset'}, not 1: multi-threaded sessions "
+                       f"are not fork-safe, so every worker loads its own copy of the model after fork")
+        return
     
-    return image, False, image
+    model_load_lock.acquire()
+    load_model_async()
+    # Keras landmark models are loaded by the workers, like the Keras backend
+    if not LANDMARK_MODEL_PATH.endswith(('.h5', '.keras')):
+        load_landmark_model()
+    if not SMALL_MODEL_PATH.endswith(('.h5', '.keras')):
+        small_model_load_lock.acquire()
+        load_small_model()
+    
+    for served in (model_slot.current, landmark_slot.current, small_slot.current):
+        if served is not None:
+            # Threads do not survive fork(), each worker starts its own scheduler
+            served.scheduler.close()
 
-def preprocess_image(image):
-    """Preprocess the image for the model"""
-    # Resize image to the input size expected by the model
-    image = cv2.resize(image, (224, 224))
+def after_fork():
+    """Re-create the per-process state of a pre-forked worker"""
+    served = model_slot.current
+    if served is None:
+        start_model_load()
+    else:
+        served.scheduler = create_batch_scheduler(served.backend)
+    
+    served = landmark_slot.current
+    if served is None:
+        start_landmark_model_load()
+    else:
+        served.scheduler = create_batch_scheduler(served.backend)
     
-    # Convert to RGB if needed
-    if len(image.shape) == 2:
-        image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-    elif image.shape[2] == 4:
-        image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+    served = small_slot.current
+    if served is None:
+        start_small_model_load()
+    else:
+        served.scheduler = create_batch_scheduler(served.backend)
+    startup.run_in_background('hand_detector', warm_hand_detector)
     
-    # Normalize pixel values to [0, 1]
-    image = image.astype(np.float32) / 255.0
+    if WORKER_WATCHDOG_INTERVAL > 0:
+        threading.Thread(target=watch_worker_health, name="worker-watchdog", daemon=True).start()
+
+def watch_worker_health():
+    """Exit the worker when its model stops answering so the supervisor restarts it"""
+    probe = np.zeros((1, 224, 224, 3), dtype=np.float32)
+    failures = 0
+    while True:
+        time.sleep(WORKER_WATCHDOG_INTERVAL)
+        with model_slot.acquire() as served:
+            if served is None:
+                continue
+            try:
+                served.predict(probe, timeout=WORKER_WATCHDOG_TIMEOUT)
+                failures = 0
+            except QueueFullError:
+                # A saturated worker is busy, not broken
+                continue
+            except Exception as e:
+                failures += 1
+                logger.error(f"Worker health probe failed ({failures}/{WORKER_WATCHDOG_FAILURES}): {str(e)}")
+        
+        if failures >= WORKER_WATCHDOG_FAILURES:
+            logger.critical(f"Worker {os.getpid()} is unhealthy, exiting to be restarted")
+            os._exit(1)
+
+# Start loading the model and MediaPipe in parallel background threads when server starts
+if not PREFORK:
+    start_model_load()
+    start_landmark_model_load()
+    start_small_model_load()
+    startup.run_in_background('hand_detector', warm_hand_detector)
+
+def detect_and_crop_hand(image, detector=None, debug=False, max_side=None, prefilter=True):
+    """Detect and crop the hand region using MediaPipe, see recognition.detect_and_crop_hand().
     
-    # Expand dimensions to create batch of size 1
-    return np.expand_dims(image, axis=0)
+    `detector` is a MediaPipe Hands instance owned by the caller, such as a
+    streaming session's tracker; otherwise one is checked out of the pool.
+    Frames the hand pre-filter rejects skip MediaPipe unless `prefilter` is
+    False. Stages are timed in the request metrics.
+    """
+    return recognition.detect_and_crop_hand(image, detector, pool=hands_pool, debug=debug, max_side=max_side,
+                                            prefilter=hand_prefilter if prefilter else None, timer=metrics.time)
 
 def save_debug_image(image, prefix="debug"):
-    """Save debug image to disk for troubleshooting"""
-    debug_dir = "debug_images"
-    if not os.path.exists(debug_dir):
-        os.makedirs(debug_dir)
+    """Queue a debug image to be saved to disk for troubleshooting.
+    
+    Returns the path the image will be written to, or None when the writer
+    is backed up and the image was dropped.
+    """
+    return debug_writer.submit(image, prefix)
+
+def request_json():
+    """The request's JSON body when it is an object, otherwise an empty dict.
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    filename = f"{debug_dir}/{prefix}_{timestamp}.jpg"
-    cv2.imwrite(filename, image)
-    logger.info(f"Saved debug image: {filename}")
-    return filename
+    Lists, scalars and malformed JSON carry no fields, so they are treated
+    like a missing body rather than failing on `.get()`.
+    """
+    body = request.get_json(silent=True)
+    return body if isinstance(body, dict) else {}
+
+def parse_flag(value):
+    """Interpret a boolean option coming from JSON, a query string or a form field"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def request_session_id():
+    """Client session id from the X-Session-Id header or a session_id field.
+    
+    The query string, form fields and JSON body are checked in that order; a
+    raw image body is never read here.
+    """
+    session_id = request.headers.get(SESSION_HEADER) or request.args.get('session_id')
+    if not session_id:
+        if request.mimetype == 'multipart/form-data':
+            session_id = request.form.get('session_id')
+        elif request.is_json:
+            session_id = request_json().get('session_id')
+    return str(session_id) if session_id else None
+
+def request_model_key():
+    """The sign language and model version a request asks for.
+    
+    Both default to None (the default language and its current model). The
+    query string, form fields and JSON body are checked in that order, as
+    for the session id; a raw image body is never read here.
+    """
+    options = request.args
+    if 'language' not in options and 'model_version' not in options:
+        if request.mimetype == 'multipart/form-data':
+            options = request.form
+        elif request.is_json:
+            options = request_json()
+    language, version = options.get('language'), options.get('model_version')
+    return (str(language).lower() if language else None), (str(version) if version else None)
+
+def serves_default_model(language, version):
+    """Whether `language` and `version` name the model loaded from MODEL_PATH"""
+    if language not in (None, DEFAULT_LANGUAGE):
+        return False
+    served = model_slot.current
+    return version is None or (served is not None and version == served.version)
+
+def resolve_model_key():
+    """The request's language and model version; raises UnknownModelError for unknown ones.
+    
+    Requests for the model loaded from MODEL_PATH get (DEFAULT_LANGUAGE, None),
+    so acquire_model() keeps them on model_slot even when a reload changes
+    its version in between.
+    """
+    language, version = request_model_key()
+    language = language or DEFAULT_LANGUAGE
+    if serves_default_model(language, version):
+        return DEFAULT_LANGUAGE, None
+    model_registry.resolve(language, version)
+    return language, version
+
+def is_default_model_key(language, version):
+    """Whether a key from resolve_model_key() is served by model_slot"""
+    return language in (None, DEFAULT_LANGUAGE) and version is None
+
+def supported_languages():
+    return sorted({DEFAULT_LANGUAGE, *model_registry.languages()})
+
+def unknown_model_response(error):
+    return {"error": str(error), "languages": supported_languages()}, 400
+
+def failed_model_response(error):
+    metrics.inc('model_load_failure_rejections_total')
+    return {"error": str(error)}, 503
+
+@contextmanager
+def acquire_model(language=None, version=None):
+    """Pin the model serving `language` and `version` for the body of a `with` block.
+    
+    Takes a key from resolve_model_key(): the default model is served by
+    model_slot, every other one by the model registry. Yields None while the
+    model is loading, after starting the load if it was not running yet.
+    """
+    if is_default_model_key(language, version):
+        with model_slot.acquire() as served:
+            if served is None:
+                # Try to load the model if it's not loading already
+                start_model_load()
+            yield served
+        return
+    
+    with model_registry.acquire(language, version) as served:
+        yield served
+
+def input_buffers_for(size):
+    """This thread's preprocessing buffers for models with `size` x `size` inputs"""
+    buffers = sized_input_buffers.get(size)
+    if buffers is None:
+        buffers = sized_input_buffers.setdefault(size, InputBuffers(size))
+    return buffers
+
+def read_request_image():
+    """Extract the encoded image bytes and the request options.
+    
+    Three upload modes are supported:
+    - a raw image body (image/jpeg, image/webp, image/png or
+      application/octet-stream), with options in the query string
+    - multipart/form-data with the image in the `image` file field
+      and options in the other form fields
+    - JSON with a base64 `image` field, optionally with a data URL prefix
+    """
+    if request.mimetype in BINARY_IMAGE_TYPES:
+        return request.get_data(cache=False), request.args
+    
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        return (upload.read() if upload else None), request.form
+    
+    data = request_json()
+    base64_data = data.get('image')
+    if not base64_data:
+        return None, data
+    
+    # Sometimes the base64 string comes with a data URL prefix, remove it if present
+    if ',' in base64_data:
+        base64_data = base64_data.split(',')[1]
+    
+    with metrics.time('base64_decode'):
+        return base64.b64decode(base64_data), data
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Simple health check endpoint"""
+    """Liveness probe: answers as soon as the port is bound, even while loading"""
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once the model and a hand detector can serve, 503 before"""
+    stats = startup.stats()
+    return jsonify(stats), 200 if stats["ready"] else 503
+
 @app.route('/model-status', methods=['GET'])
 def model_status():
     """Check if the model is loaded"""
+    served = model_slot.current
     return jsonify({
-        "loaded": model_loaded,
-        "loading": model_loading,
-        "model_name": "sign_language_model.h5" if model_loaded else None
+        "loaded": served is not None,
+        "loading": model_load_lock.locked(),
+        "model_name": os.path.basename(served.model_path) if served is not None else None,
+        "backend": served.backend.name if served is not None else INFERENCE_BACKEND,
+        "model": model_slot.stats(),
+        "landmark_model": landmark_slot.stats(),
+        "small_model": small_slot.stats(),
+        "default_language": DEFAULT_LANGUAGE,
+        "registry": model_registry.stats(),
+        "cascade": cascade_stats(),
+        "last_load_error": model_load_error,
+        "batching": served.scheduler.stats() if served is not None else None,
+        "streaming": stream_sessions.stats(),
+        "hands_pool": hands_pool.stats(),
+        "cache": prediction_cache.stats(),
+        "debug_writer": debug_writer.stats(),
+        "admission": admission.stats(),
+        "latest_frame": frame_gate.stats(),
+        "frame_diff": frame_changes.stats(),
+        "hand_prefilter": hand_prefilter.stats(),
+        **{name: stats() for name, stats in server_stats.items()},
+        "startup": startup.stats(),
+        "stages": metrics.stage_summary()
     })
 
+def resolve_reload_path(model_path):
+    """Absolute path of a model file requested on /reload-model, None unless it is inside RELOAD_MODEL_DIR"""
+    if not RELOAD_MODEL_DIR or not isinstance(model_path, str) or not model_path:
+        return None
+    model_dir = os.path.realpath(RELOAD_MODEL_DIR)
+    # realpath() follows symlinks and '..', so nothing can point out of the directory
+    resolved = os.path.realpath(os.path.join(model_dir, model_path))
+    if resolved == model_dir or os.path.commonpath([model_dir, resolved]) != model_dir:
+        return None
+    return resolved
+
 @app.route('/reload-model', methods=['POST'])
 def reload_model():
-    """Force reload the model"""
-    global model_loaded
-    model_loaded = False
-    threading.Thread(target=load_model_async).start()
+    """Reload the model in the background while the current one keeps serving.
+    
+    An optional JSON `model_path` rolls out a different model file from
+    RELOAD_MODEL_DIR, and `"tier": "small"` reloads the small first-tier
+    model and its thresholds.
+    """
+    data = request_json()
+    model_path = None
+    if data.get('model_path') is not None:
+        model_path = resolve_reload_path(data['model_path'])
+        if model_path is None:
+            logger.warning(f"Rejected reload of model file '{data['model_path']}' outside RELOAD_MODEL_DIR")
+            return jsonify({"error": "model_path must name a file in the server's model directory"}), 400
+        try:
+            backend_for_model(model_path)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    if data.get('tier') == 'small':
+        if not start_small_model_load(model_path):
+            return jsonify({"message": "Small model reload already in progress"}), 409
+        return jsonify({"message": "Small model reload initiated"})
+    if not start_model_load(model_path):
+        return jsonify({"message": "Model reload already in progress"}), 409
     return jsonify({"message": "Model reload initiated"})
 
-@app.route('/detect-sign', methods=['POST'])
-def detect_sign():
-    """Detect sign language from image"""
-    if not model_loaded:
-        if not model_loading:
-            # Try to load the model if it's not loading already
-            threading.Thread(target=load_model_async).start()
-        return jsonify({"error": "Model is still loading. Please try again later."}), 503
+def detect_sign_in_image(img, served, debug=False, detector=None, deadline=None, session_id=None):
+    """Run hand detection and classification on a decoded BGR image.
+    
+    Returns the response body and the HTTP status code. `served` is the
+    model pinned by the caller with model_slot.acquire(). `detector` is the
+    MediaPipe Hands instance to use; one is taken from the pool when omitted.
+    Only frames of a client session (`session_id`) use the prediction cache.
+    Raises DeadlineExceeded when `deadline` passes before inference starts.
+    """
+    # Process image for hand detection
+    with metrics.time('detect_hand'):
+        hand_box, hand_detected, debug_image, hand_points = detect_and_crop_hand(img, detector, debug=debug)
+    metrics.inc('hand_detection_total', outcome='hand' if hand_detected else 'no_hand')
+    
+    # Save debug images if needed
+    debug_path = None
+    if debug:
+        debug_path = save_debug_image(debug_image, "debug")
+        if hand_detected:
+            save_debug_image(square_crop(img, hand_box), "hand")
     
-    # Get image data from request
-    data = request.json
+    if not hand_detected:
+        logger.info("No hand detected in the image")
+        return {
+            "detected_sign": "",
+            "confidence": 0.0,
+            "message": "No hand detected in the image",
+            "debug_image": debug_path
+        }, 200
     
-    if 'image' not in data:
-        return jsonify({"error": "No image data provided"}), 400
+    # Nobody is waiting for the answer any more, skip inference
+    if deadline is not None:
+        deadline.check('predict')
+    
+    # A confident landmark classifier answers without running the CNN
+    result = classify_landmarks_first(hand_points[np.newaxis], img.shape[1] / img.shape[0], served)[0]
+    if result is not None:
+        startup.mark('first_prediction')
+        result["debug_image"] = debug_path
+        return result, 200
+    
+    # Letterbox the crop straight into this thread's reused canvas of the model's input size
+    input_format = served.input_format
+    buffers = input_buffers_for(input_format.size)
+    with metrics.time('preprocess'):
+        canvas = crop_into(img, hand_box, buffers.canvas, input_format)
+    
+    # Hands are counted by the classifier that answered when it runs; cache
+    # hits and requests that joined an in-flight prediction count as 'cache'
+    answered = []
+    
+    def predict_hand():
+        # A confident small model answers without running the full one
+        prediction = classify_small_tier(canvas, served)
+        path = 'small'
+        if prediction is None:
+            # Normalize in place and predict, batched together with concurrent requests
+            with metrics.time('normalize'):
+                batch = normalize_into(canvas, buffers.batch, served.backend.pixel_input, input_format)
+            with metrics.time('predict'):
+                prediction = served.predict(batch)
+            path = 'cnn'
+        metrics.inc('cascade_total', path=path)
+        answered.append(path)
+        return prediction
     
     try:
-        # Decode base64 image
-        base64_data = data['image']
-        # Sometimes the base64 string comes with a data URL prefix, remove it if present
-        if ',' in base64_data:
-            base64_data = base64_data.split(',')[1]
-            
-        image_data = base64.b64decode(base64_data)
-        
-        # Convert to OpenCV format
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if session_id is not None and served.labels is labels:
+            # Identical crops of one session (a held sign) reuse a cached or in-flight
+            # prediction; other clients never see the session's entries. The cache is
+            # keyed by the crop alone, so it only holds the default model's. Registry
+            # models get their own copy of the labels even when they are equal, so
+            # this identity check selects the default model itself
+            prediction = prediction_cache.get_or_compute(dhash(canvas), predict_hand, scope=session_id)
+        else:
+            prediction = predict_hand()
+    except QueueFullError as e:
+        logger.warning(str(e))
+        return {"error": "Server is busy. Please try again later."}, 503
+    
+    if not answered:
+        metrics.inc('cascade_total', path='cache')
+    startup.mark('first_prediction')
+    result = classify_prediction(prediction[0], served.labels)
+    result["debug_image"] = debug_path
+    return result, 200
+
+def detect_sign_in_frame(img, served, session_id=None, debug=False, detector=None, deadline=None):
+    """detect_sign_in_image() for a frame that may belong to a client session.
+    
+    A session frame that barely changed since the session's last processed
+    frame gets that frame's result again, without running MediaPipe or the
+    model. Debug requests always run detection so they get their images.
+    """
+    if session_id is None or debug:
+        return detect_sign_in_image(img, served, debug=debug, detector=detector, deadline=deadline)
+    
+    result, status = frame_changes.run(
+        session_id, img,
+        lambda: detect_sign_in_image(img, served, detector=detector, deadline=deadline, session_id=session_id),
+        model=(served.language, served.version))
+    if result.get("unchanged"):
+        metrics.inc('frames_unchanged_total')
+    return result, status
+
+def classify_landmarks_first(points, aspects, served):
+    """First stage of the cascade: landmark model answers for (n, 21, 3) hands.
+    
+    Returns a response body for every hand the landmark model is confident
+    about and None where the CNN `served` has to decide, which is every
+    hand when the cascade is off, no landmark model is loaded, its queue is
+    full or `served` recognises other signs (another language).
+    """
+    if not CASCADE or served.labels != labels:
+        return [None] * len(points)
+    
+    with landmark_slot.acquire() as served:
+        if served is None:
+            return [None] * len(points)
+        try:
+            with metrics.time('landmark_predict'):
+                predictions = served.predict(landmark_features(points, aspects))
+        except QueueFullError as e:
+            logger.warning(str(e))
+            return [None] * len(points)
+    
+    results = []
+    for prediction in predictions:
+        if float(np.max(prediction)) >= CASCADE_LANDMARK_THRESHOLD:
+            metrics.inc('cascade_total', path='landmark')
+            results.append(classify_prediction(prediction))
+        else:
+            results.append(None)
+    return results
+
+def classify_small_tier(canvas, served):
+    """First CNN tier: the small model's prediction for a letterboxed crop, if it is confident.
+    
+    Returns None when the full model `served` has to decide: no small model
+    is loaded, its queue is full, `served` recognises other signs, or the
+    top class's confidence is below that class's threshold (an escalation).
+    """
+    if served.labels != labels:
+        return None
+    
+    with small_slot.acquire() as small:
+        if small is None:
+            return None
         
-        if img is None:
-            return jsonify({"error": "Could not decode image"}), 400
+        buffers = input_buffers_for(small.input_format.size)
+        try:
+            with metrics.time('small_predict'):
+                batch = normalize_into(resize_canvas(canvas, buffers.canvas), buffers.batch,
+                                       small.backend.pixel_input, small.input_format)
+                prediction = small.predict(batch)
+        except QueueFullError as e:
+            logger.warning(str(e))
+            return None
         
-        # Process image for hand detection
-        hand_image, hand_detected, debug_image = detect_and_crop_hand(img)
+        predicted_index = int(np.argmax(prediction[0]))
+        if prediction[0][predicted_index] >= small.thresholds[predicted_index]:
+            return prediction
+    
+    metrics.inc('small_model_escalations_total')
+    return None
+
+def cascade_stats():
+    """Share of detected hands answered by the landmark and small models instead of the full CNN"""
+    landmark = metrics.counter('cascade_total', path='landmark')
+    small = metrics.counter('cascade_total', path='small')
+    cnn = metrics.counter('cascade_total', path='cnn')
+    cached = metrics.counter('cascade_total', path='cache')
+    escalations = metrics.counter('small_model_escalations_total')
+    return {
+        "enabled": CASCADE and landmark_slot.current is not None,
+        "threshold": CASCADE_LANDMARK_THRESHOLD,
+        "small_model_enabled": small_slot.current is not None,
+        "landmark_answers": landmark,
+        "small_answers": small,
+        "cnn_answers": cnn,
+        "cache_answers": cached,
+        "fast_path_ratio": landmark / (landmark + small + cnn + cached) if landmark + small + cnn + cached else 0.0,
+        "small_escalations": escalations,
+        "escalation_rate": escalations / (small + escalations) if small + escalations else 0.0,
+    }
+
+def classify_prediction(prediction, sign_labels=None):
+    """Turn one row of model output into the sign and confidence of a response.
+    
+    `sign_labels` names the model's classes, the default language's labels
+    when None.
+    """
+    sign_labels = sign_labels or labels
+    
+    # Get the index of the highest probability
+    predicted_index = np.argmax(prediction)
+    
+    # Get the corresponding label
+    if predicted_index < len(sign_labels):
+        predicted_label = sign_labels[predicted_index]
+    else:
+        predicted_label = "Unknown"
+    
+    # Get confidence score
+    confidence = float(prediction[predicted_index])
+    
+    # Only return a prediction if confidence is above threshold
+    if confidence > 0.65:  # 65% confidence threshold
+        logger.info(f"Detected sign: {predicted_label} with confidence: {confidence:.2f}")
+        return {
+            "detected_sign": predicted_label,
+            "confidence": confidence
+        }
+    else:
+        logger.info(f"Low confidence detection: {predicted_label} with confidence: {confidence:.2f}")
+        metrics.inc('low_confidence_total')
+        return {
+            "detected_sign": "",
+            "confidence": confidence,
+            "message": "Low confidence detection"
+        }
+
+@app.route('/detect-sign', methods=['POST'])
+def detect_sign():
+    """Detect sign language from image"""
+    headers = {}
+    with metrics.time('request'):
+        try:
+            body, status = handle_detect_sign()
+        except OverloadedError as e:
+            metrics.inc('requests_shed_total', endpoint='detect-sign')
+            body, status = {"error": "Server is overloaded. Please try again later."}, 429
+            headers["Retry-After"] = str(e.retry_after)
+        except ModelLoadError as e:
+            body, status = failed_model_response(e)
+            headers["Retry-After"] = str(e.retry_after)
+        with metrics.time('serialize'):
+            response = jsonify(body)
+    metrics.inc('requests_total', endpoint='detect-sign', status=status)
+    return response, status, headers
+
+def handle_detect_sign():
+    """Decode the uploaded image and run detection, returning body and status"""
+    try:
+        language, version = resolve_model_key()
+    except UnknownModelError as e:
+        return unknown_model_response(e)
+    
+    # The request finishes on the model it started with, even across a reload
+    with acquire_model(language, version) as served:
+        if served is None:
+            metrics.inc('model_loading_rejections_total')
+            return {"error": "Model is still loading. Please try again later."}, 503
         
-        # Save debug images if needed
-        debug_path = None
-        if data.get('debug', False):
-            debug_path = save_debug_image(debug_image, "debug")
-            if hand_detected:
-                save_debug_image(hand_image, "hand")
+        deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), DEFAULT_DEADLINE_MS)
+        session_id = request_session_id()
+        if not session_id:
+            return run_admitted(deadline, lambda: decode_and_detect(served, deadline))
         
-        if not hand_detected:
-            logger.info("No hand detected in the image")
-            return jsonify({
+        # A streaming client only wants its newest frame, older waiting ones are skipped
+        try:
+            return frame_gate.run(
+                session_id, lambda: run_admitted(deadline, lambda: decode_and_detect(served, deadline, session_id)))
+        except FrameSuperseded:
+            metrics.inc('frames_superseded_total')
+            return {
                 "detected_sign": "",
                 "confidence": 0.0,
-                "message": "No hand detected in the image",
-                "debug_image": debug_path
-            })
-        
-        # Preprocess the hand image for the model
-        processed_image = preprocess_image(hand_image)
-        
-        # Make prediction
-        prediction = model.predict(processed_image)
+                "superseded": True,
+                "message": "Superseded by a newer frame"
+            }, 200
+
+def run_admitted(deadline, handler):
+    """Wait for an admission slot, then return what `handler` returns"""
+    # Shed load before decoding anything; raises OverloadedError when saturated
+    try:
+        with admission.admit(deadline):
+            return handler()
+    except DeadlineExceeded as e:
+        # Expiry while queueing for a slot is already counted by admit()
+        if e.stage != 'admission':
+            admission.record_expired()
+        metrics.inc('requests_expired_total', stage=e.stage)
+        logger.info(str(e))
+        return {"error": "Request deadline exceeded"}, 504
+
+def decode_and_detect(served, deadline=None, session_id=None):
+    """Read the request image and run detection with the pinned model"""
+    try:
+        # Get the encoded image from the request body
+        image_data, options = read_request_image()
         
-        # Get the index of the highest probability
-        predicted_index = np.argmax(prediction[0])
+        if not image_data:
+            return {"error": "No image data provided"}, 400
         
-        # Get the corresponding label
-        if predicted_index < len(labels):
-            predicted_label = labels[predicted_index]
-        else:
-            predicted_label = "Unknown"
+        # Convert to OpenCV format straight from the request buffer
+        with metrics.time('imdecode'):
+            nparr = np.frombuffer(image_data, np.uint8)
+            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
-        # Get confidence score
-        confidence = float(prediction[0][predicted_index])
+        if img is None:
+            return {"error": "Could not decode image"}, 400
         
-        # Only return a prediction if confidence is above threshold
-        if confidence > 0.65:  # 65% confidence threshold
-            logger.info(f"Detected sign: {predicted_label} with confidence: {confidence:.2f}")
-            return jsonify({
-                "detected_sign": predicted_label,
-                "confidence": confidence,
-                "debug_image": debug_path
-            })
-        else:
-            logger.info(f"Low confidence detection: {predicted_label} with confidence: {confidence:.2f}")
-            return jsonify({
-                "detected_sign": "",
-                "confidence": confidence,
-                "message": "Low confidence detection",
-                "debug_image": debug_path
-            })
+        return detect_sign_in_frame(img, served, session_id, debug=parse_flag(options.get('debug', False)),
+                                    deadline=deadline)
             
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+@app.route('/detect-sign/batch', methods=['POST'])
+def detect_sign_batch():
+    """Detect signs in many images with one batched prediction"""
+    headers = {}
+    with metrics.time('batch_request'):
+        try:
+            body, status = handle_detect_sign_batch()
+        except OverloadedError as e:
+            metrics.inc('requests_shed_total', endpoint='detect-sign-batch')
+            body, status = {"error": "Server is overloaded. Please try again later."}, 429
+            headers["Retry-After"] = str(e.retry_after)
+        except ModelLoadError as e:
+            body, status = failed_model_response(e)
+            headers["Retry-After"] = str(e.retry_after)
+        with metrics.time('serialize'):
+            response = jsonify(body)
+    metrics.inc('requests_total', endpoint='detect-sign-batch', status=status)
+    return response, status, headers
+
+def handle_detect_sign_batch():
+    """Run batch detection with the pinned model, returning body and status"""
+    try:
+        language, version = resolve_model_key()
+    except UnknownModelError as e:
+        return unknown_model_response(e)
+    
+    with acquire_model(language, version) as served:
+        if served is None:
+            metrics.inc('model_loading_rejections_total')
+            return {"error": "Model is still loading. Please try again later."}, 503
+        
+        deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), DEFAULT_DEADLINE_MS)
+        return run_admitted(deadline, lambda: detect_signs_in_batch(served, deadline))
+
+def read_batch_images():
+    """Extract the list of encoded images of a /detect-sign/batch request.
+    
+    Three upload modes are supported:
+    - an application/x-image-batch body: every image is preceded by its
+      length in bytes as a 4-byte big-endian unsigned integer
+    - multipart/form-data with one `images` file field per image
+    - JSON with an `images` list of base64 strings
+    
+    JSON items are returned still base64 encoded so that a bad item only
+    fails itself. Raises ValueError for a malformed container or an `images`
+    field that is not a list.
+    """
+    if request.mimetype == BATCH_CONTAINER_TYPE:
+        data = request.get_data(cache=False)
+        images = []
+        offset = 0
+        while offset < len(data):
+            if offset + 4 > len(data):
+                raise ValueError("Truncated image length in batch container")
+            length = int.from_bytes(data[offset:offset + 4], 'big')
+            offset += 4
+            if offset + length > len(data):
+                raise ValueError("Truncated image data in batch container")
+            images.append(data[offset:offset + length])
+            offset += length
+        return images
+    
+    if request.mimetype == 'multipart/form-data':
+        return [upload.read() for upload in request.files.getlist('images')]
+    
+    images = request_json().get('images')
+    if images is None:
+        return []
+    if not isinstance(images, list):
+        raise ValueError("'images' must be a list of base64 encoded images")
+    return images
+
+def decode_batch_item(item):
+    """Decode one batch item (raw bytes or a base64 string) to a BGR image"""
+    if isinstance(item, str):
+        if ',' in item:
+            item = item.split(',')[1]
+        with metrics.time('base64_decode'):
+            item = base64.b64decode(item)
+    with metrics.time('imdecode'):
+        return cv2.imdecode(np.frombuffer(item, np.uint8), cv2.IMREAD_COLOR)
+
+def detect_signs_in_batch(served, deadline=None):
+    """Detect hands in every image and classify all crops in one forward pass.
+    
+    Results keep the order of the uploaded images; an image that cannot be
+    decoded gets an `error` entry without failing the others.
+    """
+    try:
+        items = read_batch_images()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    
+    if not items:
+        return {"error": "No image data provided"}, 400
+    if len(items) > BATCH_MAX_IMAGES:
+        return {"error": f"Too many images, at most {BATCH_MAX_IMAGES} per request"}, 413
+    
+    results = [None] * len(items)
+    # Crops go straight into the model input, full-size images are not kept
+    input_format = served.input_format
+    canvas = input_buffers_for(input_format.size).canvas
+    dtype = np.uint8 if served.backend.pixel_input else np.float32
+    batch = np.empty((len(items), input_format.size, input_format.size, 3), dtype=dtype)
+    rows = []
+    hand_points = []
+    aspects = []
+    
+    with hands_pool.checkout() as detector:
+        for index, item in enumerate(items):
+            try:
+                img = decode_batch_item(item)
+            except Exception as e:
+                results[index] = {"index": index, "error": f"Could not decode image: {str(e)}"}
+                continue
+            if img is None:
+                results[index] = {"index": index, "error": "Could not decode image"}
+                continue
+            
+            with metrics.time('detect_hand'):
+                hand_box, hand_detected, _, points = detect_and_crop_hand(img, detector)
+            metrics.inc('hand_detection_total', outcome='hand' if hand_detected else 'no_hand')
+            if not hand_detected:
+                results[index] = {
+                    "index": index,
+                    "detected_sign": "",
+                    "confidence": 0.0,
+                    "message": "No hand detected in the image"
+                }
+                continue
+            
+            with metrics.time('preprocess'):
+                letterbox_into_batch(img, hand_box, batch, len(rows), canvas, input_format)
+            rows.append(index)
+            hand_points.append(points)
+            aspects.append(img.shape[1] / img.shape[0])
+    
+    if rows:
+        if deadline is not None:
+            deadline.check('predict')
+        
+        # Hands the landmark model is confident about skip the CNN
+        cnn_rows = []
+        for row, result in enumerate(classify_landmarks_first(np.stack(hand_points), np.array(aspects), served)):
+            if result is None:
+                cnn_rows.append(row)
+            else:
+                results[rows[row]] = {"index": rows[row], **result}
+        
+        if cnn_rows:
+            try:
+                with metrics.time('batch_predict'):
+                    # Indexing copies, only pay for it when some rows were answered already
+                    cnn_batch = batch[:len(rows)] if len(cnn_rows) == len(rows) else batch[cnn_rows]
+                    predictions = served.predict(cnn_batch)
+            except QueueFullError as e:
+                logger.warning(str(e))
+                return {"error": "Server is busy. Please try again later."}, 503
+            metrics.inc('cascade_total', amount=len(cnn_rows), path='cnn')
+            
+            for prediction, row in zip(predictions, cnn_rows):
+                results[rows[row]] = {"index": rows[row], **classify_prediction(prediction, served.labels)}
+    
+    return {"results": results, "count": len(results)}, 200
+
+@app.route('/detect-sign/landmarks', methods=['POST'])
+def detect_sign_landmarks():
+    """Classify hand landmarks tracked on the client, without an image or MediaPipe"""
+    headers = {}
+    with metrics.time('landmark_request'):
+        try:
+            body, status = handle_detect_sign_landmarks()
+        except OverloadedError as e:
+            metrics.inc('requests_shed_total', endpoint='detect-sign-landmarks')
+            body, status = {"error": "Server is overloaded. Please try again later."}, 429
+            headers["Retry-After"] = str(e.retry_after)
+        with metrics.time('serialize'):
+            response = jsonify(body)
+    metrics.inc('requests_total', endpoint='detect-sign-landmarks', status=status)
+    return response, status, headers
+
+def handle_detect_sign_landmarks():
+    """Classify the request's landmarks with the pinned landmark model"""
+    with landmark_slot.acquire() as served:
+        if served is None:
+            return {"error": "Landmark model is not available"}, 503
+        
+        deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), DEFAULT_DEADLINE_MS)
+        return run_admitted(deadline, lambda: classify_landmarks(served, deadline))
+
+def read_request_landmarks():
+    """Extract the hand landmarks of a /detect-sign/landmarks request.
+    
+    Two upload modes are supported:
+    - an application/x-hand-landmarks body of 21 x 3 little-endian float32
+      values per hand, with the frame's width / height in the `aspect`
+      query parameter
+    - JSON with `landmarks` holding one hand (21 [x, y, z] points or 63
+      numbers) or a list of hands, and an optional `aspect`
+    
+    Returns the (n, 21, 3) landmarks, whether a list of hands was sent and
+    the aspect ratio. Raises ValueError for malformed input.
+    """
+    if request.mimetype == LANDMARK_CONTAINER_TYPE:
+        points = parse_landmark_container(request.get_data(cache=False))
+        batched = len(points) > 1
+        aspect = request.args.get('aspect', 1.0)
+    else:
+        data = request_json()
+        if 'landmarks' not in data:
+            raise ValueError("No landmarks provided")
+        points, batched = parse_landmark_json(data['landmarks'])
+        aspect = data.get('aspect', 1.0)
+    
+    try:
+        aspect = float(aspect)
+    except (TypeError, ValueError):
+        raise ValueError("aspect must be a number")
+    if not aspect > 0:
+        raise ValueError("aspect must be positive")
+    return points, batched, aspect
+
+def classify_landmarks(served, deadline=None):
+    """Classify every sent hand in one forward pass of the landmark model.
+    
+    One hand gets the same body as /detect-sign; a list of hands gets a
+    `results` list in the order they were sent.
+    """
+    try:
+        with metrics.time('landmark_parse'):
+            points, batched, aspect = read_request_landmarks()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    
+    if len(points) > LANDMARK_MAX_HANDS:
+        return {"error": f"Too many hands, at most {LANDMARK_MAX_HANDS} per request"}, 413
+    
+    if deadline is not None:
+        deadline.check('predict')
+    try:
+        with metrics.time('landmark_predict'):
+            predictions = served.predict(landmark_features(points, aspect))
+    except QueueFullError as e:
+        logger.warning(str(e))
+        return {"error": "Server is busy. Please try again later."}, 503
+    
+    results = [classify_prediction(prediction) for prediction in predictions]
+    if not batched:
+        return results[0], 200
+    return {"results": [{"index": index, **result} for index, result in enumerate(results)],
+            "count": len(results)}, 200
+
+def process_stream_frame(message, session, language=None, version=None):
+    """Decode one WebSocket message and run detection with the session's tracker.
+    
+    Binary messages are encoded images. Text messages are either JSON with
+    the same fields as /detect-sign or a bare base64 image string. Frames
+    are classified by the model of the language chosen when connecting.
+    """
+    try:
+        with acquire_model(language, version) as served:
+            if served is None:
+                metrics.inc('model_loading_rejections_total')
+                return {"error": "Model is still loading. Please try again later."}, 503
+            
+            return decode_stream_frame(message, session, served)
+    except ModelLoadError as e:
+        return failed_model_response(e)
+
+def decode_stream_frame(message, session, served):
+    """Decode a streamed frame and run detection with the pinned model"""
+    debug = False
+    if isinstance(message, str):
+        if message.lstrip().startswith('{'):
+            data = json.loads(message)
+            debug = parse_flag(data.get('debug', False))
+            message = data.get('image') or ''
+        if ',' in message:
+            message = message.split(',')[1]
+        with metrics.time('base64_decode'):
+            message = base64.b64decode(message)
+    
+    if not message:
+        return {"error": "No image data provided"}, 400
+    
+    with metrics.time('imdecode'):
+        img = cv2.imdecode(np.frombuffer(message, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return {"error": "Could not decode image"}, 400
+    
+    return detect_sign_in_frame(img, served, session.session_id, debug=debug, detector=session.detector)
+
+def stream_detect_sign(ws):
+    """Detect signs on a stream of frames sent over one WebSocket connection.
+    
+    The first message pushed to the client carries the session id; after that
+    every received frame is answered with one result message, numbered with
+    its position in the stream. The sign language is chosen with the
+    `language` and `model_version` query parameters of the connection.
+    """
+    try:
+        language, version = resolve_model_key()
+    except UnknownModelError as e:
+        body, status = unknown_model_response(e)
+        ws.send(json.dumps({**body, "status": status}))
+        return
+    
+    try:
+        session = stream_sessions.open()
+    except SessionLimitError as e:
+        logger.warning(str(e))
+        ws.send(json.dumps({"error": "Server is busy. Please try again later.", "status": 503}))
+        return
+    
+    try:
+        ws.send(json.dumps({"session_id": session.session_id, "idle_timeout": stream_sessions.idle_timeout}))
+        while True:
+            message = ws.receive(timeout=stream_sessions.idle_timeout)
+            if message is None:
+                logger.info(f"Streaming session {session.session_id} timed out")
+                break
+            
+            session.touch()
+            try:
+                result, status = process_stream_frame(message, session, language, version)
+            except Exception as e:
+                logger.error(f"Error processing streamed frame: {str(e)}", exc_info=True)
+                result, status = {"error": str(e)}, 500
+            
+            result["frame"] = session.frames
+            result["status"] = status
+            metrics.inc('requests_total', endpoint='stream', status=status)
+            with metrics.time('serialize'):
+                message = json.dumps(result)
+            ws.send(message)
+    finally:
+        stream_sessions.close(session.session_id)
+        frame_changes.forget(session.session_id)
+
+if Sock is not None:
+    sock = Sock(app)
+    sock.route('/detect-sign/stream')(stream_detect_sign)
+else:
+    logger.warning("flask-sock is not installed, the /detect-sign/stream endpoint is disabled")
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose latency histograms, counters and component gauges for Prometheus"""
+    served = model_slot.current
+    body = metrics.render({
+        "model": {
+            "in_flight": served.in_flight if served is not None else 0,
+            "load_seconds": served.load_seconds if served is not None else 0,
+            "draining": len(model_slot.stats()["draining"]),
+        },
+        "batching": served.scheduler.stats() if served is not None else None,
+        "streaming": stream_sessions.stats(),
+        "hands_pool": hands_pool.stats(),
+        "cache": prediction_cache.stats(),
+        "debug_writer": debug_writer.stats(),
+        "admission": admission.stats(),
+        "latest_frame": frame_gate.stats(),
+        "frame_diff": frame_changes.stats(),
+        "hand_prefilter": hand_prefilter.stats(),
+        **{name: stats() for name, stats in server_stats.items()},
+        "startup": startup.gauges(),
+        "registry": model_registry.stats(),
+        "cascade": cascade_stats(),
+    })
+    return Response(body, content_type=PROMETHEUS_CONTENT_TYPE)
 
 @app.route('/supported-signs', methods=['GET'])
 def supported_signs():
-    """Return the list of supported sign language symbols"""
+    """Return the list of supported sign language symbols of the requested language"""
+    try:
+        language, version = resolve_model_key()
+    except UnknownModelError as e:
+        body, status = unknown_model_response(e)
+        return jsonify(body), status
+    
+    symbols = labels if is_default_model_key(language, version) else model_registry.resolve(language, version).labels
     return jsonify({
-        "symbols": labels,
-        "count": len(labels)
+        "symbols": symbols,
+        "count": len(symbols),
+        "language": language,
+        "languages": supported_languages()
     })
 
 @app.route('/static/debug/<path:filename>', methods=['GET'])
 def serve_debug_image(filename):
     """Serve debug images for troubleshooting"""
-    return send_from_directory('debug_images', filename)
+    return send_from_directory(os.path.abspath(DEBUG_IMAGE_DIR), filename)
 
 if __name__ == '__main__':
-    # Check if required Python packages are installed
-    try:
-        import tensorflow as tf
-        import mediapipe as mp
-        logger.info(f"TensorFlow version: {tf.__version__}")
-        logger.info(f"MediaPipe version: {mp.__version__}")
-    except ImportError as e:
-        logger.error(f"Missing required dependency: {str(e)}")
+    # Check that required Python packages are installed without importing them,
+    # the background loaders import them while the server is already listening.
+    # TensorFlow is only needed by the Keras backend; ONNX models run
+    # without it and TFLite models can use the tflite_runtime package
+    required = ['mediapipe'] + (['tensorflow'] if INFERENCE_BACKEND == 'keras' else [])
+    missing = [name for name in required if importlib.util.find_spec(name) is None]
+    if missing:
+        logger.error(f"Missing required dependency: {', '.join(missing)}")
         logger.error("Please install required packages: pip install tensorflow mediapipe opencv-python flask flask-cors pillow")
+        logger.error("Optional: pip install flask-sock for the /detect-sign/stream endpoint")
         exit(1)
     
     # Use host='0.0.0.0' to make the server accessible from other devices on your network
-    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""ASGI variant of the translator backend, for many slow or idle mobile connections.
+
+Examples:
+    python backend_asgi.py
+    uvicorn backend_asgi:app --host 0.0.0.0 --port 5000 --timeout-keep-alive 75
+
+Under WSGI (backend.py) every request holds a thread from the first byte of
+its upload to the last byte of its response, so slow mobile uploads and idle
+keep-alive connections use up the server's threads. Here the event loop
+receives request bodies and writes responses, and only complete requests
+are handed to backend.py's routes, on a bounded pool of threads for
+decoding, MediaPipe and inference. The routes, their responses, admission
+control and the models are the same as with `python backend.py`.
+"""
+import importlib.util
+import os
+
+import backend
+from asgi_bridge import AsgiBridge
+from backend import logger
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Thread pool for decoding, MediaPipe and inference. It defaults to the
+# requests the admission controller lets run or wait, so it keeps shedding
+# load and enforcing deadlines exactly as in backend.py. Once ASGI_MAX_PENDING
+# requests are in the pool, running or waiting, new ones are answered 429
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', backend.ADMISSION_MAX_CONCURRENCY + backend.ADMISSION_MAX_QUEUE))
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', ASGI_THREADS))
+
+# Uploads: larger bodies get a 413, and uploads that stall for
+# ASGI_BODY_TIMEOUT seconds between two chunks a 408
+ASGI_MAX_BODY_MB = float(os.environ.get('ASGI_MAX_BODY_MB', 32))
+ASGI_BODY_TIMEOUT = float(os.environ.get('ASGI_BODY_TIMEOUT', 30))
+
+# Connections: idle keep-alive connections are closed after
+# ASGI_KEEPALIVE_TIMEOUT seconds, and ASGI_BACKLOG connections may wait to be
+# accepted. Each open connection uses one file descriptor, so the process's
+# soft descriptor limit is raised to the hard limit at startup
+ASGI_KEEPALIVE_TIMEOUT = int(os.environ.get('ASGI_KEEPALIVE_TIMEOUT', 75))
+ASGI_BACKLOG = int(os.environ.get('ASGI_BACKLOG', 4096))
+
+app = AsgiBridge(
+    backend.app,
+    threads=ASGI_THREADS,
+    max_pending=ASGI_MAX_PENDING,
+    max_body=ASGI_MAX_BODY_MB * 1024 * 1024,
+    body_timeout=ASGI_BODY_TIMEOUT,
+    # Probes and status pages only read counters, answer them even when the pool is busy
+    inline_paths=('/health', '/ready', '/model-status', '/metrics')
+)
+backend.server_stats["asgi"] = app.stats
+
+
+def raise_open_file_limit():
+    """Raise the soft limit on open files to the hard limit; returns the new limit"""
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not raise the open file limit: {str(e)}")
+    return soft
+
+
+if __name__ == '__main__':
+    required = ['uvicorn', 'mediapipe'] + (['tensorflow'] if backend.INFERENCE_BACKEND == 'keras' else [])
+    missing = [name for name in required if importlib.util.find_spec(name) is None]
+    if missing:
+        logger.error(f"Missing required dependency: {', '.join(missing)}")
+        logger.error("Please install required packages: pip install uvicorn tensorflow mediapipe opencv-python "
+                     "flask flask-cors pillow")
+        exit(1)
+
+    import uvicorn
+
+    limit = raise_open_file_limit()
+    if limit is not None:
+        logger.info(f"Open file limit is {limit}, enough for about as many connections")
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), timeout_keep_alive=ASGI_KEEPALIVE_TIMEOUT,
+                backlog=ASGI_BACKLOG, access_log=False)
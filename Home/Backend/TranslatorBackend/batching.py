@@ -0,0 +1,156 @@
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the batching queue cannot accept more requests"""
+
+
+class _PendingRequest:
+    """A single caller waiting for its rows of a batched prediction"""
+    __slots__ = ('inputs', 'event', 'result', 'error')
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchScheduler:
+    """Coalesce concurrent predict calls into batched forward passes.
+
+    Callers submit a batch (usually of size one) and block until the worker
+    thread has run it. The worker collects requests until either
+    `max_batch_size` rows are waiting or `max_wait_ms` has passed since the
+    first request of the batch arrived, runs `predict_fn` once on the
+    concatenated input and hands every caller back its own rows.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, max_queue_size=256):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.max_queue_size = max(1, int(max_queue_size))
+
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._rows = 0
+        self._rejected = 0
+        self._max_seen_batch = 0
+
+        self._worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, inputs, timeout=None):
+        """Queue `inputs` for the next batch and wait for the matching predictions"""
+        if self._closed:
+            raise RuntimeError("Batch scheduler is closed")
+
+        pending = _PendingRequest(inputs)
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            raise QueueFullError(f"Inference queue is full ({self.max_queue_size} pending requests)")
+
+        if not pending.event.wait(timeout):
+            raise TimeoutError("Timed out waiting for batched prediction")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def close(self):
+        """Stop accepting requests and let the worker finish what is queued"""
+        if self._closed:
+            return
+        self._closed = True
+        # The sentinel blocks until there is room, so queued requests are not dropped
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+        if not self._worker.is_alive():
+            # Drop the reference to the model so it can be freed
+            self.predict_fn = None
+
+    def stats(self):
+        """Return the configuration and counters of the scheduler"""
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "max_queue_size": self.max_queue_size,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "rejected": self._rejected,
+                "average_batch_size": (self._rows / self._batches) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_seen_batch,
+            }
+
+    def _run(self):
+        """Worker loop collecting and executing batches"""
+        max_wait = self.max_wait_ms / 1000.0
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            rows = len(first.inputs)
+            stop = False
+            deadline = time.monotonic() + max_wait
+            while rows < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item.inputs)
+
+            self._execute(batch, rows)
+            if stop:
+                return
+
+    def _execute(self, batch, rows):
+        """Run one forward pass and distribute the rows to their callers"""
+        try:
+            if len(batch) == 1:
+                inputs = batch[0].inputs
+            else:
+                inputs = np.concatenate([item.inputs for item in batch], axis=0)
+            predictions = self.predict_fn(inputs)
+
+            start = 0
+            for item in batch:
+                end = start + len(item.inputs)
+                item.result = predictions[start:end]
+                start = end
+        except Exception as e:
+            logger.error(f"Error running batched prediction: {str(e)}", exc_info=True)
+            for item in batch:
+                item.error = e
+        finally:
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._rows += rows
+                self._max_seen_batch = max(self._max_seen_batch, rows)
+            for item in batch:
+                item.event.set()
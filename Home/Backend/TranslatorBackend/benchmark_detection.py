@@ -0,0 +1,97 @@
+"""Measure hand detection time with and without downscaling large uploads.
+
+Examples:
+    python benchmark_detection.py hand.jpg
+    python benchmark_detection.py hand1.jpg hand2.jpg --max-side 480 --report detection_report.json
+
+Every image is resized to 720p, 1080p and 12 MP (keeping its orientation)
+and run through detect_and_crop_hand once on the full frame and once with
+MediaPipe on a copy no larger than --max-side. Hand crops are compared so a
+speedup that loses the hand shows up in the report.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+import recognition
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Long and short side of the benchmarked resolutions
+RESOLUTIONS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '12MP': (4000, 3000),
+}
+
+
+def resize_to(image, long_side, short_side):
+    height, width = image.shape[:2]
+    if height > width:
+        return cv2.resize(image, (short_side, long_side), interpolation=cv2.INTER_CUBIC)
+    return cv2.resize(image, (long_side, short_side), interpolation=cv2.INTER_CUBIC)
+
+
+def time_detection(image, detector, max_side, runs):
+    """Median detect_and_crop_hand time in ms and the last hand box"""
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        box, detected, _, _ = recognition.detect_and_crop_hand(image, detector, max_side=max_side)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies)), box, detected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downscaled hand detection")
+    parser.add_argument('images', nargs='+', help="Photos containing one hand")
+    parser.add_argument('--max-side', type=int, default=recognition.DETECTION_MAX_SIDE or 640,
+                        help="Longest side of the image MediaPipe sees")
+    parser.add_argument('--runs', type=int, default=20, help="Timed runs per image and mode")
+    parser.add_argument('--report', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    detector = recognition.create_static_hands()
+    report = {}
+    for path in args.images:
+        source = cv2.imread(path)
+        if source is None:
+            logger.warning(f"Could not read '{path}', skipping")
+            continue
+
+        report[path] = {}
+        for name, (long_side, short_side) in RESOLUTIONS.items():
+            image = resize_to(source, long_side, short_side)
+            full_ms, full_box, full_detected = time_detection(image, detector, 0, args.runs)
+            scaled_ms, scaled_box, scaled_detected = time_detection(image, detector, args.max_side, args.runs)
+
+            result = {
+                "full_ms": full_ms,
+                "downscaled_ms": scaled_ms,
+                "speedup": full_ms / scaled_ms,
+                "hand_detected": [full_detected, scaled_detected],
+            }
+            if full_detected and scaled_detected:
+                # Compare the longer sides of the two hand boxes
+                full_side = max(full_box[2] - full_box[0], full_box[3] - full_box[1])
+                scaled_side = max(scaled_box[2] - scaled_box[0], scaled_box[3] - scaled_box[1])
+                result["crop_size_ratio"] = scaled_side / full_side
+            report[path][name] = result
+            logger.info(f"{os.path.basename(path)} {name:>5}: full {full_ms:.1f} ms, "
+                        f"max side {args.max_side} {scaled_ms:.1f} ms, "
+                        f"speedup {result['speedup']:.2f}x, detected {result['hand_detected']}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Compare the fused hand preprocessing with the previous allocate-and-copy path.
+
+Examples:
+    python benchmark_preprocess.py
+    python benchmark_preprocess.py hand.jpg --runs 2000
+
+Crops of several sizes are taken from the image (random noise at 1080p when
+no image is given) and turned into a (1, 224, 224, 3) model input both ways.
+Reports the mean time per call, the bytes allocated per call and the mean
+and largest difference between the two outputs. The fused path resamples
+only the crop, so pixels next to the letterbox bars differ slightly.
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from preprocess import InputBuffers, letterbox_crop, normalize_into
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Crop sizes relative to the shorter image side, wide and tall boxes included
+CROP_SHAPES = {
+    'small': (0.2, 0.25),
+    'medium': (0.5, 0.4),
+    'large': (0.9, 0.9),
+}
+
+
+def previous_preprocess(image, box):
+    """Square padding, resize, float conversion and expand_dims as separate arrays"""
+    x_min, y_min, x_max, y_max = box
+    hand_region = image[y_min:y_max, x_min:x_max]
+    width, height = x_max - x_min, y_max - y_min
+    max_dim = max(width, height)
+    square_hand = np.zeros((max_dim, max_dim, 3), dtype=np.uint8)
+    offset_x = (max_dim - width) // 2
+    offset_y = (max_dim - height) // 2
+    square_hand[offset_y:offset_y+height, offset_x:offset_x+width] = hand_region
+
+    resized = cv2.resize(square_hand, (224, 224))
+    resized = resized.astype(np.float32) / 255.0
+    return np.expand_dims(resized, axis=0)
+
+
+def fused_preprocess(image, box, buffers):
+    canvas = letterbox_crop(image, box, buffers.canvas)
+    return normalize_into(canvas, buffers.batch)
+
+
+def measure(fn, runs):
+    """Mean time per call in microseconds and bytes allocated per call"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    elapsed = (time.perf_counter() - start) / runs * 1e6
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hand crop preprocessing")
+    parser.add_argument('image', nargs='?', help="Image to crop from (random 1080p noise by default)")
+    parser.add_argument('--runs', type=int, default=1000, help="Timed calls per crop and path")
+    args = parser.parse_args()
+
+    if args.image:
+        image = cv2.imread(args.image)
+        if image is None:
+            parser.error(f"Could not read '{args.image}'")
+    else:
+        image = np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+
+    buffers = InputBuffers(224)
+    height, width = image.shape[:2]
+    short_side = min(width, height)
+    for name, (box_width, box_height) in CROP_SHAPES.items():
+        crop_width, crop_height = int(short_side * box_width), int(short_side * box_height)
+        x_min, y_min = (width - crop_width) // 2, (height - crop_height) // 2
+        box = (x_min, y_min, x_min + crop_width, y_min + crop_height)
+
+        previous_us, previous_bytes = measure(lambda: previous_preprocess(image, box), args.runs)
+        fused_us, fused_bytes = measure(lambda: fused_preprocess(image, box, buffers), args.runs)
+        difference = np.abs(previous_preprocess(image, box) - fused_preprocess(image, box, buffers))
+
+        logger.info(f"{name:>6} crop {crop_width}x{crop_height}: "
+                    f"previous {previous_us:.0f} us / {previous_bytes / 1024:.0f} KiB, "
+                    f"fused {fused_us:.0f} us / {fused_bytes / 1024:.0f} KiB, "
+                    f"speedup {previous_us / fused_us:.2f}x, "
+                    f"mean/max abs diff {difference.mean():.4f}/{difference.max():.4f}")
+
+
+if __name__ == '__main__':
+    main()
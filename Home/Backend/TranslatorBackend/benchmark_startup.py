@@ -0,0 +1,148 @@
+"""Measure how long backend.py takes from process start to its first prediction.
+
+Examples:
+    python benchmark_startup.py --image hand.jpg
+    python benchmark_startup.py --image hand.jpg --runs 5 --env INFERENCE_BACKEND=onnx --report startup.json
+
+Every run starts a fresh server process (a stub model is generated when the
+model file is missing, see loadtest.py) and records, from the moment it was
+spawned, when
+- `/health` first answers, i.e. the port is bound,
+- the server reports ready (`/ready`, or `/model-status` on builds without it),
+- `/detect-sign` first answers 200 for --image (time to first prediction).
+Runs after the first reuse the on-disk artifact cache (MODEL_CACHE_DIR), so
+the first run is the coldest start; pass --clear-cache to make every run cold.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+import loadtest
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+
+
+def fetch(url, data=None, headers=None):
+    """Status and body of a request to `url`, or (None, b'') when nothing answers"""
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except OSError:
+        return None, b''
+
+
+def is_ready(base_url):
+    status, _ = fetch(base_url + '/ready')
+    if status != 404:
+        return status == 200
+    # Builds without /ready report the model state on /model-status
+    status, body = fetch(base_url + '/model-status')
+    return status == 200 and json.loads(body).get('loaded', False)
+
+
+def wait_until(check, process, timeout):
+    """monotonic() time at which `check()` first returns True"""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with code {process.returncode} during startup")
+        if check():
+            return time.monotonic()
+        time.sleep(POLL_INTERVAL)
+    raise SystemExit(f"Startup milestone not reached within {timeout} s")
+
+
+def measure_start(model_path, frame, extra_env, workdir, timeout):
+    """Start one server and return its startup milestones in seconds"""
+    port = loadtest.free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    log_path = os.path.join(workdir, 'server.log')
+    spawned = time.monotonic()
+    process, log = loadtest.start_server('backend', model_path, port, extra_env, log_path)
+    try:
+        bound = wait_until(lambda: fetch(base_url + '/health')[0] == 200, process, timeout)
+        ready = wait_until(lambda: is_ready(base_url), process, timeout)
+        first_prediction = wait_until(
+            lambda: fetch(base_url + '/detect-sign', frame, {'Content-Type': 'image/jpeg'})[0] == 200,
+            process, timeout)
+        return {
+            "port_bound_seconds": bound - spawned,
+            "ready_seconds": ready - spawned,
+            "first_prediction_seconds": first_prediction - spawned,
+        }
+    except SystemExit:
+        log.flush()
+        with open(log_path) as f:
+            logger.error("Server log:\n" + ''.join(f.readlines()[-20:]))
+        raise
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend.py cold start")
+    parser.add_argument('--image', help="Photo sent as the first request (a synthetic frame by default)")
+    parser.add_argument('--model', help="Model file to serve (a stub is generated if missing)")
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Extra environment for the server, e.g. INFERENCE_BACKEND=onnx")
+    parser.add_argument('--runs', type=int, default=3, help="Server starts to measure")
+    parser.add_argument('--clear-cache', action='store_true', help="Empty the artifact cache before every run")
+    parser.add_argument('--timeout', type=float, default=300, help="Seconds to wait for each milestone")
+    parser.add_argument('--report', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            frame = f.read()
+    else:
+        frame = loadtest.load_corpus(None, count=1)[0][0]
+    extra_env = dict(item.split('=', 1) for item in args.env)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path, stub = loadtest.ensure_model('backend', args.model, workdir)
+        cache_dir = extra_env.setdefault('MODEL_CACHE_DIR', os.path.join(workdir, 'model_cache'))
+        for run in range(args.runs):
+            if args.clear_cache:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            result = measure_start(model_path, frame, extra_env, workdir, args.timeout)
+            runs.append(result)
+            logger.info(f"Run {run + 1}: port bound {result['port_bound_seconds']:.2f} s, "
+                        f"ready {result['ready_seconds']:.2f} s, "
+                        f"first prediction {result['first_prediction_seconds']:.2f} s")
+
+    report = {
+        "git_commit": loadtest.git_commit(),
+        "config": {"env": extra_env, "model": model_path, "stub_model": stub, "runs": args.runs,
+                   "clear_cache": args.clear_cache},
+        "runs": runs,
+        "median": {key: float(np.median([run[key] for run in runs])) for key in runs[0]},
+    }
+    logger.info(f"Median: {json.dumps(report['median'])}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def dhash(image, hash_size=8):
+    """Difference hash of a BGR or grayscale image as a `hash_size`**2-bit int"""
+    if len(image.shape) == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    resized = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = resized[:, 1:] > resized[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class _InFlight:
+    """A computation that concurrent callers with the same key wait on"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PerceptualCache:
+    """LRU cache of results keyed by perceptual hashes of hand crops.
+
+    Entries belong to a scope, such as a client session, and a lookup only
+    sees its own scope's entries. It hits when a cached hash of that scope
+    lies within `max_distance` bits of the requested one and the entry is
+    younger than `ttl` seconds; an exact match is a dict lookup, and only a
+    nonzero `max_distance` scans the scope's hashes. At most `max_entries`
+    results are kept, which bounds memory since every entry is one small
+    prediction row. Callers asking for a hash that is already being computed
+    in the same scope wait for that computation instead of starting their own.
+    """
+
+    def __init__(self, max_entries=1024, max_distance=0, ttl=2.0):
+        self.max_entries = max(0, int(max_entries))
+        self.max_distance = max(0, int(max_distance))
+        self.ttl = float(ttl)
+        # (scope, hash) -> (value, expires_at), least recently used first
+        self._entries = OrderedDict()
+        # scope -> hashes cached for it, scanned by Hamming lookups
+        self._scopes = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        # Bumped by clear() so results computed before it are not stored
+        self._generation = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get_or_compute(self, key, compute, scope=None):
+        """Return the cached value for `key` in `scope`, computing it at most once"""
+        if not self.enabled:
+            return compute()
+
+        key = (scope, key)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self._hits += 1
+                return value
+
+            generation = self._generation
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                self._misses += 1
+                pending = self._in_flight[key] = _InFlight()
+            else:
+                self._coalesced += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = compute()
+        except Exception as e:
+            pending.error = e
+            raise
+        else:
+            self._store(key, pending.value, generation)
+            return pending.value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.event.set()
+
+    def clear(self):
+        """Drop every cached result, e.g. after the model changed"""
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._generation += 1
+
+    def stats(self):
+        """Return the configuration and hit/miss counters of the cache"""
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "ttl": self.ttl,
+                "entries": len(self._entries),
+                "scopes": len(self._scopes),
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "hit_ratio": ((self._hits + self._coalesced) / lookups) if lookups else 0.0,
+            }
+
+    def _lookup(self, key):
+        """Find a fresh entry of the key's scope within the Hamming tolerance; caller holds the lock"""
+        now = time.monotonic()
+        match = None
+        if key in self._entries:
+            match = key
+        elif self.max_distance:
+            scope, wanted = key
+            best = self.max_distance + 1
+            for cached in self._scopes.get(scope, ()):
+                distance = hamming_distance(wanted, cached)
+                if distance < best:
+                    match, best = (scope, cached), distance
+
+        if match is None:
+            return None
+        value, expires_at = self._entries[match]
+        if expires_at < now:
+            self._remove(match)
+            return None
+        self._entries.move_to_end(match)
+        return value
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            scope, hashed = key
+            self._scopes.setdefault(scope, set()).add(hashed)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key):
+        """Drop one entry and forget its scope once empty; caller holds the lock"""
+        del self._entries[key]
+        scope, hashed = key
+        hashes = self._scopes[scope]
+        hashes.discard(hashed)
+        if not hashes:
+            del self._scopes[scope]
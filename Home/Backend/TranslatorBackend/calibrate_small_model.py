@@ -0,0 +1,197 @@
+"""Pick per-class thresholds for the small first-tier CNN on labelled photos.
+
+Examples:
+    python calibrate_small_model.py ~/datasets/asl_alphabet_test
+    python calibrate_small_model.py ~/datasets/asl_alphabet_test --small-model sign_language_model_small.onnx \
+        --tolerance 0.005 --report small_model.json
+
+The dataset has one folder of photos per label, like the training data; use
+photos the models were not trained on. Every photo with a hand goes through
+the small model and the full model. Thresholds are then lowered class by
+class, always taking the photos the small model is most confident about
+next and preferring those it gets right as often as the full model, for as
+long as the cascade stays within --tolerance of the full model's accuracy.
+Classes the small model should never answer get no threshold (null). The
+thresholds are written to --output (SMALL_MODEL_THRESHOLDS), which the
+server reads when it loads the small model.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+import recognition
+from class_thresholds import write_class_thresholds
+from inference import backend_for_model, load_inference_backend
+from model_slot import file_checksum
+from preprocess import InputBuffers, InputFormat, letterbox_crop, normalize_into, resize_canvas
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def classify_dataset(dataset_dir, large, small, max_per_class=0):
+    """Labels, predictions of both models and their times in ms for every hand"""
+    detector = recognition.create_static_hands()
+    buffers = InputBuffers(224)
+    small_format = InputFormat(small.input_shape[0])
+    small_buffers = InputBuffers(small_format.size)
+    rows = {"label": [], "small": [], "large": [], "small_ms": [], "large_ms": []}
+    missed = 0
+    for folder in sorted(os.listdir(dataset_dir)):
+        path = os.path.join(dataset_dir, folder)
+        if not os.path.isdir(path) or folder not in recognition.labels:
+            continue
+        files = sorted(name for name in os.listdir(path) if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+        for name in files[:max_per_class or None]:
+            image = cv2.imread(os.path.join(path, name))
+            if image is None:
+                continue
+            box, detected, _, _ = recognition.detect_and_crop_hand(image, detector)
+            if not detected:
+                missed += 1
+                continue
+            canvas = letterbox_crop(image, box, buffers.canvas)
+
+            # The server resizes the full model's letterboxed crop, so do the same here
+            start = time.perf_counter()
+            small_canvas = resize_canvas(canvas, small_buffers.canvas)
+            small_prediction = small.predict(
+                normalize_into(small_canvas, small_buffers.batch, small.pixel_input, small_format))[0]
+            small_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            large_prediction = large.predict(normalize_into(canvas, buffers.batch, large.pixel_input))[0]
+            large_ms = (time.perf_counter() - start) * 1000
+
+            rows["label"].append(recognition.labels.index(folder))
+            rows["small"].append(small_prediction)
+            rows["large"].append(large_prediction)
+            rows["small_ms"].append(small_ms)
+            rows["large_ms"].append(large_ms)
+    detector.close()
+    return {key: np.array(values) for key, values in rows.items()}, missed
+
+
+def _answer_groups(confidence, small_ok, large_ok):
+    """Photos of one predicted class as (threshold, accuracy change, count), most confident first.
+
+    Photos with the same confidence share a threshold, so they are taken together.
+    """
+    groups = []
+    for value in np.unique(confidence)[::-1]:
+        taken = confidence == value
+        groups.append((float(value), int(small_ok[taken].sum() - large_ok[taken].sum()), int(taken.sum())))
+    return groups
+
+
+def calibrate(rows, num_classes, tolerance):
+    """Per-class thresholds keeping the cascade within `tolerance` of the full model's accuracy.
+
+    Greedy: the next group of every class is a candidate, and the one that
+    costs the least accuracy (then answers the most photos) is taken while
+    the photos lost stay within the budget. Classes that never get a group
+    keep an infinite threshold.
+    """
+    labels = rows["label"]
+    small_labels = rows["small"].argmax(axis=1)
+    small_confidence = rows["small"].max(axis=1)
+    small_ok = small_labels == labels
+    large_ok = rows["large"].argmax(axis=1) == labels
+    budget = tolerance * len(labels)
+
+    pending = {}
+    for index in range(num_classes):
+        predicted = small_labels == index
+        if predicted.any():
+            pending[index] = _answer_groups(small_confidence[predicted], small_ok[predicted], large_ok[predicted])
+
+    thresholds = np.full(num_classes, np.inf, dtype=np.float32)
+    lost = 0
+    while pending:
+        index = max(pending, key=lambda i: pending[i][0][1:])
+        threshold, change, _ = pending[index][0]
+        if lost - change > budget:
+            # No other class has a cheaper next group
+            break
+        lost -= change
+        thresholds[index] = threshold
+        pending[index].pop(0)
+        if not pending[index]:
+            del pending[index]
+    return thresholds
+
+
+def evaluate(rows, thresholds):
+    labels = rows["label"]
+    small_labels = rows["small"].argmax(axis=1)
+    large_labels = rows["large"].argmax(axis=1)
+    answered = rows["small"].max(axis=1) >= thresholds[small_labels]
+    cascade_labels = np.where(answered, small_labels, large_labels)
+    small_ms = float(np.mean(rows["small_ms"]))
+    large_ms = float(np.mean(rows["large_ms"]))
+    return {
+        "hands": int(len(labels)),
+        "large_only": {"accuracy": float(np.mean(large_labels == labels)), "mean_ms": large_ms},
+        "small_only": {"accuracy": float(np.mean(small_labels == labels)), "mean_ms": small_ms},
+        "cascade": {
+            "accuracy": float(np.mean(cascade_labels == labels)),
+            "small_answer_ratio": float(np.mean(answered)),
+            "escalation_rate": float(np.mean(~answered)),
+            # The small model always runs, the full model only for escalations
+            "mean_ms": small_ms + large_ms * float(np.mean(~answered)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the small first-tier model's class thresholds")
+    parser.add_argument('dataset', help="Folder with one sub-folder of held-out photos per label")
+    parser.add_argument('--model', default=recognition.MODEL_PATH, help="Full model file")
+    parser.add_argument('--small-model', default=recognition.SMALL_MODEL_PATH, help="Small model file")
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Accuracy the cascade may lose against the full model alone")
+    parser.add_argument('--output', default=recognition.SMALL_MODEL_THRESHOLDS, help="Thresholds file to write")
+    parser.add_argument('--max-per-class', type=int, default=0, help="Photos used per label (0: all)")
+    parser.add_argument('--report', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    large = load_inference_backend(backend_for_model(args.model), args.model, num_threads=recognition.INFERENCE_THREADS)
+    small = load_inference_backend(backend_for_model(args.small_model), args.small_model,
+                                   num_threads=recognition.INFERENCE_THREADS)
+    # Keep one-off tracing and allocation out of the timings
+    large.predict(np.zeros((1, 224, 224, 3), dtype=np.float32))
+    small.predict(np.zeros((1, *small.input_shape), dtype=np.float32))
+    rows, missed = classify_dataset(args.dataset, large, small, args.max_per_class)
+    if not len(rows["label"]):
+        raise SystemExit(f"No hands found in {args.dataset}")
+
+    thresholds = calibrate(rows, len(recognition.labels), args.tolerance)
+    report = evaluate(rows, thresholds)
+    report["photos_without_hand"] = missed
+    report["tolerance"] = args.tolerance
+    logger.info(f"{report['hands']} hands, {missed} photos without a hand")
+    for name in ("large_only", "small_only", "cascade"):
+        logger.info(f"{name}: accuracy {report[name]['accuracy']:.3f}, {report[name]['mean_ms']:.2f} ms")
+    logger.info(f"The small model answers {report['cascade']['small_answer_ratio']:.1%} of the hands, "
+                f"{int(np.isinf(thresholds).sum())} of {len(thresholds)} classes always go to the full model")
+
+    checksum = file_checksum(args.small_model)
+    write_class_thresholds(args.output, thresholds, recognition.labels,
+                           model=os.path.basename(args.small_model), model_version=checksum[:12] if checksum else None,
+                           tolerance=args.tolerance, large_accuracy=report["large_only"]["accuracy"],
+                           cascade_accuracy=report["cascade"]["accuracy"])
+    logger.info(f"Saved thresholds to {args.output}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def read_class_thresholds(path, labels, default):
+    """Per-class confidence thresholds from a JSON file, as an array ordered like `labels`.
+
+    The file maps label names to thresholds under `thresholds`. A label
+    mapped to null never passes (its threshold is infinite); labels that
+    are not listed get `default`.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    listed = data.get('thresholds', {})
+    unknown = sorted(set(listed) - set(labels))
+    if unknown:
+        logger.warning(f"Ignoring thresholds for unknown labels in {path}: {', '.join(unknown)}")
+    thresholds = np.full(len(labels), default, dtype=np.float32)
+    for index, label in enumerate(labels):
+        if label in listed:
+            thresholds[index] = np.inf if listed[label] is None else float(listed[label])
+    return thresholds, data
+
+
+def write_class_thresholds(path, thresholds, labels, **info):
+    """Save thresholds ordered like `labels` (inf for never) with extra `info` fields"""
+    data = dict(info)
+    data['thresholds'] = {label: (None if not np.isfinite(value) else float(value))
+                          for label, value in zip(labels, thresholds)}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
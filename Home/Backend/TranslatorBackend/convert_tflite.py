@@ -0,0 +1,137 @@
+"""Convert the Keras sign language model to TensorFlow Lite.
+
+Examples:
+    python convert_tflite.py sign_language_model.h5 --quantize float16
+    python convert_tflite.py sign_language_model.h5 --quantize int8 --calibration-dir calibration_images
+
+The converted model is checked against the Keras outputs on a sample set
+(the calibration images, or the folder given with --parity-dir) and the
+script exits with an error when top-1 agreement falls below --min-agreement.
+"""
+import argparse
+import logging
+import os
+import sys
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+from inference import TFLiteBackend
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def load_sample_images(folder, input_size, limit):
+    """Load images from `folder` (recursively) preprocessed like backend.preprocess_image"""
+    samples = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image = cv2.imread(os.path.join(root, name), cv2.IMREAD_COLOR)
+            if image is None:
+                logger.warning(f"Could not decode {name}, skipping")
+                continue
+            image = cv2.resize(image, (input_size, input_size))
+            samples.append(image.astype(np.float32) / 255.0)
+            if len(samples) >= limit:
+                return np.stack(samples)
+
+    if not samples:
+        raise ValueError(f"No images found in {folder}")
+    return np.stack(samples)
+
+
+def convert(model, quantize, calibration=None):
+    """Convert a loaded Keras model, returning the TFLite flatbuffer"""
+    # Trace a batch-of-one signature so the converted model has a static
+    # input shape; the serving interpreter resizes it for larger batches
+    serve = tf.function(lambda images: model(images, training=False))
+    concrete = serve.get_concrete_function(tf.TensorSpec([1, *model.input_shape[1:]], tf.float32))
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+
+    if quantize == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'int8':
+        if calibration is None:
+            raise ValueError("INT8 quantization needs calibration images (--calibration-dir)")
+
+        def representative_dataset():
+            for sample in calibration:
+                yield [sample[np.newaxis, ...]]
+
+        # Full integer quantization with uint8 input, so callers can feed raw
+        # pixels; the output stays float32 probabilities
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+
+    return converter.convert()
+
+
+def check_parity(model, tflite_path, samples, num_threads=None):
+    """Compare TFLite predictions with the Keras model on `samples`"""
+    interpreter = TFLiteBackend(tflite_path, num_threads=num_threads)
+    expected = model.predict(samples, verbose=0)
+    actual = np.concatenate([interpreter.predict(sample[np.newaxis, ...]) for sample in samples])
+
+    difference = np.abs(expected - actual)
+    return {
+        "samples": len(samples),
+        "top1_agreement": float(np.mean(np.argmax(expected, axis=1) == np.argmax(actual, axis=1))),
+        "mean_abs_diff": float(np.mean(difference)),
+        "max_abs_diff": float(np.max(difference)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the Keras sign model to TensorFlow Lite")
+    parser.add_argument('model', nargs='?', default='sign_language_model.h5', help="Keras H5 model to convert")
+    parser.add_argument('-o', '--output', help="Output .tflite path (defaults to the model name with a .tflite suffix)")
+    parser.add_argument('--quantize', choices=['none', 'float16', 'int8'], default='none')
+    parser.add_argument('--calibration-dir', help="Folder of hand crops used for INT8 calibration")
+    parser.add_argument('--calibration-samples', type=int, default=200)
+    parser.add_argument('--parity-dir', help="Folder of images for the parity check (defaults to the calibration folder)")
+    parser.add_argument('--parity-samples', type=int, default=100)
+    parser.add_argument('--min-agreement', type=float, default=0.95, help="Minimum top-1 agreement with Keras")
+    parser.add_argument('--threads', type=int, default=None, help="Interpreter threads for the parity check")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + ('' if args.quantize == 'none' else f'_{args.quantize}') + '.tflite'
+
+    logger.info(f"Loading Keras model from {args.model}")
+    model = tf.keras.models.load_model(args.model)
+    input_size = model.input_shape[1]
+
+    calibration = None
+    if args.calibration_dir:
+        calibration = load_sample_images(args.calibration_dir, input_size, args.calibration_samples)
+        logger.info(f"Loaded {len(calibration)} calibration images")
+
+    tflite_model = convert(model, args.quantize, calibration)
+    with open(output, 'wb') as f:
+        f.write(tflite_model)
+    logger.info(f"Saved {args.quantize} TFLite model to {output} "
+                f"({len(tflite_model) / 1e6:.1f} MB, Keras file {os.path.getsize(args.model) / 1e6:.1f} MB)")
+
+    parity_dir = args.parity_dir or args.calibration_dir
+    if not parity_dir:
+        logger.warning("No --parity-dir or --calibration-dir given, skipping the parity check")
+        return
+
+    samples = load_sample_images(parity_dir, input_size, args.parity_samples)
+    report = check_parity(model, output, samples, num_threads=args.threads)
+    logger.info(f"Parity with Keras: {report}")
+    if report["top1_agreement"] < args.min_agreement:
+        logger.error(f"Top-1 agreement {report['top1_agreement']:.3f} is below {args.min_agreement}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
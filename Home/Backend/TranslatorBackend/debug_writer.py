@@ -0,0 +1,109 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class DebugImageWriter:
+    """Write debug images from a background thread with a disk quota.
+
+    `submit` only queues the image, so requests never wait on JPEG encoding
+    or disk I/O; when the bounded queue is full the image is dropped. After
+    each write, files older than `max_age` seconds are deleted and the oldest
+    files are removed until the directory is under `max_bytes`.
+    """
+
+    def __init__(self, directory="debug_images", max_queue=32, max_bytes=200 * 1024 * 1024, max_age=24 * 3600):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.max_age = float(max_age)
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+        self._deleted = 0
+        self._worker = None
+
+    def submit(self, image, prefix="debug"):
+        """Queue `image` for writing and return the path it will be saved to"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filename = f"{self.directory}/{prefix}_{timestamp}.jpg"
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((filename, image))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            logger.warning(f"Debug image queue is full, dropping {filename}")
+            return None
+        return filename
+
+    def stats(self):
+        """Return queue depth and write/drop/delete counters"""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "written": self._written,
+                "dropped": self._dropped,
+                "deleted": self._deleted,
+                "max_bytes": self.max_bytes,
+                "max_age": self.max_age,
+            }
+
+    def _ensure_worker(self):
+        # Started on first use so that servers that never debug pay nothing
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="debug-image-writer", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            filename, image = self._queue.get()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                cv2.imwrite(filename, image)
+                with self._lock:
+                    self._written += 1
+                logger.info(f"Saved debug image: {filename}")
+                self.enforce_retention()
+            except Exception as e:
+                logger.error(f"Error saving debug image {filename}: {str(e)}")
+
+    def enforce_retention(self):
+        """Delete debug images that are too old or exceed the size quota"""
+        try:
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        entries.sort()
+        cutoff = time.time() - self.max_age
+        total = sum(size for _, size, _ in entries)
+        deleted = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        if deleted:
+            with self._lock:
+                self._deleted += deleted
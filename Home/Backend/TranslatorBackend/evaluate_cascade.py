@@ -0,0 +1,141 @@
+"""Measure the landmark-first cascade on labelled photos and pick its threshold.
+
+Examples:
+    python evaluate_cascade.py ~/datasets/asl_alphabet_test
+    python evaluate_cascade.py ~/datasets/asl_alphabet_test --model sign_language_model.onnx --report cascade.json
+
+The dataset has one folder of photos per label, like the training data; use
+photos the models were not trained on. Every photo with a hand goes through
+both classifiers: the landmark model (train it with train_landmark_model.py)
+and the CNN. For each threshold the report shows which share of the hands
+the landmark model would answer (the fast path), how accurate it is on
+those, the accuracy of the whole cascade and its mean classification time,
+next to the CNN alone. Set CASCADE_LANDMARK_THRESHOLD to the lowest
+threshold whose cascade accuracy is good enough.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+import recognition
+from inference import backend_for_model, load_inference_backend
+from landmarks import FEATURE_SIZE, landmark_features
+from preprocess import InputBuffers, letterbox_crop, normalize_into
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99)
+
+
+def classify_dataset(dataset_dir, cnn, landmark_model, max_per_class=0):
+    """Labels, predictions of both classifiers and their times in ms for every hand"""
+    detector = recognition.create_static_hands()
+    buffers = InputBuffers(224)
+    rows = {"label": [], "landmark": [], "cnn": [], "landmark_ms": [], "cnn_ms": []}
+    missed = 0
+    for folder in sorted(os.listdir(dataset_dir)):
+        path = os.path.join(dataset_dir, folder)
+        if not os.path.isdir(path) or folder not in recognition.labels:
+            continue
+        files = sorted(name for name in os.listdir(path) if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+        for name in files[:max_per_class or None]:
+            image = cv2.imread(os.path.join(path, name))
+            if image is None:
+                continue
+            box, detected, _, points = recognition.detect_and_crop_hand(image, detector)
+            if not detected:
+                missed += 1
+                continue
+
+            start = time.perf_counter()
+            landmark_prediction = landmark_model.predict(
+                landmark_features(points[np.newaxis], image.shape[1] / image.shape[0]))[0]
+            landmark_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            canvas = letterbox_crop(image, box, buffers.canvas)
+            cnn_prediction = cnn.predict(normalize_into(canvas, buffers.batch, cnn.pixel_input))[0]
+            cnn_ms = (time.perf_counter() - start) * 1000
+
+            rows["label"].append(recognition.labels.index(folder))
+            rows["landmark"].append(landmark_prediction)
+            rows["cnn"].append(cnn_prediction)
+            rows["landmark_ms"].append(landmark_ms)
+            rows["cnn_ms"].append(cnn_ms)
+    detector.close()
+    return {key: np.array(values) for key, values in rows.items()}, missed
+
+
+def evaluate(rows, thresholds):
+    labels = rows["label"]
+    landmark_labels = rows["landmark"].argmax(axis=1)
+    landmark_confidence = rows["landmark"].max(axis=1)
+    cnn_labels = rows["cnn"].argmax(axis=1)
+    landmark_ms = float(np.mean(rows["landmark_ms"]))
+    cnn_ms = float(np.mean(rows["cnn_ms"]))
+
+    report = {
+        "hands": int(len(labels)),
+        "cnn_only": {"accuracy": float(np.mean(cnn_labels == labels)), "mean_ms": cnn_ms},
+        "landmark_only": {"accuracy": float(np.mean(landmark_labels == labels)), "mean_ms": landmark_ms},
+        "thresholds": [],
+    }
+    for threshold in thresholds:
+        fast = landmark_confidence >= threshold
+        cascade_labels = np.where(fast, landmark_labels, cnn_labels)
+        report["thresholds"].append({
+            "threshold": threshold,
+            "fast_path_ratio": float(np.mean(fast)),
+            "fast_path_accuracy": float(np.mean(landmark_labels[fast] == labels[fast])) if fast.any() else None,
+            "cascade_accuracy": float(np.mean(cascade_labels == labels)),
+            # The landmark model always runs, the CNN only for the slow path
+            "mean_ms": landmark_ms + cnn_ms * float(np.mean(~fast)),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the landmark-first cascade")
+    parser.add_argument('dataset', help="Folder with one sub-folder of held-out photos per label")
+    parser.add_argument('--model', default=recognition.MODEL_PATH, help="CNN model file")
+    parser.add_argument('--landmark-model', default=recognition.LANDMARK_MODEL_PATH, help="Landmark model file")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_THRESHOLDS)
+    parser.add_argument('--max-per-class', type=int, default=0, help="Photos used per label (0: all)")
+    parser.add_argument('--report', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    cnn = load_inference_backend(backend_for_model(args.model), args.model, num_threads=recognition.INFERENCE_THREADS)
+    landmark_model = load_inference_backend(backend_for_model(args.landmark_model), args.landmark_model)
+    # Keep one-off tracing and allocation out of the timings
+    cnn.predict(np.zeros((1, 224, 224, 3), dtype=np.float32))
+    landmark_model.predict(np.zeros((1, FEATURE_SIZE), dtype=np.float32))
+    rows, missed = classify_dataset(args.dataset, cnn, landmark_model, args.max_per_class)
+    if not len(rows["label"]):
+        raise SystemExit(f"No hands found in {args.dataset}")
+
+    report = evaluate(rows, args.thresholds)
+    report["photos_without_hand"] = missed
+    logger.info(f"{report['hands']} hands, {missed} photos without a hand")
+    logger.info(f"CNN only: accuracy {report['cnn_only']['accuracy']:.3f}, {report['cnn_only']['mean_ms']:.2f} ms")
+    logger.info(f"Landmarks only: accuracy {report['landmark_only']['accuracy']:.3f}, "
+                f"{report['landmark_only']['mean_ms']:.2f} ms")
+    for result in report["thresholds"]:
+        fast_accuracy = result["fast_path_accuracy"]
+        logger.info(f"threshold {result['threshold']:.2f}: fast path {result['fast_path_ratio']:.1%} "
+                    f"(accuracy {'-' if fast_accuracy is None else f'{fast_accuracy:.3f}'}), "
+                    f"cascade accuracy {result['cascade_accuracy']:.3f}, {result['mean_ms']:.2f} ms")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
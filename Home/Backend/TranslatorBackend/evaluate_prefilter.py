@@ -0,0 +1,142 @@
+"""Measure what the skin-colour hand pre-filter saves and which hands it loses.
+
+Examples:
+    python evaluate_prefilter.py ~/datasets/asl_alphabet_test ~/datasets/no_hands
+    python evaluate_prefilter.py ~/datasets/camera_frames --recall-target 0.995 --report prefilter.json
+
+Every photo under the given folders (searched recursively) goes through
+MediaPipe with the server's detection settings, which decides whether it
+holds a hand: the pre-filter can only lose hands MediaPipe would have
+found. For each threshold the report shows the share of MediaPipe calls
+the pre-filter saves, the hands it misses (recall) and the resulting mean
+detection time per frame. The recommended threshold is the highest one
+that keeps at least --recall-target of the hands; set it as
+HAND_PREFILTER_THRESHOLD. Use frames like the ones clients really send,
+including the ones without a hand.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+import recognition
+from hand_prefilter import skin_fraction
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+DEFAULT_THRESHOLDS = (0.005, 0.01, 0.02, 0.03, 0.05, 0.08, 0.1, 0.15, 0.2)
+
+
+def image_paths(folders, max_images=0):
+    paths = []
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+    paths.sort()
+    return paths[:max_images or None]
+
+
+def score_images(paths, size):
+    """Skin fraction, MediaPipe verdict and the time of both for every readable photo"""
+    detector = recognition.create_static_hands()
+    rows = {"skin": [], "hand": [], "prefilter_ms": [], "mediapipe_ms": []}
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            logger.warning(f"Could not read {path}")
+            continue
+
+        start = time.perf_counter()
+        skin = skin_fraction(image, size)
+        prefilter_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        _, detected, _, _ = recognition.detect_and_crop_hand(image, detector)
+        mediapipe_ms = (time.perf_counter() - start) * 1000
+
+        rows["skin"].append(skin)
+        rows["hand"].append(detected)
+        rows["prefilter_ms"].append(prefilter_ms)
+        rows["mediapipe_ms"].append(mediapipe_ms)
+    detector.close()
+    return {key: np.array(values) for key, values in rows.items()}
+
+
+def threshold_for_recall(hand_scores, recall_target):
+    """Highest threshold that rejects at most 1 - `recall_target` of the hands"""
+    if not len(hand_scores):
+        return None
+    scores = np.sort(hand_scores)
+    allowed_misses = int(math.floor((1 - recall_target) * len(scores) + 1e-9))
+    return float(scores[min(allowed_misses, len(scores) - 1)])
+
+
+def evaluate(rows, threshold):
+    hands = rows["hand"]
+    passed = rows["skin"] >= threshold
+    prefilter_ms = float(np.mean(rows["prefilter_ms"]))
+    mediapipe_ms = float(np.mean(rows["mediapipe_ms"]))
+    return {
+        "threshold": threshold,
+        "saved_calls": int(np.count_nonzero(~passed)),
+        "saved_ratio": float(np.mean(~passed)),
+        "missed_hands": int(np.count_nonzero(hands & ~passed)),
+        "recall": float(np.mean(passed[hands])) if hands.any() else None,
+        "rejected_without_hand": float(np.mean(~passed[~hands])) if (~hands).any() else None,
+        # The pre-filter always runs, MediaPipe only for the frames it lets through
+        "mean_ms": prefilter_ms + mediapipe_ms * float(np.mean(passed)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the skin-colour hand pre-filter")
+    parser.add_argument('folders', nargs='+', help="Folders of photos, with and without hands")
+    parser.add_argument('--recall-target', type=float, default=0.99, help="Share of hands the pre-filter must keep")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_THRESHOLDS)
+    parser.add_argument('--size', type=int, default=recognition.HAND_PREFILTER_SIZE, help="Thumbnail width in pixels")
+    parser.add_argument('--max-images', type=int, default=0, help="Photos used (0: all)")
+    parser.add_argument('--report', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    paths = image_paths(args.folders, args.max_images)
+    if not paths:
+        raise SystemExit(f"No photos found in {', '.join(args.folders)}")
+    rows = score_images(paths, args.size)
+
+    recommended = threshold_for_recall(rows["skin"][rows["hand"]], args.recall_target)
+    report = {
+        "images": int(len(rows["hand"])),
+        "with_hand": int(np.count_nonzero(rows["hand"])),
+        "prefilter_ms": float(np.mean(rows["prefilter_ms"])),
+        "mediapipe_ms": float(np.mean(rows["mediapipe_ms"])),
+        "recall_target": args.recall_target,
+        "recommended": evaluate(rows, recommended) if recommended is not None else None,
+        "thresholds": [evaluate(rows, threshold) for threshold in args.thresholds],
+    }
+    logger.info(f"{report['images']} photos, {report['with_hand']} with a hand; "
+                f"pre-filter {report['prefilter_ms']:.2f} ms, MediaPipe {report['mediapipe_ms']:.2f} ms per photo")
+    for result in report["thresholds"] + ([report["recommended"]] if recommended is not None else []):
+        recall = result["recall"]
+        logger.info(f"threshold {result['threshold']:.4f}: saves {result['saved_ratio']:.1%} of MediaPipe calls, "
+                    f"misses {result['missed_hands']} hands (recall {'-' if recall is None else f'{recall:.3f}'}), "
+                    f"{result['mean_ms']:.2f} ms per photo")
+    if recommended is None:
+        logger.warning("MediaPipe found no hands, cannot recommend a threshold")
+    else:
+        logger.info(f"Recommended HAND_PREFILTER_THRESHOLD={recommended:.4f} for recall {args.recall_target}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
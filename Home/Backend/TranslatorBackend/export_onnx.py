@@ -0,0 +1,148 @@
+"""Export the Keras hand-gesture classifiers to ONNX and compare the two runtimes.
+
+Examples:
+    python export_onnx.py                       # every known model in the repo
+    python export_onnx.py sign_language_model.h5 --benchmark --report onnx_report.json
+
+Each exported model is written next to its .h5 file with a .onnx suffix and
+checked against the Keras outputs. With --benchmark both versions are loaded
+in fresh processes to report startup time, peak RSS and p50/p99 latency.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import time
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+# Keras models used by the detection servers and scripts, relative to the repo root
+DEFAULT_MODELS = [
+    'Home/Backend/TranslatorBackend/sign_language_model.h5',
+    'hand_gesture_model_sinhala.h5',
+    'photo_detection_models/VITISCO3.h5',
+    'sinhala data trained model/keras_model.h5',
+    'tamil data trained model/keras_model.h5',
+]
+
+
+def export_model(model_path, opset=13):
+    """Convert one Keras model to ONNX and check it against the Keras outputs"""
+    import tensorflow as tf
+    import tf2onnx
+    import onnxruntime as ort
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    input_shape = tuple(model.input_shape[1:])
+    output_path = os.path.splitext(model_path)[0] + '.onnx'
+
+    signature = [tf.TensorSpec((None, *input_shape), tf.float32, name='input')]
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=output_path)
+
+    samples = np.random.default_rng(0).random((8, *input_shape), dtype=np.float32)
+    expected = model.predict(samples, verbose=0)
+    session = ort.InferenceSession(output_path, providers=['CPUExecutionProvider'])
+    actual = session.run(None, {session.get_inputs()[0].name: samples})[0]
+
+    return output_path, {
+        "input_shape": list(input_shape),
+        "top1_agreement": float(np.mean(np.argmax(expected, axis=1) == np.argmax(actual, axis=1))),
+        "max_abs_diff": float(np.max(np.abs(expected - actual))),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    # ru_maxrss survives exec on Linux, so a spawned child would report the
+    # parent's peak; VmHWM belongs to the new address space only
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(kind, model_path, runs, num_threads):
+    """Load a model with one backend and time single-image predictions.
+
+    Runs in a freshly spawned process so startup time and RSS only include
+    what that backend imports and allocates.
+    """
+    start = time.perf_counter()
+    from inference import load_inference_backend
+    backend = load_inference_backend(kind, model_path, num_threads=num_threads)
+    sample = np.random.default_rng(0).random((1, *backend.input_shape), dtype=np.float32)
+    backend.predict(sample)
+    startup = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(runs):
+        begin = time.perf_counter()
+        backend.predict(sample)
+        latencies.append((time.perf_counter() - begin) * 1000)
+
+    return {
+        "startup_seconds": startup,
+        "peak_rss_mb": peak_rss_mb(),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def measure_in_subprocess(kind, model_path, runs, num_threads):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(measure, (kind, model_path, runs, num_threads))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Keras hand-gesture models to ONNX")
+    parser.add_argument('models', nargs='*', help="Keras .h5 models (defaults to every known model in the repo)")
+    parser.add_argument('--opset', type=int, default=13)
+    parser.add_argument('--benchmark', action='store_true', help="Compare startup, RSS and latency with Keras")
+    parser.add_argument('--runs', type=int, default=200, help="Predictions per backend for the benchmark")
+    parser.add_argument('--threads', type=int, default=None, help="Intra-op threads for ONNX Runtime")
+    parser.add_argument('--report', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    models = args.models or [os.path.join(REPO_ROOT, path) for path in DEFAULT_MODELS]
+    report = {}
+    for model_path in models:
+        if not os.path.exists(model_path):
+            logger.warning(f"Model file '{model_path}' not found, skipping")
+            continue
+
+        logger.info(f"Exporting {model_path}")
+        onnx_path, parity = export_model(model_path, opset=args.opset)
+        logger.info(f"Saved {onnx_path}, parity with Keras: {parity}")
+        entry = {"onnx_path": onnx_path, "parity": parity}
+
+        if args.benchmark:
+            entry["keras"] = measure_in_subprocess('keras', model_path, args.runs, None)
+            entry["onnx"] = measure_in_subprocess('onnx', onnx_path, args.runs, args.threads)
+            for kind in ('keras', 'onnx'):
+                result = entry[kind]
+                logger.info(f"{kind:>5}: startup {result['startup_seconds']:.2f} s, "
+                            f"peak RSS {result['peak_rss_mb']:.0f} MB, "
+                            f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+
+        report[model_path] = entry
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
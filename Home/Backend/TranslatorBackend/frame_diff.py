@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from preprocess import thumbnail
+
+
+def frame_signature(image, size=64):
+    """Grayscale thumbnail of a BGR frame, `size` pixels wide, for change detection"""
+    # Area averaging also smooths away most of the sensor and compression noise
+    return cv2.cvtColor(thumbnail(image, size), cv2.COLOR_BGR2GRAY)
+
+
+def changed_fraction(signature, previous, pixel_delta):
+    """Share of thumbnail pixels whose brightness changed by more than `pixel_delta`"""
+    if signature.shape != previous.shape:
+        return 1.0
+    return float(np.count_nonzero(cv2.absdiff(signature, previous) > pixel_delta)) / signature.size
+
+
+class _SessionFrame:
+    """Signature and result of the last frame a session had processed"""
+    __slots__ = ('signature', 'result', 'model', 'last_seen')
+
+    def __init__(self, signature, result, model):
+        self.signature = signature
+        self.result = result
+        self.model = model
+        self.last_seen = time.monotonic()
+
+
+class FrameChangeGate:
+    """Skip detection for session frames that barely differ from the last processed one.
+
+    Every frame is shrunk to a `size` pixels wide grayscale thumbnail and
+    compared with the thumbnail of the session's last processed frame. When
+    fewer than `threshold` of its pixels changed by more than `pixel_delta`
+    brightness levels, the previous result is returned without running
+    MediaPipe or the model. Measuring the share of changed pixels instead of
+    the mean difference keeps a finger moving in a still frame from being
+    averaged away. A `threshold` of 0 turns the gate off. At most
+    `max_sessions` sessions are remembered and idle ones are forgotten
+    after `idle_timeout` seconds.
+    """
+
+    def __init__(self, threshold=0.001, pixel_delta=16, size=64, max_sessions=1024, idle_timeout=60.0):
+        self.threshold = float(threshold)
+        self.pixel_delta = int(pixel_delta)
+        self.size = max(8, int(size))
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout = float(idle_timeout)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._skipped = 0
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def run(self, session_id, image, compute, model=None):
+        """Return the previous result of an unchanged frame, otherwise `compute()`.
+
+        `compute` returns a response body and HTTP status; only bodies
+        answered with 200 are kept for later frames. Results are only reused
+        for the same `model`, so a session that switches models recomputes.
+        Reused bodies are copies marked `"unchanged": true`.
+        """
+        if not self.enabled:
+            return compute()
+
+        signature = frame_signature(image, self.size)
+        with self._lock:
+            self._checked += 1
+            previous = self._sessions.get(session_id)
+            if (previous is not None and previous.model == model
+                    and changed_fraction(signature, previous.signature, self.pixel_delta) < self.threshold):
+                self._skipped += 1
+                previous.last_seen = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                return {**previous.result, "unchanged": True}, 200
+
+        result, status = compute()
+        if status == 200:
+            with self._lock:
+                self._sessions[session_id] = _SessionFrame(signature, dict(result), model)
+                self._sessions.move_to_end(session_id)
+                self._evict_idle()
+        return result, status
+
+    def forget(self, session_id):
+        """Drop what is remembered about a closed session"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        """Return the configuration and how many frames were checked and skipped"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "pixel_delta": self.pixel_delta,
+                "size": self.size,
+                "sessions": len(self._sessions),
+                "checked": self._checked,
+                "skipped": self._skipped,
+                "skip_ratio": self._skipped / self._checked if self._checked else 0.0,
+            }
+
+    def _evict_idle(self):
+        """Forget idle and least recently seen sessions; caller holds the lock"""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_seen <= self.idle_timeout:
+                break
+            del self._sessions[session_id]
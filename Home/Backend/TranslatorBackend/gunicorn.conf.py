@@ -0,0 +1,72 @@
+"""Gunicorn configuration for the pre-forked production serving mode.
+
+    gunicorn -c gunicorn.conf.py backend:app
+
+The app is imported and the model loaded and warmed once in the master
+process, then WEB_WORKERS workers are forked and share it copy-on-write.
+The master restarts workers that die, hang past `timeout` or fail the
+watchdog probe in backend.watch_worker_health(). See README.md for tuning.
+"""
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+
+def physical_cores():
+    """Number of physical CPU cores, hyper-threads not counted.
+
+    psutil knows the real topology; without it half the logical CPUs is
+    assumed, which matches two-way SMT on most x86 servers and undercounts
+    machines without it.
+    """
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+    except ImportError:
+        cores = None
+    return cores or max(1, (os.cpu_count() or 2) // 2)
+
+
+# One worker per physical core; each runs inference on a single thread
+workers = int(os.environ.get('WEB_WORKERS', physical_cores()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# Read by backend.py, so they must be set before preload_app imports it.
+# The model is only loaded before the fork with INFERENCE_THREADS=1: with more
+# threads every worker loads its own copy, see backend.prefork_load_model()
+os.environ.setdefault('PREFORK', '1')
+os.environ.setdefault('INFERENCE_THREADS', '1')
+os.environ.setdefault('HANDS_POOL_SIZE', str(threads))
+
+preload_app = True
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+# Workers that stop heartbeating for `timeout` seconds are killed and replaced
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers after this many requests to bound slow leaks (0 disables)
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    # Runs in the master after the app was imported and before the first fork
+    import backend
+    backend.prefork_load_model()
+
+
+def on_reload(server):
+    # SIGHUP: load the current model file again so the new workers fork from it
+    import backend
+    backend.prefork_load_model()
+
+
+def post_fork(server, worker):
+    import backend
+    backend.after_fork()
+
+
+def child_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} exited")
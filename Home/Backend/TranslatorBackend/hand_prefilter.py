@@ -0,0 +1,63 @@
+import threading
+
+import cv2
+import numpy as np
+
+from preprocess import thumbnail
+
+# Skin tones in YCrCb (Chai and Ngan): Cr 133-173 and Cb 77-127, any brightness
+SKIN_LOWER = np.array([0, 133, 77], dtype=np.uint8)
+SKIN_UPPER = np.array([255, 173, 127], dtype=np.uint8)
+
+
+def skin_fraction(image, size=48):
+    """Share of skin-coloured pixels in a `size` pixels wide thumbnail of a BGR frame"""
+    small = cv2.cvtColor(thumbnail(image, size), cv2.COLOR_BGR2YCrCb)
+    return cv2.countNonZero(cv2.inRange(small, SKIN_LOWER, SKIN_UPPER)) / (small.shape[0] * small.shape[1])
+
+
+class HandPrefilter:
+    """Reject frames that obviously contain no hand before MediaPipe runs.
+
+    A frame passes when at least `threshold` of its thumbnail is skin
+    coloured, which costs a fraction of a millisecond against the
+    milliseconds of palm detection. It is a heuristic: gloves, unusual
+    lighting or skin tones outside the range can make it drop real hands,
+    so pick the threshold for a recall target with evaluate_prefilter.py.
+    A `threshold` of 0 lets every frame through.
+    """
+
+    def __init__(self, threshold=0.0, size=48):
+        self.threshold = float(threshold)
+        self.size = max(8, int(size))
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._rejected = 0
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def may_contain_hand(self, image):
+        """False when `image` has too little skin colour to hold a hand"""
+        if not self.enabled:
+            return True
+
+        passed = skin_fraction(image, self.size) >= self.threshold
+        with self._lock:
+            self._checked += 1
+            if not passed:
+                self._rejected += 1
+        return passed
+
+    def stats(self):
+        """Return the configuration and how many frames were checked and rejected"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "size": self.size,
+                "checked": self._checked,
+                "rejected": self._rejected,
+                "reject_ratio": self._rejected / self._checked if self._checked else 0.0,
+            }
@@ -0,0 +1,124 @@
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class DetectorError(RuntimeError):
+    """Raised when a detector's process() call failed, see process_image()"""
+
+
+def process_image(detector, image):
+    """Run `detector` on an RGB image, raising DetectorError if MediaPipe fails"""
+    try:
+        return detector.process(image)
+    except Exception as e:
+        raise DetectorError(f"Hand detection failed: {str(e)}") from e
+
+
+class HandsPool:
+    """Bounded pool of MediaPipe Hands detectors shared by request threads.
+
+    A MediaPipe graph must not run `process()` from several threads at once,
+    so each request checks a detector out for the duration of the call.
+    Detectors are created lazily up to `size`; when all of them are busy the
+    caller waits, and the time spent waiting is recorded.
+    """
+
+    def __init__(self, factory, size=None):
+        self.factory = factory
+        self.size = max(1, int(size or os.cpu_count() or 1))
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow a detector for the duration of the `with` block.
+
+        The detector goes back to the pool when the block ends, also when it
+        raises. Only a DetectorError, a failed process_image() call, replaces it.
+        """
+        start = time.perf_counter()
+        detector = self._acquire(timeout)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            if waited > 0.001:
+                self._waits += 1
+
+        broken = False
+        try:
+            yield detector
+        except DetectorError:
+            # A failed graph may be left in a bad state, replace it
+            broken = True
+            raise
+        finally:
+            if broken:
+                self._discard(detector)
+            else:
+                self._idle.put(detector)
+
+    def _acquire(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    return self.factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            # Wake up periodically in case a broken detector was discarded
+            wait = 0.1
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise TimeoutError("Timed out waiting for a free hand detector")
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _discard(self, detector):
+        with self._lock:
+            self._created -= 1
+        try:
+            detector.close()
+        except Exception as e:
+            logger.warning(f"Error closing discarded hand detector: {str(e)}")
+
+    def stats(self):
+        """Return pool occupancy and checkout wait-time counters"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "available": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waited_checkouts": self._waits,
+                "wait_seconds_total": self._wait_total,
+                "wait_seconds_max": self._wait_max,
+                "wait_seconds_average": (self._wait_total / self._checkouts) if self._checkouts else 0.0,
+            }
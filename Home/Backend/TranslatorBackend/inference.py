@@ -0,0 +1,247 @@
+import logging
+import os
+import platform
+import shutil
+import threading
+
+import numpy as np
+
+from model_slot import file_checksum
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_path(cache_dir, model_path, runtime, suffix=''):
+    """Cache location of the compiled form of `model_path` for `runtime`.
+
+    The name includes the model checksum, the runtime version and the CPU
+    architecture, so a changed model or upgraded runtime never reuses a
+    stale artifact. Returns None when caching is off (`cache_dir` empty).
+    """
+    if not cache_dir:
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(cache_dir, f"{name}-{file_checksum(model_path)[:16]}-{runtime}-{platform.machine()}{suffix}")
+
+
+class KerasBackend:
+    """Serve a Keras H5 model with the full TensorFlow runtime.
+
+    Predictions run through one tf.function traced for any batch size.
+    Tracing that function dominates a cold start, so with a `cache_dir` it
+    is traced once, saved as a SavedModel next to its checksum and served
+    from there; later starts load the SavedModel instead of the H5 file.
+    """
+    name = 'keras'
+
+    def __init__(self, model_path, cache_dir=None):
+        import tensorflow as tf
+
+        self.model_path = model_path
+        self.input_dtype = np.float32
+        self.pixel_input = False
+        cache_path = artifact_path(cache_dir, model_path, f'tf{tf.__version__}')
+        self.cache_hit = cache_path is not None and os.path.isdir(cache_path)
+        if self.cache_hit:
+            try:
+                self._restore(tf, cache_path)
+            except Exception as e:
+                logger.warning(f"Rebuilding unreadable cached model {cache_path}: {str(e)}")
+                shutil.rmtree(cache_path, ignore_errors=True)
+                self.cache_hit = False
+
+        if cache_path is None:
+            _, self._serve, self.input_shape = self._trace(tf)
+            return
+        if not self.cache_hit:
+            self._write_cache(tf, cache_path)
+            self._restore(tf, cache_path)
+        self.input_shape = tuple(self._serve.input_signature[0].shape[1:])
+
+    def _restore(self, tf, cache_path):
+        # The loaded module owns the variables, keep it alive with the function
+        self._module = tf.saved_model.load(cache_path)
+        self._serve = self._module.serve
+
+    def _trace(self, tf):
+        model = tf.keras.models.load_model(self.model_path)
+        input_shape = tuple(model.input_shape[1:])
+        serve = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[tf.TensorSpec((None, *input_shape), tf.float32)]
+        )
+        return model, serve, input_shape
+
+    def _write_cache(self, tf, cache_path):
+        model, serve, _ = self._trace(tf)
+        module = tf.Module()
+        module.model_variables = list(model.variables)
+        module.serve = serve
+        # Several workers may write the same artifact, the first rename wins
+        staging = f"{cache_path}.tmp-{os.getpid()}"
+        tf.saved_model.save(module, staging)
+        try:
+            os.rename(staging, cache_path)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+        logger.info(f"Cached the traced model at {cache_path}")
+
+    def predict(self, batch):
+        return self._serve(batch.astype(np.float32, copy=False)).numpy()
+
+
+class TFLiteBackend:
+    """Serve a TensorFlow Lite model with the multithreaded interpreter.
+
+    The standalone `tflite_runtime` package is used when installed so the
+    full TensorFlow runtime never has to be imported; otherwise the
+    interpreter bundled with TensorFlow is used. Quantized models with
+    integer inputs take float batches in [0, 1] and quantize them here.
+    """
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.model_path = model_path
+        self.num_threads = num_threads or os.cpu_count()
+        self.interpreter = Interpreter(model_path=model_path, num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+        self._lock = threading.Lock()
+
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._output_index = output_details['index']
+        self._input_quantization = input_details['quantization']
+        self._output_quantization = output_details['quantization']
+        self._output_dtype = output_details['dtype']
+        self._batch_size = int(input_details['shape'][0])
+        self.input_shape = tuple(int(dim) for dim in input_details['shape'][1:])
+        self.input_dtype = input_details['dtype']
+        # uint8 inputs quantized with scale 1/255 and no offset are raw pixel values
+        scale, zero_point = self._input_quantization
+        self.pixel_input = (self.input_dtype == np.uint8 and zero_point == 0
+                            and np.isclose(scale, 1 / 255.0, rtol=1e-3))
+        # The flatbuffer is already compiled, there is nothing to cache
+        self.cache_hit = False
+
+    def predict(self, batch):
+        batch = self._quantize_input(batch)
+        with self._lock:
+            # The interpreter is built for a fixed batch size, resize on change
+            if len(batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input_index, [len(batch), *self.input_shape])
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+
+            self.interpreter.set_tensor(self._input_index, batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output_index)
+
+        return self._dequantize_output(output)
+
+    def _quantize_input(self, batch):
+        if batch.dtype == self.input_dtype:
+            return batch
+        if np.issubdtype(self.input_dtype, np.integer):
+            scale, zero_point = self._input_quantization
+            info = np.iinfo(self.input_dtype)
+            batch = np.round(batch / scale + zero_point)
+            return np.clip(batch, info.min, info.max).astype(self.input_dtype)
+        return batch.astype(self.input_dtype)
+
+    def _dequantize_output(self, output):
+        if np.issubdtype(self._output_dtype, np.integer):
+            scale, zero_point = self._output_quantization
+            return (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class OnnxBackend:
+    """Serve an exported ONNX model with ONNX Runtime.
+
+    Graph optimizations are fully enabled and the intra-op thread pool is
+    sized by `num_threads`; TensorFlow is never imported on this path. With
+    a `cache_dir` the optimized graph is saved on the first load and later
+    loads skip the optimizer passes.
+    """
+    name = 'onnx'
+
+    def __init__(self, model_path, num_threads=None, cache_dir=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or 0
+        options.inter_op_num_threads = 1
+
+        cache_path = artifact_path(cache_dir, model_path, f'ort{ort.__version__}', '.onnx')
+        self.cache_hit = cache_path is not None and os.path.isfile(cache_path)
+        source = model_path
+        if self.cache_hit:
+            # Already optimized for this machine
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            source = cache_path
+        else:
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if cache_path is not None:
+                staging = f"{cache_path}.tmp-{os.getpid()}"
+                options.optimized_model_filepath = staging
+
+        self.model_path = model_path
+        self.session = ort.InferenceSession(source, options, providers=['CPUExecutionProvider'])
+        if cache_path is not None and not self.cache_hit:
+            os.replace(staging, cache_path)
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = tuple(model_input.shape[1:])
+        self.input_dtype = np.float32
+        self.pixel_input = False
+
+    def predict(self, batch):
+        return self.session.run(None, {self._input_name: batch.astype(np.float32, copy=False)})[0]
+
+
+INFERENCE_BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxBackend,
+}
+
+# Inference backend that serves each model file extension
+MODEL_FILE_BACKENDS = {
+    '.h5': 'keras',
+    '.keras': 'keras',
+    '.tflite': 'tflite',
+    '.onnx': 'onnx',
+}
+
+
+def backend_for_model(model_path):
+    """Name of the inference backend for `model_path`, chosen by its extension"""
+    extension = os.path.splitext(model_path)[1].lower()
+    if extension not in MODEL_FILE_BACKENDS:
+        raise ValueError(f"Unknown model file type '{extension}', expected one of: {', '.join(MODEL_FILE_BACKENDS)}")
+    return MODEL_FILE_BACKENDS[extension]
+
+
+def load_inference_backend(kind, model_path, num_threads=None, cache_dir=None):
+    """Load `model_path` with the inference backend named `kind`.
+
+    Backends that compile or optimize the model keep the result in
+    `cache_dir` when it is given, see artifact_path().
+    """
+    if kind not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{kind}', expected one of: {', '.join(INFERENCE_BACKENDS)}")
+
+    logger.info(f"Loading {model_path} with the {kind} inference backend")
+    if kind == 'keras':
+        return KerasBackend(model_path, cache_dir=cache_dir)
+    if kind == 'tflite':
+        return TFLiteBackend(model_path, num_threads=num_threads)
+    return OnnxBackend(model_path, num_threads=num_threads, cache_dir=cache_dir)
@@ -0,0 +1,63 @@
+import numpy as np
+
+# MediaPipe hand landmarks: 21 points of (x, y, z)
+NUM_LANDMARKS = 21
+LANDMARK_DIMS = 3
+FEATURE_SIZE = NUM_LANDMARKS * LANDMARK_DIMS
+
+
+def hand_landmarks_array(hand_landmarks):
+    """(21, 3) float32 array of a MediaPipe NormalizedLandmarkList"""
+    return np.array([(point.x, point.y, point.z) for point in hand_landmarks.landmark], dtype=np.float32)
+
+
+def _check_landmarks(points):
+    if not np.isfinite(points).all():
+        raise ValueError("Landmarks must be finite numbers")
+    return points
+
+
+def parse_landmark_container(data):
+    """(n, 21, 3) landmarks from a body of little-endian float32 values, 63 per hand"""
+    hand_bytes = FEATURE_SIZE * 4
+    if not data or len(data) % hand_bytes:
+        raise ValueError(f"Landmark body must hold a multiple of {hand_bytes} bytes "
+                         f"({NUM_LANDMARKS} x {LANDMARK_DIMS} float32 per hand)")
+    points = np.frombuffer(data, dtype='<f4').astype(np.float32)
+    return _check_landmarks(points.reshape(-1, NUM_LANDMARKS, LANDMARK_DIMS))
+
+
+def parse_landmark_json(value):
+    """Landmarks of one hand or a list of hands from decoded JSON.
+
+    A hand is 21 [x, y, z] points or 63 numbers. Returns the (n, 21, 3)
+    array and whether a list of hands was sent.
+    """
+    try:
+        points = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("Landmarks must be numeric arrays of equal length")
+
+    if points.shape in ((NUM_LANDMARKS, LANDMARK_DIMS), (FEATURE_SIZE,)):
+        return _check_landmarks(points.reshape(1, NUM_LANDMARKS, LANDMARK_DIMS)), False
+    if len(points) and points.shape[1:] in ((NUM_LANDMARKS, LANDMARK_DIMS), (FEATURE_SIZE,)):
+        return _check_landmarks(points.reshape(-1, NUM_LANDMARKS, LANDMARK_DIMS)), True
+    raise ValueError(f"Expected {NUM_LANDMARKS} [x, y, z] landmarks (or {FEATURE_SIZE} numbers) per hand, "
+                     f"got shape {list(points.shape)}")
+
+
+def landmark_features(points, aspect=1.0):
+    """Position- and scale-invariant classifier input for (n, 21, 3) landmarks.
+
+    Landmarks are MediaPipe's normalized image coordinates. x is multiplied
+    by the frame's aspect ratio (width / height, one for all hands or one
+    per hand) so hands on wide frames are not stretched. Every hand is then
+    moved so its wrist is the origin and scaled so its farthest landmark
+    lies at distance 1 in the image plane. Returns an (n, 63) float32 array.
+    """
+    points = np.array(points, dtype=np.float32)
+    points[..., 0] *= np.reshape(np.asarray(aspect, dtype=np.float32), (-1, 1))
+    points -= points[:, :1]
+    scale = np.linalg.norm(points[..., :2], axis=-1).max(axis=1)
+    points /= np.maximum(scale, 1e-6)[:, np.newaxis, np.newaxis]
+    return points.reshape(len(points), FEATURE_SIZE)
@@ -0,0 +1,95 @@
+import threading
+import time
+
+
+class FrameSuperseded(Exception):
+    """Raised for a frame replaced by a newer one of the same session before it started"""
+
+
+class _SessionSlot:
+    """Running and pending frame of one client session"""
+    __slots__ = ('latest', 'running', 'waiting', 'last_seen', 'changed')
+
+    def __init__(self, lock):
+        self.latest = 0
+        self.running = False
+        self.waiting = 0
+        self.last_seen = time.monotonic()
+        self.changed = threading.Condition(lock)
+
+
+class LatestFrameGate:
+    """Run the frames of each client session one at a time, newest first.
+
+    While a session's frame is being processed, only the most recent frame
+    that arrives after it waits for its turn; any older frame still waiting
+    is superseded and its caller gets FrameSuperseded right away. Lag is
+    bounded to one frame in progress per session, and sessions never wait
+    on each other. Slots of sessions idle for `idle_timeout` seconds are
+    dropped, and at most `max_sessions` are tracked.
+    """
+
+    def __init__(self, max_sessions=1024, idle_timeout=60.0):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout = float(idle_timeout)
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._superseded = 0
+
+    def run(self, session_id, fn):
+        """Call `fn` for the newest frame of `session_id`, raising FrameSuperseded for stale ones"""
+        with self._lock:
+            slot = self._slots.get(session_id)
+            if slot is None:
+                self._evict_idle()
+                slot = self._slots[session_id] = _SessionSlot(self._lock)
+            slot.latest += 1
+            frame = slot.latest
+            slot.last_seen = time.monotonic()
+            # Wake up an older waiting frame so it can notice it was superseded
+            slot.changed.notify_all()
+
+            slot.waiting += 1
+            while slot.running and slot.latest == frame:
+                slot.changed.wait()
+            slot.waiting -= 1
+            if slot.latest != frame:
+                self._superseded += 1
+                raise FrameSuperseded(f"Frame superseded by a newer frame of session {session_id}")
+            slot.running = True
+
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                slot.running = False
+                slot.last_seen = time.monotonic()
+                self._processed += 1
+                slot.changed.notify_all()
+
+    def stats(self):
+        """Return the number of tracked sessions and processed/superseded frames"""
+        with self._lock:
+            return {
+                "sessions": len(self._slots),
+                "max_sessions": self.max_sessions,
+                "running": sum(1 for slot in self._slots.values() if slot.running),
+                "processed": self._processed,
+                "superseded": self._superseded,
+            }
+
+    def _evict_idle(self):
+        """Drop slots nobody uses; caller holds the lock"""
+        now = time.monotonic()
+        idle = [(slot.last_seen, session_id) for session_id, slot in self._slots.items()
+                if not slot.running and not slot.waiting]
+        for last_seen, session_id in idle:
+            if now - last_seen > self.idle_timeout:
+                del self._slots[session_id]
+
+        # Still full: forget the least recently seen idle sessions
+        overflow = len(self._slots) - self.max_sessions + 1
+        if overflow > 0:
+            for _, session_id in sorted(idle)[:overflow]:
+                self._slots.pop(session_id, None)
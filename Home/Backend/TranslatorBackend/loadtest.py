@@ -0,0 +1,453 @@
+"""Load-test the Python detection servers and record the results as JSON.
+
+Examples:
+    python loadtest.py --server backend --duration 30 --concurrency 8 --output runs/backend.json
+    python loadtest.py --server backend-asgi --duration 30 --concurrency 64 --output runs/backend_asgi.json
+    python loadtest.py --server sinhala --images ~/recorded_frames --rate 20
+    python loadtest.py --url http://127.0.0.1:5000 --server backend --requests 500
+
+Unless --url is given the server is started locally on a free port. When its
+model file does not exist, a small stub Keras model with the right input and
+output shapes is generated first, so the harness runs offline on a CPU-only
+box without the real weights. Frames come from --images (recorded hand
+photos) or are synthetic; synthetic frames contain no hand and only exercise
+decoding and hand detection, which the `outcomes` section of the report
+makes visible.
+
+With --rate the requests follow an open-loop schedule and latency is counted
+from the scheduled send time, so a stalled server cannot hide its queueing
+delay; without it every worker sends back to back. The report holds
+throughput, latency percentiles, status and error counts and the CPU time
+and peak RSS of the server's whole process tree.
+"""
+import argparse
+import base64
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(HERE, '..', '..', '..'))
+
+# How to start, probe and call each server; paths are relative to the repo root
+SERVERS = {
+    'backend': {
+        'script': 'Home/Backend/TranslatorBackend/backend.py',
+        'default_model': 'Home/Backend/TranslatorBackend/sign_language_model.h5',
+        'input_size': 224,
+        'classes': 29,
+        'ready_path': '/ready',
+        'detect_path': '/detect-sign',
+    },
+    'backend-asgi': {
+        'script': 'Home/Backend/TranslatorBackend/backend_asgi.py',
+        'default_model': 'Home/Backend/TranslatorBackend/sign_language_model.h5',
+        'input_size': 224,
+        'classes': 29,
+        'ready_path': '/ready',
+        'detect_path': '/detect-sign',
+    },
+    'sinhala': {
+        'script': 'photo_detection_models/Sinhala_Photo_Detection2.py',
+        'default_model': 'hand_gesture_model_sinhala.h5',
+        'input_size': 200,
+        'classes': 10,
+        'ready_path': '/test',
+        'detect_path': '/detect',
+    },
+}
+
+
+def build_stub_model(path, input_size, classes):
+    """Save a tiny untrained Keras classifier with the served input and output shapes"""
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(input_size, input_size, 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=4, activation='relu'),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(classes, activation='softmax'),
+    ])
+    model.save(path)
+    return path
+
+
+def ensure_model(server, model_path, workdir):
+    """Return a model path for `server`, generating a stub when the file is missing"""
+    config = SERVERS[server]
+    model_path = model_path or os.path.join(REPO_ROOT, config['default_model'])
+    if os.path.exists(model_path):
+        return model_path, False
+
+    stub_path = os.path.join(workdir, f'stub_{server}.h5')
+    logger.info(f"Model '{model_path}' not found, generating a stub model at {stub_path}")
+    # TensorFlow is only needed for the stub, keep it out of the load generator
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        pool.apply(build_stub_model, (stub_path, config['input_size'], config['classes']))
+    return stub_path, True
+
+
+def load_corpus(images_dir, count=16, size=(1280, 720)):
+    """Encoded JPEG frames from `images_dir`, or `count` synthetic ones"""
+    import cv2
+
+    if images_dir:
+        frames = []
+        for path in sorted(glob.glob(os.path.join(images_dir, '*'))):
+            if os.path.splitext(path)[1].lower() in ('.jpg', '.jpeg', '.png', '.webp'):
+                with open(path, 'rb') as f:
+                    frames.append(f.read())
+        if not frames:
+            raise SystemExit(f"No images found in {images_dir}")
+        return frames, 'recorded'
+
+    rng = np.random.default_rng(0)
+    frames = []
+    width, height = size
+    xx, yy = np.meshgrid(np.linspace(0, 255, width), np.linspace(0, 255, height))
+    for i in range(count):
+        # Smooth gradients plus noise compress like camera frames, unlike pure noise
+        image = np.stack([(xx + i * 16) % 256, (yy + i * 8) % 256, (xx + yy) / 2], axis=-1)
+        image = np.clip(image + rng.normal(0, 8, image.shape), 0, 255).astype(np.uint8)
+        frames.append(cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes())
+    return frames, 'synthetic'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, model_path, port, extra_env, log_path):
+    """Start `server` as a subprocess and return it once it answers its ready probe"""
+    config = SERVERS[server]
+    script = os.path.join(REPO_ROOT, config['script'])
+    env = dict(os.environ, MODEL_PATH=model_path, PORT=str(port), **extra_env)
+    log = open(log_path, 'w')
+    process = subprocess.Popen([sys.executable, script], cwd=os.path.dirname(script), env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    return process, log
+
+
+def wait_ready(base_url, server, process=None, timeout=180):
+    """Poll the server's ready endpoint until the model is loaded"""
+    url = base_url + SERVERS[server]['ready_path']
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"Server exited with code {process.returncode} during startup")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                body = json.loads(response.read() or b'{}')
+                if server == 'sinhala' or body.get('ready'):
+                    return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Server at {base_url} was not ready after {timeout} s")
+
+
+def process_tree(pid):
+    """`pid` and all of its descendants, read from /proc"""
+    children = {}
+    for stat_path in glob.glob('/proc/[0-9]*/stat'):
+        try:
+            with open(stat_path) as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(stat_path.split('/')[2]))
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def tree_usage(pid):
+    """CPU seconds and resident MB summed over the process tree of `pid`"""
+    ticks = os.sysconf('SC_CLK_TCK')
+    page_mb = os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    cpu, rss = 0.0, 0.0
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            # utime and stime are fields 14 and 15 of /proc/<pid>/stat, rss is 24
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            rss += int(fields[21]) * page_mb
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu, rss
+
+
+class ResourceSampler(threading.Thread):
+    """Sample the CPU time and RSS of a process tree while the load runs"""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(name="resource-sampler", daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.samples = []
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            cpu, rss = tree_usage(self.pid)
+            self.samples.append((time.monotonic(), cpu, rss))
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        cpu, rss = tree_usage(self.pid)
+        self.samples.append((time.monotonic(), cpu, rss))
+        self.peak_rss_mb = max(self.peak_rss_mb, rss)
+
+
+def build_request(server, url, frame, encoding):
+    if server == 'sinhala' or encoding == 'json':
+        body = json.dumps({"image": base64.b64encode(frame).decode()}).encode()
+        return urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    return urllib.request.Request(url, data=frame, headers={'Content-Type': 'image/jpeg'})
+
+
+def classify_outcome(body):
+    """Coarse outcome of a successful response, to tell hand and no-hand traffic apart"""
+    if 'gestures' in body:
+        return 'hand' if body.get('detected') else 'no_hand'
+    if body.get('detected_sign'):
+        return 'sign'
+    message = body.get('message', '')
+    if 'No hand' in message:
+        return 'no_hand'
+    if 'superseded' in body:
+        return 'superseded'
+    return 'low_confidence'
+
+
+def run_load(base_url, server, frames, concurrency, rate, duration, total_requests, encoding, timeout):
+    """Send requests from `concurrency` threads and collect per-request results"""
+    url = base_url + SERVERS[server]['detect_path']
+    lock = threading.Lock()
+    counter = [0]
+    results = []
+    start = time.monotonic()
+    stop_at = start + duration if duration else None
+
+    def next_request():
+        with lock:
+            index = counter[0]
+            if total_requests and index >= total_requests:
+                return None
+            counter[0] += 1
+        scheduled = start + index / rate if rate else time.monotonic()
+        if stop_at is not None and scheduled >= stop_at:
+            return None
+        return index, scheduled
+
+    def worker():
+        while True:
+            item = next_request()
+            if item is None:
+                return
+            index, scheduled = item
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.monotonic()
+            status, outcome, error = None, None, None
+            try:
+                request = build_request(server, url, frames[index % len(frames)], encoding)
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    status = response.status
+                    outcome = classify_outcome(json.loads(response.read()))
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except Exception as e:
+                error = type(e).__name__
+            finished = time.monotonic()
+            # Open-loop latency includes the time spent behind schedule
+            latency = finished - (scheduled if rate else sent)
+            with lock:
+                results.append((finished, latency, status, outcome, error))
+
+    threads = [threading.Thread(target=worker, name=f"load-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.monotonic() - start
+
+
+def summarize(results, elapsed):
+    latencies = np.array([latency for _, latency, _, _, _ in results]) * 1000
+    ok = [r for r in results if r[2] == 200]
+    statuses, outcomes, errors = {}, {}, {}
+    for _, _, status, outcome, error in results:
+        if status is not None:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if outcome is not None:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+
+    summary = {
+        "requests": len(results),
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "success_rps": len(ok) / elapsed if elapsed else 0.0,
+        "error_rate": (1 - len(ok) / len(results)) if results else 0.0,
+        "status_codes": statuses,
+        "connection_errors": errors,
+        "outcomes": outcomes,
+    }
+    if len(latencies):
+        summary["latency_ms"] = {
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max()),
+        }
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Python sign detection servers")
+    parser.add_argument('--server', choices=sorted(SERVERS), default='backend')
+    parser.add_argument('--url', help="Target an already running server instead of starting one")
+    parser.add_argument('--model', help="Model file for the started server (a stub is generated if missing)")
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Extra environment for the started server, e.g. INFERENCE_BACKEND=onnx")
+    parser.add_argument('--images', help="Directory of recorded hand images (synthetic frames otherwise)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent client threads")
+    parser.add_argument('--rate', type=float, default=0, help="Open-loop request rate per second (0: closed loop)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to send requests for")
+    parser.add_argument('--requests', type=int, default=0, help="Stop after this many requests (0: no limit)")
+    parser.add_argument('--warmup', type=int, default=5, help="Untimed requests sent before measuring")
+    parser.add_argument('--encoding', choices=('binary', 'json'), default='binary',
+                        help="Upload format for backend.py and backend_asgi.py (the Sinhala server always takes JSON)")
+    parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    frames, corpus = load_corpus(args.images)
+    extra_env = dict(item.split('=', 1) for item in args.env)
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "host": {"platform": platform.platform(), "cpu_count": os.cpu_count(), "python": platform.python_version()},
+        "config": {key: value for key, value in vars(args).items() if key != 'output'},
+        "corpus": {"kind": corpus, "frames": len(frames)},
+    }
+
+    process = log = None
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.url:
+                base_url = args.url.rstrip('/')
+            else:
+                model_path, stub = ensure_model(args.server, args.model, workdir)
+                report["model"] = {"path": model_path, "stub": stub}
+                port = free_port()
+                log_path = os.path.join(workdir, 'server.log')
+                process, log = start_server(args.server, model_path, port, extra_env, log_path)
+                base_url = f'http://127.0.0.1:{port}'
+                startup = time.monotonic()
+                try:
+                    wait_ready(base_url, args.server, process)
+                except SystemExit:
+                    log.flush()
+                    with open(log_path) as f:
+                        logger.error("Server log:\n" + ''.join(f.readlines()[-20:]))
+                    raise
+                report["server_startup_seconds"] = time.monotonic() - startup
+            logger.info(f"Server ready at {base_url}")
+
+            if args.warmup:
+                run_load(base_url, args.server, frames, 1, 0, 0, args.warmup, args.encoding, args.timeout)
+
+            sampler = ResourceSampler(process.pid) if process is not None else None
+            if sampler is not None:
+                sampler.start()
+            client_cpu = time.process_time()
+            results, elapsed = run_load(base_url, args.server, frames, args.concurrency, args.rate,
+                                        args.duration, args.requests, args.encoding, args.timeout)
+            report["client_cpu_seconds"] = time.process_time() - client_cpu
+            report["results"] = summarize(results, elapsed)
+
+            if sampler is not None:
+                sampler.stop()
+                (start, cpu_start, _), (end, cpu_end, _) = sampler.samples[0], sampler.samples[-1]
+                report["server_process"] = {
+                    "pids": process_tree(process.pid),
+                    "cpu_seconds": cpu_end - cpu_start,
+                    "cpu_percent": 100 * (cpu_end - cpu_start) / (end - start) if end > start else 0.0,
+                    "peak_rss_mb": sampler.peak_rss_mb,
+                }
+        finally:
+            if process is not None:
+                for pid in reversed(process_tree(process.pid)[1:]):
+                    try:
+                        os.kill(pid, 15)
+                    except OSError:
+                        pass
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                log.close()
+
+    results = report["results"]
+    latency = results.get("latency_ms", {})
+    logger.info(f"{results['requests']} requests in {results['elapsed_seconds']:.1f} s: "
+                f"{results['throughput_rps']:.1f} req/s, error rate {results['error_rate']:.1%}, "
+                f"p50 {latency.get('p50', 0):.1f} ms, p95 {latency.get('p95', 0):.1f} ms, "
+                f"p99 {latency.get('p99', 0):.1f} ms")
+    if "server_process" in report:
+        logger.info(f"Server CPU {report['server_process']['cpu_percent']:.0f}%, "
+                    f"peak RSS {report['server_process']['peak_rss_mb']:.0f} MB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved report to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
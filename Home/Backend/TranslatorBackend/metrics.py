@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond decode work up to slow predictions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Cumulative latency histogram with bucket-interpolated quantiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate the q-quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if seen + self.counts[i] >= rank:
+                fraction = (rank - seen) / self.counts[i] if self.counts[i] else 0.0
+                return lower + (bound - lower) * fraction
+            seen += self.counts[i]
+            lower = bound
+        # Above the largest bucket the best estimate is its upper bound
+        return self.buckets[-1]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in sorted(labels)) + '}'
+
+
+class MetricsRegistry:
+    """Per-stage latency histograms and counters rendered in Prometheus text format"""
+
+    def __init__(self, namespace, quantiles=(0.5, 0.95, 0.99)):
+        self.namespace = namespace
+        self.quantiles = quantiles
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Record how long one pipeline stage took"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """Time the body of a `with` block as one observation of `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def describe(self, name, help_text):
+        """Set the HELP text of a counter"""
+        self._help[name] = help_text
+
+    def inc(self, name, amount=1, **labels):
+        """Increment the counter `name` with the given labels"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter(self, name, **labels):
+        """Current value of the counter `name` with exactly the given labels"""
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def stage_summary(self):
+        """Return count and p50/p95/p99 latency in milliseconds for each stage"""
+        with self._lock:
+            return {
+                stage: {
+                    "count": histogram.count,
+                    **{f"p{int(q * 100)}_ms": histogram.quantile(q) * 1000 for q in self.quantiles},
+                }
+                for stage, histogram in self._histograms.items()
+            }
+
+    def render(self, gauges=None):
+        """Render all metrics in the Prometheus text exposition format.
+
+        `gauges` maps a component name to a stats dict (such as the ones
+        returned by BatchScheduler.stats()); numeric values are exported
+        as gauges named <namespace>_<component>_<key>.
+        """
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            lines.append(f"# HELP {ns}_stage_duration_seconds Time spent in each request processing stage")
+            lines.append(f"# TYPE {ns}_stage_duration_seconds histogram")
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{ns}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{ns}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{ns}_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{ns}_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f"# HELP {ns}_stage_duration_quantile_seconds Estimated latency quantiles of each stage")
+            lines.append(f"# TYPE {ns}_stage_duration_quantile_seconds gauge")
+            for stage, histogram in sorted(self._histograms.items()):
+                for q in self.quantiles:
+                    lines.append(f'{ns}_stage_duration_quantile_seconds{{stage="{stage}",quantile="{q}"}} {histogram.quantile(q)}')
+
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                if name in self._help:
+                    lines.append(f"# HELP {ns}_{name} {self._help[name]}")
+                lines.append(f"# TYPE {ns}_{name} counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{ns}_{name}{_format_labels(labels)} {value}")
+
+        for component, stats in (gauges or {}).items():
+            if not stats:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# TYPE {ns}_{component}_{key} gauge")
+                lines.append(f"{ns}_{component}_{key} {value}")
+
+        return '\n'.join(lines) + '\n'
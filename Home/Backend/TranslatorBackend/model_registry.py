@@ -0,0 +1,300 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from model_slot import ModelSlot
+from preprocess import FITS
+
+logger = logging.getLogger(__name__)
+
+# Pixel scaling of float model inputs: (scale, offset)
+NORMALIZATIONS = {
+    'unit': (1 / 255.0, 0.0),
+    'symmetric': (1 / 127.5, -1.0),
+}
+
+
+class UnknownModelError(LookupError):
+    """No model is registered for the requested language and version"""
+
+
+class ModelLoadError(RuntimeError):
+    """The model failed to load and is not retried for `retry_after` more seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def read_labels(path):
+    """Class names from a labels file, one per line.
+
+    Teachable Machine's "0 Aana" lines are accepted too, the leading class
+    index is dropped.
+    """
+    labels = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            index, _, name = line.partition(' ')
+            labels.append(name.strip() if index.isdigit() and name.strip() else line)
+    return labels
+
+
+class ModelSpec:
+    """Where a language's model lives and how its inputs and outputs look"""
+
+    def __init__(self, language, version, model_path, labels, backend=None, color='bgr',
+                 normalization='unit', fit='letterbox', memory_mb=None):
+        if color not in ('bgr', 'rgb'):
+            raise ValueError(f"color must be 'bgr' or 'rgb', got '{color}'")
+        if normalization not in NORMALIZATIONS:
+            raise ValueError(f"normalization must be one of {sorted(NORMALIZATIONS)}, got '{normalization}'")
+        if fit not in FITS:
+            raise ValueError(f"fit must be one of {', '.join(FITS)}, got '{fit}'")
+        if not labels:
+            raise ValueError(f"Model {language}/{version} has no labels")
+        self.language = language.lower()
+        self.version = str(version)
+        self.model_path = model_path
+        self.labels = list(labels)
+        self.backend = backend
+        self.rgb = color == 'rgb'
+        self.normalization = normalization
+        self.fit = fit
+        self.memory_mb = memory_mb
+
+    @property
+    def key(self):
+        return self.language, self.version
+
+    def memory_bytes(self):
+        """Memory budgeted for the loaded model: `memory_mb`, or the model file's size"""
+        if self.memory_mb is not None:
+            return int(self.memory_mb * 1024 * 1024)
+        try:
+            return os.path.getsize(self.model_path)
+        except OSError:
+            return 0
+
+
+def load_manifest(path):
+    """Model specs listed in a JSON manifest.
+
+    The manifest has a `models` list; every entry names its `language`,
+    `version`, `model_path` and either `labels` or a `labels_path`, plus
+    optionally `backend`, `color`, `normalization`, `fit` and `memory_mb`. Paths
+    are relative to the manifest. The first version listed for a language
+    is its default unless another one sets `"default": true`. Returns the
+    specs and the default version of every language.
+    """
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    specs, defaults = [], {}
+    for entry in manifest.get('models', []):
+        try:
+            model_path = os.path.normpath(os.path.join(base_dir, entry['model_path']))
+            labels = entry.get('labels')
+            if labels is None:
+                labels = read_labels(os.path.join(base_dir, entry['labels_path']))
+            spec = ModelSpec(entry['language'], entry['version'], model_path, labels,
+                             backend=entry.get('backend'), color=entry.get('color', 'bgr'),
+                             normalization=entry.get('normalization', 'unit'), fit=entry.get('fit', 'letterbox'),
+                             memory_mb=entry.get('memory_mb'))
+        except KeyError as e:
+            raise ValueError(f"Manifest entry {entry} is missing {e}")
+        specs.append(spec)
+        if spec.language not in defaults or entry.get('default'):
+            defaults[spec.language] = spec.version
+    return specs, defaults
+
+
+class _Entry:
+    __slots__ = ('spec', 'slot', 'loading', 'memory_bytes', 'last_used', 'loads', 'evictions', 'error', 'failures',
+                 'retry_at')
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.slot = ModelSlot()
+        self.loading = False
+        self.memory_bytes = 0
+        self.last_used = None
+        self.loads = 0
+        self.evictions = 0
+        self.error = None
+        self.failures = 0
+        self.retry_at = None
+
+
+class ModelRegistry:
+    """Models of several sign languages and versions, loaded on first use.
+
+    `loader(spec)` loads and warms one model and returns its ServedModel.
+    A request for a model that is not loaded starts loading it in the
+    background and gets None, like a request during startup. Loaded models
+    are kept in least-recently-used order; once their estimated memory
+    exceeds `memory_budget` bytes the least recently used ones are unloaded.
+    Requests still running on an unloaded model finish on it first, see
+    ModelSlot. A model that failed to load is retried after `retry_backoff`
+    seconds, doubling with every further failure up to `max_backoff`; until
+    then requests for it get a ModelLoadError with the load's error.
+    """
+
+    def __init__(self, loader, memory_budget, retry_backoff=30.0, max_backoff=600.0):
+        self.loader = loader
+        self.memory_budget = memory_budget
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self._entries = {}
+        self._defaults = {}
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def register(self, spec, default=False):
+        """Add a model; the first version of a language is its default unless `default` is set later"""
+        with self._lock:
+            self._entries[spec.key] = _Entry(spec)
+            if default or spec.language not in self._defaults:
+                self._defaults[spec.language] = spec.version
+
+    def load_manifest(self, path):
+        """Register every model listed in the manifest at `path`"""
+        specs, defaults = load_manifest(path)
+        for spec in specs:
+            self.register(spec, default=defaults[spec.language] == spec.version)
+        logger.info(f"Registered {len(specs)} models for {', '.join(sorted(defaults)) or 'no languages'}")
+
+    def languages(self):
+        """Default version of every registered language"""
+        with self._lock:
+            return dict(self._defaults)
+
+    def resolve(self, language, version=None):
+        """The spec serving `language` at `version` (its default when None)"""
+        language = language.lower()
+        with self._lock:
+            version = version or self._defaults.get(language)
+            entry = self._entries.get((language, version))
+        if entry is None:
+            raise UnknownModelError(f"No model for language '{language}'"
+                                    + (f" version '{version}'" if version else ""))
+        return entry.spec
+
+    @contextmanager
+    def acquire(self, language, version=None):
+        """Pin the model of `language` for the body of a `with` block.
+
+        Yields None, after starting the load, while the model is not loaded.
+        Raises UnknownModelError for unregistered languages and versions and
+        ModelLoadError while a failed load waits to be retried.
+        """
+        entry = self._entries[self.resolve(language, version).key]
+        with entry.slot.acquire() as served:
+            if served is None:
+                self._start_load(entry)
+            else:
+                with self._lock:
+                    entry.last_used = time.time()
+                    if entry.spec.key in self._loaded:
+                        self._loaded.move_to_end(entry.spec.key)
+            yield served
+
+    def _start_load(self, entry):
+        with self._lock:
+            if entry.loading:
+                return
+            if entry.retry_at is not None and time.monotonic() < entry.retry_at:
+                raise ModelLoadError(f"The {entry.spec.language} model {entry.spec.version} failed to load: "
+                                     f"{entry.error}", max(1, math.ceil(entry.retry_at - time.monotonic())))
+            entry.loading = True
+        threading.Thread(target=self._load, args=(entry,), name=f"model-loader-{entry.spec.language}",
+                         daemon=True).start()
+
+    def _load(self, entry):
+        spec = entry.spec
+        logger.info(f"Loading {spec.language} model {spec.version} from {spec.model_path}...")
+        try:
+            served = self.loader(spec)
+        except Exception as e:
+            with self._lock:
+                entry.error = str(e)
+                entry.failures += 1
+                backoff = min(self.max_backoff, self.retry_backoff * 2 ** (entry.failures - 1))
+                entry.retry_at = time.monotonic() + backoff
+                entry.loading = False
+            logger.error(f"Error loading {spec.language} model {spec.version}: {str(e)}, retrying in {backoff:.0f} s")
+            return
+
+        entry.slot.swap(served)
+        with self._lock:
+            entry.memory_bytes = spec.memory_bytes()
+            entry.last_used = time.time()
+            entry.loads += 1
+            entry.error = None
+            entry.failures = 0
+            entry.retry_at = None
+            entry.loading = False
+            self._loaded[spec.key] = entry
+        logger.info(f"Loaded {spec.language} model {spec.version} ({served.load_seconds:.2f} s, "
+                    f"{entry.memory_bytes / 1024 / 1024:.1f} MB)")
+        self._evict(keep=spec.key)
+
+    def _evict(self, keep):
+        """Unload least recently used models until the loaded ones fit the budget"""
+        evicted = []
+        with self._lock:
+            used = sum(entry.memory_bytes for entry in self._loaded.values())
+            for key in list(self._loaded):
+                if used <= self.memory_budget:
+                    break
+                if key == keep:
+                    continue
+                entry = self._loaded.pop(key)
+                used -= entry.memory_bytes
+                entry.evictions += 1
+                self._evictions += 1
+                evicted.append(entry)
+            if used > self.memory_budget:
+                logger.warning(f"Loaded models use {used / 1024 / 1024:.1f} MB, "
+                               f"more than the budget of {self.memory_budget / 1024 / 1024:.1f} MB")
+
+        for entry in evicted:
+            logger.info(f"Unloading {entry.spec.language} model {entry.spec.version} to stay within the memory budget")
+            # In-flight requests finish on the model before it is closed
+            entry.slot.swap(None)
+
+    def stats(self):
+        """Return the budget, memory in use and the state of every registered model"""
+        with self._lock:
+            models = {}
+            for (language, version), entry in sorted(self._entries.items()):
+                models.setdefault(language, {})[version] = {
+                    "default": self._defaults.get(language) == version,
+                    "loaded": entry.spec.key in self._loaded,
+                    "loading": entry.loading,
+                    "memory_mb": entry.memory_bytes / 1024 / 1024 if entry.spec.key in self._loaded else 0.0,
+                    "last_used": entry.last_used,
+                    "loads": entry.loads,
+                    "evictions": entry.evictions,
+                    "error": entry.error,
+                    "failures": entry.failures,
+                    "labels": len(entry.spec.labels),
+                }
+            return {
+                "memory_budget_mb": self.memory_budget / 1024 / 1024,
+                "memory_used_mb": sum(entry.memory_bytes for entry in self._loaded.values()) / 1024 / 1024,
+                "loaded": len(self._loaded),
+                "registered": len(self._entries),
+                "evictions": self._evictions,
+                "languages": models,
+            }
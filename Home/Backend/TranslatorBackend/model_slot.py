@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 of a model file, or None when `path` is not a regular file"""
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ServedModel:
+    """A loaded inference backend together with its own batching scheduler.
+
+    `labels` names the model's output classes, `language` is the sign
+    language it recognises and `input_format` how crops are prepared for it
+    (see preprocess.InputFormat). Models in a cascade tier carry the
+    per-class confidence `thresholds` their answers must reach.
+    """
+
+    def __init__(self, backend, scheduler, model_path, load_seconds, labels=None, language=None, input_format=None,
+                 thresholds=None):
+        self.backend = backend
+        self.scheduler = scheduler
+        self.model_path = model_path
+        self.backend_name = backend.name
+        self.checksum = file_checksum(model_path)
+        self.version = self.checksum[:12] if self.checksum else None
+        self.loaded_at = datetime.now().isoformat()
+        self.load_seconds = load_seconds
+        self.labels = labels
+        self.language = language
+        self.input_format = input_format
+        self.thresholds = thresholds
+        self.in_flight = 0
+        self.retired = False
+
+    def predict(self, batch, timeout=None):
+        return self.scheduler.submit(batch, timeout)
+
+    def close(self):
+        """Finish queued predictions and drop the references to the model"""
+        self.scheduler.close()
+        self.backend = None
+        logger.info(f"Released model {self.model_path} (version {self.version})")
+
+    def info(self):
+        return {
+            "model_name": os.path.basename(self.model_path),
+            "model_path": self.model_path,
+            "language": self.language,
+            "backend": self.backend_name,
+            "version": self.version,
+            "checksum": self.checksum,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "in_flight": self.in_flight,
+        }
+
+
+class ModelSlot:
+    """Holds the model being served and swaps in a new one without downtime.
+
+    Requests pin the current model with `acquire()` for their whole
+    duration. `swap()` replaces it atomically: new requests get the new
+    model right away while requests already running finish on the old one,
+    which is closed once its last request has released it.
+    """
+
+    def __init__(self):
+        self._current = None
+        self._draining = []
+        self._swaps = 0
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        return self._current
+
+    @contextmanager
+    def acquire(self):
+        """Pin the current model for the body of a `with` block; yields None before the first load"""
+        with self._lock:
+            served = self._current
+            if served is not None:
+                served.in_flight += 1
+        try:
+            yield served
+        finally:
+            if served is not None:
+                self._release(served)
+
+    def swap(self, served):
+        """Start serving `served` and retire the previous model"""
+        with self._lock:
+            old, self._current = self._current, served
+            self._swaps += 1
+            if old is None:
+                return None
+            old.retired = True
+            drained = old.in_flight == 0
+            if not drained:
+                self._draining.append(old)
+
+        if drained:
+            old.close()
+        else:
+            logger.info(f"Draining {old.in_flight} in-flight requests from model version {old.version}")
+        return old
+
+    def stats(self):
+        """Return the current model and the retired models still finishing requests"""
+        with self._lock:
+            return {
+                "current": self._current.info() if self._current is not None else None,
+                "draining": [served.info() for served in self._draining],
+                "swaps": self._swaps,
+            }
+
+    def _release(self, served):
+        with self._lock:
+            served.in_flight -= 1
+            drained = served.retired and served.in_flight == 0
+            if drained:
+                self._draining.remove(served)
+
+        if drained:
+            # Closing joins the scheduler worker, keep that off the request thread
+            threading.Thread(target=served.close, name="model-drain", daemon=True).start()
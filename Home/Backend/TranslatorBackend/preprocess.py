@@ -0,0 +1,174 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+# How a hand crop is fitted into the square model input
+FITS = ('letterbox', 'stretch')
+
+
+class InputFormat:
+    """What a model expects as input: square size, channel order, pixel scaling and crop fit.
+
+    Float inputs are `pixel * scale + offset`, e.g. [0, 1] for the default
+    scale of 1/255 or [-1, 1] for scale 1/127.5 and offset -1. `fit` is
+    'letterbox' (the crop keeps its aspect ratio on a black square) or
+    'stretch' (the crop is resized to the square, as the
+    photo_detection_models scripts do).
+    """
+    __slots__ = ('size', 'rgb', 'scale', 'offset', 'fit')
+
+    def __init__(self, size=224, rgb=False, scale=1 / 255.0, offset=0.0, fit='letterbox'):
+        if fit not in FITS:
+            raise ValueError(f"fit must be one of {', '.join(FITS)}, got '{fit}'")
+        self.size = int(size)
+        self.rgb = bool(rgb)
+        self.scale = np.float32(scale)
+        self.offset = np.float32(offset)
+        self.fit = fit
+
+    def info(self):
+        return {"size": self.size, "channels": "rgb" if self.rgb else "bgr",
+                "scale": float(self.scale), "offset": float(self.offset), "fit": self.fit}
+
+
+DEFAULT_INPUT_FORMAT = InputFormat()
+
+
+class InputBuffers(threading.local):
+    """Letterbox canvas and model input batch of one thread, allocated once.
+
+    The batch is only valid until the thread prepares its next input, which
+    is fine because request threads block until their prediction returns.
+    """
+
+    def __init__(self, size=224):
+        self.size = size
+        self.canvas = np.zeros((size, size, 3), dtype=np.uint8)
+        self.batch = np.empty((1, size, size, 3), dtype=np.float32)
+
+
+def letterbox_crop(image, box, canvas):
+    """Resize `image` inside `box` into the centre of the square `canvas`.
+
+    This has the geometry of padding the crop to a black square and resizing
+    that square to the canvas size, but only the crop is resampled and no
+    intermediate image is allocated. `box` is (x_min, y_min, x_max, y_max).
+    """
+    x_min, y_min, x_max, y_max = box
+    width, height = x_max - x_min, y_max - y_min
+    max_dim = max(width, height)
+    size = canvas.shape[0]
+    scale = size / max_dim
+    resized_width = min(size, max(1, round(width * scale)))
+    resized_height = min(size, max(1, round(height * scale)))
+    # Where the padded square would have put the crop, scaled to the canvas
+    offset_x = min(size - resized_width, round((max_dim - width) // 2 * scale))
+    offset_y = min(size - resized_height, round((max_dim - height) // 2 * scale))
+
+    # Black letterbox bars around the crop
+    canvas[:offset_y] = 0
+    canvas[offset_y + resized_height:] = 0
+    canvas[offset_y:offset_y + resized_height, :offset_x] = 0
+    canvas[offset_y:offset_y + resized_height, offset_x + resized_width:] = 0
+
+    target = canvas[offset_y:offset_y + resized_height, offset_x:offset_x + resized_width]
+    resized = cv2.resize(image[y_min:y_max, x_min:x_max], (resized_width, resized_height), dst=target)
+    if not np.shares_memory(resized, canvas):
+        # OpenCV could not write into the view directly
+        target[...] = resized
+    return canvas
+
+
+def stretch_crop(image, box, canvas):
+    """Resize `image` inside `box` to fill the square `canvas`, ignoring its aspect ratio"""
+    x_min, y_min, x_max, y_max = box
+    resized = cv2.resize(image[y_min:y_max, x_min:x_max], canvas.shape[1::-1], dst=canvas)
+    if not np.shares_memory(resized, canvas):
+        canvas[...] = resized
+    return canvas
+
+
+def crop_into(image, box, canvas, input_format=DEFAULT_INPUT_FORMAT):
+    """Fit the crop inside `box` into `canvas` as `input_format` says, see letterbox_crop()"""
+    if input_format.fit == 'stretch':
+        return stretch_crop(image, box, canvas)
+    return letterbox_crop(image, box, canvas)
+
+
+def _scale_into(canvas, out, input_format):
+    pixels = canvas[..., ::-1] if input_format.rgb else canvas
+    np.multiply(pixels, input_format.scale, out=out)
+    if input_format.offset:
+        out += input_format.offset
+
+
+def normalize_into(canvas, batch, pixel_input=False, input_format=DEFAULT_INPUT_FORMAT):
+    """Turn a letterboxed uint8 canvas into a model input batch of one.
+
+    Models that take raw pixels get a view of the canvas (a copy for RGB
+    models); everything else gets the canvas scaled as `input_format`
+    says, [0, 1] by default, in the reused float32 `batch`.
+    """
+    if pixel_input:
+        if input_format.rgb:
+            return np.ascontiguousarray(canvas[np.newaxis, ..., ::-1])
+        return canvas[np.newaxis]
+    _scale_into(canvas, batch[0], input_format)
+    return batch
+
+
+def letterbox_into_batch(image, box, batch, row, canvas, input_format=DEFAULT_INPUT_FORMAT):
+    """Letterbox a crop into row `row` of a preallocated uint8 or float32 batch.
+
+    Models with a 'stretch' fit get the crop stretched instead, see InputFormat.
+
+    uint8 batches hold raw pixels and are written directly (BGR models) or
+    through `canvas` (RGB models); float32 batches go through `canvas` and
+    are scaled as `input_format` says.
+    """
+    if batch.dtype == np.uint8:
+        if input_format.rgb:
+            batch[row] = crop_into(image, box, canvas, input_format)[..., ::-1]
+        else:
+            crop_into(image, box, batch[row], input_format)
+    else:
+        _scale_into(crop_into(image, box, canvas, input_format), batch[row], input_format)
+
+
+def thumbnail(image, width):
+    """`image` shrunk to `width` pixels wide, area-averaged, for cheap whole-frame checks"""
+    height, image_width = image.shape[:2]
+    size = (width, max(1, round(width * height / image_width)))
+    if image_width > width * 4:
+        # Area averaging a large photo costs milliseconds; sampling it down to
+        # four times the thumbnail first keeps this well below one
+        image = cv2.resize(image, (size[0] * 4, size[1] * 4), interpolation=cv2.INTER_NEAREST)
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def resize_canvas(canvas, out):
+    """A letterboxed canvas resized into the smaller square canvas `out`.
+
+    Used to feed a model with a smaller input the crop already letterboxed
+    for the full-size model; returns `canvas` itself when the sizes match.
+    """
+    if out.shape[0] == canvas.shape[0]:
+        return canvas
+    resized = cv2.resize(canvas, out.shape[1::-1], dst=out, interpolation=cv2.INTER_AREA)
+    if not np.shares_memory(resized, out):
+        out[...] = resized
+    return out
+
+
+def square_crop(image, box):
+    """The crop inside `box` centred on a black square, as used for debug images"""
+    x_min, y_min, x_max, y_max = box
+    width, height = x_max - x_min, y_max - y_min
+    max_dim = max(width, height)
+    square = np.zeros((max_dim, max_dim, 3), dtype=np.uint8)
+    offset_x = (max_dim - width) // 2
+    offset_y = (max_dim - height) // 2
+    square[offset_y:offset_y + height, offset_x:offset_x + width] = image[y_min:y_max, x_min:x_max]
+    return square
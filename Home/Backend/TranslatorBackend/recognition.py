@@ -0,0 +1,159 @@
+import os
+from contextlib import nullcontext
+
+import cv2
+
+from hands_pool import process_image
+from landmarks import hand_landmarks_array
+
+# Signs of the default model, in the order of its outputs
+labels = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M',
+          'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z',
+          'space', 'del', 'nothing']
+
+# Inference backend: 'keras' serves the H5 model, 'tflite' a converted
+# (optionally float16/INT8 quantized) model, see convert_tflite.py, and
+# 'onnx' a model exported with export_onnx.py
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras')
+DEFAULT_MODEL_PATHS = {
+    'keras': 'sign_language_model.h5',
+    'tflite': 'sign_language_model.tflite',
+    'onnx': 'sign_language_model.onnx',
+}
+MODEL_PATH = os.environ.get('MODEL_PATH', DEFAULT_MODEL_PATHS.get(INFERENCE_BACKEND, 'sign_language_model.h5'))
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', 0)) or None
+
+# MediaPipe runs on a copy downscaled so that its longer side is at most
+# DETECTION_MAX_SIDE pixels; the hand is still cropped at full resolution (0: off)
+DETECTION_MAX_SIDE = int(os.environ.get('DETECTION_MAX_SIDE', 640))
+
+# Optional skin-colour pre-filter: frames whose HAND_PREFILTER_SIZE pixels wide
+# thumbnail is less than HAND_PREFILTER_THRESHOLD skin coloured are answered
+# "no hand" without running MediaPipe (0: off); see evaluate_prefilter.py
+HAND_PREFILTER_THRESHOLD = float(os.environ.get('HAND_PREFILTER_THRESHOLD', 0))
+HAND_PREFILTER_SIZE = int(os.environ.get('HAND_PREFILTER_SIZE', 48))
+
+# Classifier of client-side hand landmarks for /detect-sign/landmarks, trained
+# with train_landmark_model.py; the endpoint answers 503 when the file is missing
+LANDMARK_MODEL_PATH = os.environ.get('LANDMARK_MODEL_PATH', 'landmark_model.h5')
+
+# Two-tier CNN cascade: a small model (e.g. 96x96 input) at SMALL_MODEL_PATH
+# classifies the crop first and its answer is kept when the confidence reaches
+# that class's threshold from SMALL_MODEL_THRESHOLDS (see calibrate_small_model.py,
+# SMALL_MODEL_THRESHOLD without the file); otherwise the full model runs. Without
+# the model file every crop goes to the full model
+SMALL_MODEL_PATH = os.environ.get('SMALL_MODEL_PATH', 'sign_language_model_small.h5')
+SMALL_MODEL_THRESHOLDS = os.environ.get('SMALL_MODEL_THRESHOLDS', 'small_model_thresholds.json')
+SMALL_MODEL_THRESHOLD = float(os.environ.get('SMALL_MODEL_THRESHOLD', 0.9))
+
+
+def mediapipe_hands():
+    """The MediaPipe hands solution, imported on first use"""
+    import mediapipe as mp
+    return mp.solutions.hands
+
+
+def create_static_hands():
+    """Create a MediaPipe Hands instance that runs full detection on every image"""
+    return mediapipe_hands().Hands(
+        static_image_mode=True,
+        max_num_hands=1,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+def create_tracking_hands():
+    """Create a MediaPipe Hands instance that tracks landmarks between frames"""
+    return mediapipe_hands().Hands(
+        static_image_mode=False,
+        max_num_hands=1,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+def _untimed(stage):
+    return nullcontext()
+
+
+def detect_and_crop_hand(image, detector=None, pool=None, debug=False, max_side=None, prefilter=None, timer=None):
+    """Detect and crop the hand region using MediaPipe.
+
+    Returns the hand's bounding box (x_min, y_min, x_max, y_max) in `image`
+    with padding, whether a hand was found, the debug image and the hand's
+    (21, 3) landmarks in normalized image coordinates (None without a hand).
+    Detection runs on `detector`, or on one checked out of the HandsPool
+    `pool` just for the MediaPipe call. It runs on a copy no larger than
+    `max_side` (DETECTION_MAX_SIDE by default) while the crop is taken from
+    the full-resolution image. The annotated debug image is only rendered
+    when `debug` is set and is None otherwise. Frames the HandPrefilter
+    `prefilter` rejects skip MediaPipe. `timer(stage)` times the stages, as
+    MetricsRegistry.time() does in the server.
+    """
+    timer = timer or _untimed
+    if prefilter is not None and prefilter.enabled:
+        with timer('prefilter'):
+            if not prefilter.may_contain_hand(image):
+                return None, False, image, None
+
+    image_height, image_width = image.shape[:2]
+
+    # MediaPipe downsamples to its own input size anyway, so large uploads
+    # are shrunk first; landmarks are normalized and map straight back
+    if max_side is None:
+        max_side = DETECTION_MAX_SIDE
+    scale = max_side / max(image_width, image_height) if max_side else 1.0
+    if scale < 1.0:
+        # Bilinear like MediaPipe's own resampling; INTER_AREA costs more than it saves here
+        with timer('downscale'):
+            detection_image = cv2.resize(image, (round(image_width * scale), round(image_height * scale)),
+                                         interpolation=cv2.INTER_LINEAR)
+    else:
+        detection_image = image
+
+    # Convert BGR image to RGB
+    rgb_image = cv2.cvtColor(detection_image, cv2.COLOR_BGR2RGB)
+
+    # Process the image and find hands
+    if detector is not None:
+        results = process_image(detector, rgb_image)
+    else:
+        with pool.checkout() as pooled_detector:
+            results = process_image(pooled_detector, rgb_image)
+
+    if results.multi_hand_landmarks:
+        # Get the first detected hand
+        hand_landmarks = results.multi_hand_landmarks[0]
+
+        # Find bounding box coordinates
+        x_min, y_min = image_width, image_height
+        x_max, y_max = 0, 0
+
+        for landmark in hand_landmarks.landmark:
+            x, y = int(landmark.x * image_width), int(landmark.y * image_height)
+            x_min = min(x_min, x)
+            y_min = min(y_min, y)
+            x_max = max(x_max, x)
+            y_max = max(y_max, y)
+
+        # Add padding
+        padding = int(max(image_width, image_height) * 0.1)
+        x_min = max(0, x_min - padding)
+        y_min = max(0, y_min - padding)
+        x_max = min(image_width, x_max + padding)
+        y_max = min(image_height, y_max + padding)
+
+        debug_image = None
+        if debug:
+            # Create a debug image with landmarks drawn on it
+            debug_image = image.copy()
+            from mediapipe.python.solutions import drawing_utils
+            drawing_utils.draw_landmarks(debug_image, hand_landmarks, mediapipe_hands().HAND_CONNECTIONS)
+
+            # Draw bounding box
+            cv2.rectangle(debug_image, (x_min, y_min), (x_max, y_max), (0, 255, 0), 2)
+
+        return (x_min, y_min, x_max, y_max), True, debug_image, hand_landmarks_array(hand_landmarks)
+
+    return None, False, image, None
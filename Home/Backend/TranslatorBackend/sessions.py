@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitError(Exception):
+    """Raised when the maximum number of streaming sessions is already open"""
+
+
+class StreamSession:
+    """State kept for one client streaming camera frames over a connection"""
+
+    def __init__(self, session_id, detector):
+        self.session_id = session_id
+        # MediaPipe Hands in tracking mode, owned by this session only
+        self.detector = detector
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self.frames = 0
+
+    def touch(self):
+        """Record activity on the session"""
+        self.last_active = time.monotonic()
+        self.frames += 1
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_active
+
+
+class SessionManager:
+    """Open, track and close streaming sessions.
+
+    Every session gets its own detector from `detector_factory`, so MediaPipe
+    can track landmarks from one frame to the next instead of running palm
+    detection on every frame. At most `max_sessions` are open at once and
+    sessions idle for longer than `idle_timeout` seconds are closed.
+    """
+
+    def __init__(self, detector_factory, max_sessions=32, idle_timeout=30.0):
+        self.detector_factory = detector_factory
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout = float(idle_timeout)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._rejected = 0
+        self._expired = 0
+
+    def open(self):
+        """Create a new session, raising SessionLimitError when at capacity"""
+        self.close_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                self._rejected += 1
+                raise SessionLimitError(f"Too many streaming sessions ({self.max_sessions} open)")
+            session = StreamSession(uuid.uuid4().hex, None)
+            self._sessions[session.session_id] = session
+            self._opened += 1
+
+        try:
+            session.detector = self.detector_factory()
+        except Exception:
+            self.close(session.session_id)
+            raise
+
+        logger.info(f"Opened streaming session {session.session_id}")
+        return session
+
+    def close(self, session_id):
+        """Close a session and release its detector"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+
+        if session.detector is not None:
+            try:
+                session.detector.close()
+            except Exception as e:
+                logger.warning(f"Error closing detector of session {session_id}: {str(e)}")
+        logger.info(f"Closed streaming session {session_id} after {session.frames} frames")
+
+    def close_idle(self):
+        """Close every session that has been idle longer than the timeout"""
+        with self._lock:
+            expired = [session_id for session_id, session in self._sessions.items()
+                       if session.idle_seconds() > self.idle_timeout]
+            self._expired += len(expired)
+        for session_id in expired:
+            self.close(session_id)
+
+    def stats(self):
+        """Return the configuration and counters of the session manager"""
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_timeout": self.idle_timeout,
+                "opened": self._opened,
+                "rejected": self._rejected,
+                "expired": self._expired,
+            }
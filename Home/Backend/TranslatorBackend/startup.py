@@ -0,0 +1,84 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def process_age():
+    """Seconds since this process was started, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 (starttime) counted after the parenthesised command name
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTracker:
+    """Readiness of the startup tasks and when each startup milestone was reached.
+
+    The server is ready once every task in `required` has been marked done.
+    Milestones are recorded once, in seconds since the process started (or
+    since the tracker was created where the process start is unknown), so
+    cold-start time can be read from a running server.
+    """
+
+    def __init__(self, required):
+        self.required = tuple(required)
+        self._started = time.monotonic() - (process_age() or 0.0)
+        self._lock = threading.Lock()
+        self._seconds = {}
+        self._errors = {}
+
+    def mark(self, milestone):
+        """Record that `milestone` was reached, keeping the first time only"""
+        if milestone in self._seconds:
+            return
+        with self._lock:
+            if milestone not in self._seconds:
+                self._seconds[milestone] = time.monotonic() - self._started
+                self._errors.pop(milestone, None)
+                logger.info(f"Startup: {milestone} after {self._seconds[milestone]:.2f} s")
+
+    def fail(self, milestone, error):
+        """Record why a startup task failed; it can still be marked done later"""
+        with self._lock:
+            self._errors[milestone] = str(error)
+
+    def run_in_background(self, milestone, fn):
+        """Run `fn` in a daemon thread and mark `milestone` when it returns"""
+        def run():
+            try:
+                fn()
+                self.mark(milestone)
+            except Exception as e:
+                logger.error(f"Startup task {milestone} failed: {str(e)}")
+                self.fail(milestone, e)
+
+        thread = threading.Thread(target=run, name=f"startup-{milestone}", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self):
+        return all(milestone in self._seconds for milestone in self.required)
+
+    def stats(self):
+        """Return readiness, pending tasks, milestone times and task errors"""
+        with self._lock:
+            return {
+                "ready": all(milestone in self._seconds for milestone in self.required),
+                "pending": [milestone for milestone in self.required if milestone not in self._seconds],
+                "seconds": dict(self._seconds),
+                "errors": dict(self._errors),
+            }
+
+    def gauges(self):
+        """Numeric view of stats() for the metrics exporter"""
+        stats = self.stats()
+        return {"ready": int(stats["ready"]), **{f"{name}_seconds": value for name, value in stats["seconds"].items()}}
@@ -0,0 +1,16 @@
+import os
+import sys
+
+# Importing backend must not leave a log file in the working directory
+os.environ.setdefault('LOG_FILE', '')
+
+# The backend modules are imported by name, like backend.py does
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Hand photos committed elsewhere in the repository, used as fixed test images
+REPO_ROOT = os.path.abspath(os.path.join(BACKEND_DIR, '..', '..', '..'))
+HAND_IMAGES = [
+    os.path.join(REPO_ROOT, 'Quizz', 'assets', 'download.jpeg'),
+    os.path.join(REPO_ROOT, 'Quizz', 'assets', 'naan.jpg'),
+]
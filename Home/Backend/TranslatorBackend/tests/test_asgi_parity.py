@@ -0,0 +1,249 @@
+import asyncio
+import base64
+import io
+import json
+import os
+from urllib.parse import urlsplit
+
+import numpy as np
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('mediapipe')
+import cv2
+
+import backend
+import backend_asgi
+from admission import AdmissionController
+from asgi_bridge import AsgiBridge
+from conftest import HAND_IMAGES
+from model_slot import ModelSlot, ServedModel
+from preprocess import DEFAULT_INPUT_FORMAT
+
+BOUNDARY = 'parity-boundary'
+
+
+class StubBackend:
+    """Deterministic stand-in for the sign model: the class follows the crop's brightness"""
+    name = 'stub'
+    pixel_input = False
+
+    def predict(self, batch):
+        predictions = np.full((len(batch), len(backend.labels)), 0.1 / (len(backend.labels) - 1), dtype=np.float32)
+        for row, image in enumerate(batch):
+            predictions[row, int(float(image.mean()) * 1000) % len(backend.labels)] = 0.9
+        return predictions
+
+
+@pytest.fixture(autouse=True)
+def stub_model(monkeypatch):
+    stub = StubBackend()
+    slot = ModelSlot()
+    slot.swap(ServedModel(stub, backend.create_batch_scheduler(stub), 'stub_model', 0.0, labels=backend.labels,
+                          language=backend.DEFAULT_LANGUAGE, input_format=DEFAULT_INPUT_FORMAT))
+    monkeypatch.setattr(backend, 'model_slot', slot)
+    # Both servers see the same frames, keep the first one's answer out of the second's
+    backend.prediction_cache.clear()
+    yield
+    slot.current.scheduler.close()
+
+
+def hand_jpeg():
+    path = next((path for path in HAND_IMAGES if os.path.exists(path)), None)
+    if path is None:
+        pytest.skip("The repository's hand photos are missing")
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def empty_jpeg():
+    return cv2.imencode('.jpg', np.full((240, 320, 3), 90, dtype=np.uint8))[1].tobytes()
+
+
+def multipart(fields):
+    """Encode `fields` ({name: bytes or (filename, bytes)}) as a multipart/form-data body"""
+    parts = []
+    for name, value in fields.items():
+        if isinstance(value, tuple):
+            filename, value = value
+            parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                         f'Content-Type: image/jpeg\r\n\r\n'.encode() + value + b'\r\n')
+        else:
+            parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+                         + value + b'\r\n')
+    return b''.join(parts) + f'--{BOUNDARY}--\r\n'.encode()
+
+
+def flask_request(method, url, body=b'', headers=None, chunked=False):
+    """Send a request through the Flask app; `chunked` sends the body without a length"""
+    client = backend.app.test_client()
+    if chunked:
+        # WSGI servers decode chunked uploads and mark the input as terminated
+        response = client.open(url, method=method, input_stream=io.BytesIO(body),
+                               headers={**(headers or {}), 'Transfer-Encoding': 'chunked'},
+                               environ_overrides={'wsgi.input_terminated': True})
+    else:
+        response = client.open(url, method=method, data=body, headers=headers or {})
+    return response.status_code, dict(response.headers), response.get_data()
+
+
+async def call_asgi(app, method, url, chunks, headers):
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': parts.path,
+        'root_path': '',
+        'query_string': parts.query.encode(),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 40000),
+    }
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+                for index, chunk in enumerate(chunks or [b''])]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # The whole body was read, the connection stays open until the answer is sent
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    response_headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in start['headers']}
+    return start['status'], response_headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def asgi_request(method, url, body=b'', headers=None, chunk_size=None, app=None):
+    """Send a request through the ASGI app; `chunk_size` splits the body like a chunked upload"""
+    headers = dict(headers or {})
+    if chunk_size:
+        chunks = [body[start:start + chunk_size] for start in range(0, len(body), chunk_size)]
+    else:
+        headers['Content-Length'] = str(len(body))
+        chunks = [body]
+    return asyncio.run(call_asgi(app or backend_asgi.app, method, url, chunks, headers))
+
+
+def normalized(response):
+    status, headers, body = response
+    headers = {name.lower(): value for name, value in headers.items()}
+    try:
+        content = json.loads(body)
+        if isinstance(content, dict):
+            content.pop('timestamp', None)
+    except ValueError:
+        content = body
+    return status, headers.get('content-type'), 'retry-after' in headers, content
+
+
+def assert_same(method, url, body=b'', headers=None):
+    """Send one request to both servers and return the Flask response after comparing them"""
+    expected = normalized(flask_request(method, url, body, headers))
+    assert normalized(asgi_request(method, url, body, headers)) == expected
+    return expected
+
+
+def test_health_and_supported_signs():
+    assert assert_same('GET', '/health')[0] == 200
+    status, _, _, content = assert_same('GET', '/supported-signs')
+    assert status == 200 and content["symbols"] == backend.labels
+    assert assert_same('GET', '/supported-signs?language=xx')[0] == 400
+
+
+def test_detect_sign_raw_multipart_and_json():
+    image = hand_jpeg()
+    expected = assert_same('POST', '/detect-sign', image, {'Content-Type': 'image/jpeg'})
+    assert expected[0] == 200 and expected[3]["detected_sign"]
+
+    # The same image in the other upload modes gets the same answer
+    body = multipart({'image': ('hand.jpg', image), 'language': b'en'})
+    assert assert_same('POST', '/detect-sign', body,
+                       {'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}) == expected
+    body = json.dumps({"image": "data:image/jpeg;base64," + base64.b64encode(image).decode()}).encode()
+    assert assert_same('POST', '/detect-sign', body, {'Content-Type': 'application/json'}) == expected
+
+    status, _, _, content = assert_same('POST', '/detect-sign', empty_jpeg(), {'Content-Type': 'image/jpeg'})
+    assert status == 200 and content["detected_sign"] == ""
+
+
+def test_chunked_uploads():
+    image = hand_jpeg()
+    expected = normalized(flask_request('POST', '/detect-sign', image, {'Content-Type': 'image/jpeg'}))
+    assert expected[0] == 200
+
+    for body, content_type in ((image, 'image/jpeg'),
+                               (multipart({'image': ('hand.jpg', image)}), f'multipart/form-data; boundary={BOUNDARY}')):
+        headers = {'Content-Type': content_type}
+        assert normalized(flask_request('POST', '/detect-sign', body, headers, chunked=True)) == expected
+        assert normalized(asgi_request('POST', '/detect-sign', body, headers, chunk_size=777)) == expected
+
+
+@pytest.mark.parametrize('url, body, content_type', [
+    ('/detect-sign', b'', 'image/jpeg'),
+    ('/detect-sign', b'garbage', 'image/jpeg'),
+    ('/detect-sign', b'{}', 'application/json'),
+    ('/detect-sign?language=xx', b'garbage', 'image/jpeg'),
+    ('/detect-sign/batch', b'\x00\x00\x00\x09abc', backend.BATCH_CONTAINER_TYPE),
+    ('/detect-sign/batch', b'{"images": "abc"}', 'application/json'),
+    ('/detect-sign/batch', b'{"images": {"a": "abc"}}', 'application/json'),
+])
+def test_bad_requests(url, body, content_type):
+    assert assert_same('POST', url, body, {'Content-Type': content_type})[0] == 400
+
+
+def test_too_many_batch_images(monkeypatch):
+    monkeypatch.setattr(backend, 'BATCH_MAX_IMAGES', 2)
+    image = empty_jpeg()
+    body = b''.join(len(image).to_bytes(4, 'big') + image for _ in range(3))
+    assert assert_same('POST', '/detect-sign/batch', body, {'Content-Type': backend.BATCH_CONTAINER_TYPE})[0] == 413
+
+
+def test_overloaded(monkeypatch):
+    admission = AdmissionController(1, max_queue=0, queue_timeout=0)
+    monkeypatch.setattr(backend, 'admission', admission)
+    with admission.admit():
+        status, _, retry_after, _ = assert_same('POST', '/detect-sign', hand_jpeg(), {'Content-Type': 'image/jpeg'})
+    assert status == 429 and retry_after
+
+
+def test_expired_deadline():
+    headers = {'Content-Type': 'image/jpeg', backend.DEADLINE_HEADER: '0.001'}
+    assert assert_same('POST', '/detect-sign', hand_jpeg(), headers)[0] == 504
+
+
+def test_asgi_rejects_large_bodies():
+    bridge = AsgiBridge(backend.app, threads=1, max_body=1024)
+    headers = {'Content-Type': 'image/jpeg'}
+    # Announced by Content-Length, and noticed while a chunked upload arrives
+    assert asgi_request('POST', '/detect-sign', b'x' * 2048, headers, app=bridge)[0] == 413
+    assert asgi_request('POST', '/detect-sign', b'x' * 2048, headers, chunk_size=512, app=bridge)[0] == 413
+    assert bridge.stats()["rejected_too_large"] == 2
+
+
+def test_asgi_sheds_requests_beyond_its_pool(monkeypatch):
+    admission = AdmissionController(1, max_queue=1, queue_timeout=10)
+    monkeypatch.setattr(backend, 'admission', admission)
+    bridge = AsgiBridge(backend.app, threads=1, max_pending=1)
+    image = empty_jpeg()
+    headers = {'Content-Type': 'image/jpeg', 'Content-Length': str(len(image))}
+    held = admission.admit()
+
+    async def scenario():
+        # The first request waits in admission on the only pool thread, so the second is shed
+        first = asyncio.ensure_future(call_asgi(bridge, 'POST', '/detect-sign', [image], headers))
+        while bridge.stats()["pending"] == 0:
+            await asyncio.sleep(0.01)
+        second = await call_asgi(bridge, 'POST', '/detect-sign', [image], headers)
+        held.__exit__(None, None, None)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert first[0] == 200
+    assert second[0] == 429 and second[1]["retry-after"] == "1"
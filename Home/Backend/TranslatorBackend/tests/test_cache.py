@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip('cv2')
+from cache import PerceptualCache
+
+
+def compute(value, calls):
+    def run():
+        calls.append(value)
+        return value
+    return run
+
+
+def test_sessions_never_share_entries():
+    cache = PerceptualCache(max_entries=8)
+    calls = []
+    assert cache.get_or_compute(0b1010, compute('A', calls), scope='alice') == 'A'
+    assert cache.get_or_compute(0b1010, compute('S', calls), scope='bob') == 'S'
+    assert cache.get_or_compute(0b1010, compute('x', calls), scope='alice') == 'A'
+    assert calls == ['A', 'S']
+    assert cache.stats()["scopes"] == 2
+
+
+def test_default_tolerance_only_matches_equal_hashes():
+    cache = PerceptualCache(max_entries=8)
+    calls = []
+    cache.get_or_compute(0b1010, compute('A', calls), scope='alice')
+    # One bit apart, like two fist signs, is a different crop
+    assert cache.get_or_compute(0b1011, compute('E', calls), scope='alice') == 'E'
+
+    tolerant = PerceptualCache(max_entries=8, max_distance=1)
+    tolerant.get_or_compute(0b1010, compute('A', calls), scope='alice')
+    assert tolerant.get_or_compute(0b1011, compute('E', calls), scope='alice') == 'A'
+    assert tolerant.get_or_compute(0b1011, compute('E', calls), scope='bob') == 'E'
+
+
+def test_evictions_forget_empty_scopes():
+    cache = PerceptualCache(max_entries=1)
+    cache.get_or_compute(1, lambda: 'A', scope='alice')
+    cache.get_or_compute(2, lambda: 'B', scope='bob')
+    stats = cache.stats()
+    assert (stats["entries"], stats["scopes"], stats["evictions"]) == (1, 1, 1)
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from conftest import HAND_IMAGES
+from hands_pool import DetectorError, HandsPool, process_image
+
+
+class TrackedDetector:
+    """Wraps a detector and records how many threads ran process() on it at once"""
+
+    def __init__(self, detector=None, delay=0.0):
+        self.detector = detector
+        self.delay = delay
+        self.closed = False
+        self.max_users = 0
+        self._users = 0
+        self._lock = threading.Lock()
+
+    def process(self, image):
+        with self._lock:
+            self._users += 1
+            self.max_users = max(self.max_users, self._users)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            if self.detector is None:
+                if isinstance(image, str) and image == 'broken':
+                    raise ValueError("graph failed")
+                return image
+            return self.detector.process(image)
+        finally:
+            with self._lock:
+                self._users -= 1
+
+    def close(self):
+        self.closed = True
+        if self.detector is not None:
+            self.detector.close()
+
+
+def tracking_factory(create=None, delay=0.0):
+    created = []
+
+    def factory():
+        detector = TrackedDetector(create() if create else None, delay)
+        created.append(detector)
+        return detector
+    return factory, created
+
+
+def test_checkouts_never_share_a_detector():
+    factory, created = tracking_factory(delay=0.002)
+    pool = HandsPool(factory, size=4)
+
+    def request(index):
+        with pool.checkout() as detector:
+            return process_image(detector, index)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(request, range(400)))
+
+    assert results == list(range(400))
+    assert 1 <= len(created) <= 4
+    assert all(detector.max_users == 1 for detector in created)
+    stats = pool.stats()
+    assert stats["checkouts"] == 400
+    assert stats["available"] == stats["created"] == len(created)
+
+
+def test_request_errors_return_the_detector_to_the_pool():
+    factory, created = tracking_factory()
+    pool = HandsPool(factory, size=1)
+
+    with pytest.raises(KeyError):
+        with pool.checkout():
+            raise KeyError("bad batch item")
+
+    assert len(created) == 1 and not created[0].closed
+    assert pool.stats()["available"] == 1
+
+
+def test_detector_errors_replace_the_detector():
+    factory, created = tracking_factory()
+    pool = HandsPool(factory, size=1)
+
+    with pytest.raises(DetectorError):
+        with pool.checkout() as detector:
+            process_image(detector, 'broken')
+
+    assert created[0].closed
+    assert pool.stats()["created"] == 0
+    with pool.checkout() as detector:
+        assert process_image(detector, 'frame') == 'frame'
+    assert len(created) == 2
+
+
+def test_parallel_detection_matches_serial():
+    pytest.importorskip('mediapipe')
+    import cv2
+    import recognition
+
+    images = [cv2.imread(path) for path in HAND_IMAGES if os.path.exists(path)]
+    if not images:
+        pytest.skip("The repository's hand photos are missing")
+    # A frame without a hand, so both outcomes are compared
+    images.append(np.full((480, 640, 3), 90, dtype=np.uint8))
+
+    serial_detector = recognition.create_static_hands()
+    try:
+        expected = [recognition.detect_and_crop_hand(image, serial_detector) for image in images]
+    finally:
+        serial_detector.close()
+    assert any(detected for _, detected, _, _ in expected)
+
+    factory, created = tracking_factory(recognition.create_static_hands)
+    pool = HandsPool(factory, size=3)
+    jobs = [index % len(images) for index in range(8 * len(images))]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda index: recognition.detect_and_crop_hand(images[index], pool=pool), jobs))
+
+    for index, (box, detected, _, points) in zip(jobs, results):
+        expected_box, expected_detected, _, expected_points = expected[index]
+        assert detected == expected_detected
+        assert box == expected_box
+        if expected_points is None:
+            assert points is None
+        else:
+            np.testing.assert_allclose(points, expected_points, atol=1e-5)
+
+    assert 1 <= len(created) <= 3
+    assert all(detector.max_users == 1 for detector in created)
+    stats = pool.stats()
+    assert stats["checkouts"] == len(jobs)
+    assert stats["available"] == stats["created"] == len(created)
+    for detector in created:
+        detector.close()
@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip('flask')
+import backend
+from model_slot import ModelSlot
+
+
+class FakeModel:
+    def __init__(self, version):
+        self.version = version
+        self.in_flight = 0
+        self.retired = False
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def slot(monkeypatch):
+    slot = ModelSlot()
+    slot.swap(FakeModel('v1'))
+    monkeypatch.setattr(backend, 'model_slot', slot)
+    return slot
+
+
+def test_pinned_default_version_survives_a_reload(slot):
+    with backend.app.test_request_context('/detect-sign?model_version=v1'):
+        language, version = backend.resolve_model_key()
+    assert (language, version) == (backend.DEFAULT_LANGUAGE, None)
+
+    # A reload between resolving and pinning the model keeps the request on model_slot
+    slot.swap(FakeModel('v2'))
+    with backend.acquire_model(language, version) as served:
+        assert served is slot.current
+
+
+def test_unknown_versions_are_rejected(slot):
+    with backend.app.test_request_context('/detect-sign?model_version=v0'):
+        with pytest.raises(backend.UnknownModelError):
+            backend.resolve_model_key()
+
+
+def test_supported_signs_uses_the_resolved_key(slot):
+    response = backend.app.test_client().get('/supported-signs?model_version=v1')
+    assert response.status_code == 200
+    assert response.get_json()["symbols"] == backend.labels
+
+
+@pytest.mark.parametrize('body', ['[1, 2]', '"en"', '3', 'null'])
+def test_json_bodies_that_are_not_objects_are_bad_requests(slot, body):
+    client = backend.app.test_client()
+    response = client.post('/detect-sign', data=body, content_type='application/json')
+    assert response.status_code == 400
+    response = client.post('/detect-sign/batch', data=body, content_type='application/json')
+    assert response.status_code == 400
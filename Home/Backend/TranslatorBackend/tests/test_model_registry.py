@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from model_registry import ModelLoadError, ModelRegistry, ModelSpec
+
+
+class FakeModel:
+    load_seconds = 0.0
+    in_flight = 0
+    retired = False
+
+    def close(self):
+        pass
+
+
+class FlakyLoader:
+    """Fails the first `failures` loads, then succeeds"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self, spec):
+        self.calls += 1
+        try:
+            if self.calls <= self.failures:
+                raise ImportError("No module named 'tensorflow'")
+            return FakeModel()
+        finally:
+            self.done.set()
+
+
+def load_once(registry, loader):
+    loader.done.clear()
+    with registry.acquire('si') as served:
+        assert served is None
+    assert loader.done.wait(5)
+    # The loader thread records the outcome right after the loader returns
+    time.sleep(0.05)
+
+
+def test_failed_loads_are_not_retried_until_the_backoff_passes():
+    loader = FlakyLoader(failures=2)
+    registry = ModelRegistry(loader, memory_budget=1 << 30, retry_backoff=0.2, max_backoff=1.0)
+    registry.register(ModelSpec('si', 'v1', 'missing.h5', ['a', 'b']))
+
+    load_once(registry, loader)
+    for _ in range(5):
+        with pytest.raises(ModelLoadError, match="No module named 'tensorflow'") as error:
+            with registry.acquire('si'):
+                pass
+        assert error.value.retry_after >= 1
+    assert loader.calls == 1
+    assert registry.stats()["languages"]["si"]["v1"]["failures"] == 1
+
+    # The second failure doubles the backoff
+    time.sleep(0.25)
+    load_once(registry, loader)
+    with pytest.raises(ModelLoadError):
+        with registry.acquire('si'):
+            pass
+    time.sleep(0.25)
+    with pytest.raises(ModelLoadError):
+        with registry.acquire('si'):
+            pass
+    assert loader.calls == 2
+
+    time.sleep(0.2)
+    load_once(registry, loader)
+    with registry.acquire('si') as served:
+        assert isinstance(served, FakeModel)
+    stats = registry.stats()["languages"]["si"]["v1"]
+    assert stats["error"] is None and stats["failures"] == 0
+
+
+def test_requests_for_a_failed_model_get_its_error(monkeypatch):
+    pytest.importorskip('flask')
+    import backend
+
+    loader = FlakyLoader(failures=1)
+    registry = ModelRegistry(loader, memory_budget=1 << 30, retry_backoff=60)
+    registry.register(ModelSpec('si', 'v1', 'missing.h5', ['a', 'b']))
+    monkeypatch.setattr(backend, 'model_registry', registry)
+    load_once(registry, loader)
+
+    client = backend.app.test_client()
+    for url in ('/detect-sign?language=si', '/detect-sign/batch?language=si'):
+        response = client.post(url, data=b'frame', content_type='image/jpeg')
+        assert response.status_code == 503
+        assert "No module named 'tensorflow'" in response.get_json()["error"]
+        assert int(response.headers["Retry-After"]) > 1
+    assert loader.calls == 1
+
+
+def test_manifest_matches_the_scripts_preprocessing():
+    import os
+    from model_registry import load_manifest
+
+    manifest = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models.json')
+    specs, defaults = load_manifest(manifest)
+    assert sorted(defaults) == ['si', 'ta']
+    for spec in specs:
+        assert (spec.rgb, spec.normalization, spec.fit) == (True, 'unit', 'stretch')
+        assert len(spec.labels) == 10
+        assert os.path.isabs(spec.model_path)
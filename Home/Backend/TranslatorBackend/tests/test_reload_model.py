@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('flask')
+import backend
+from model_slot import ModelSlot
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, 'RELOAD_MODEL_DIR', str(tmp_path))
+    (tmp_path / 'next.onnx').write_bytes(b'')
+    return tmp_path
+
+
+def test_client_paths_are_rejected_without_a_model_dir(monkeypatch):
+    monkeypatch.setattr(backend, 'RELOAD_MODEL_DIR', '')
+    started = []
+    monkeypatch.setattr(backend, 'start_model_load', started.append)
+    response = backend.app.test_client().post('/reload-model', json={"model_path": "next.onnx"})
+    assert response.status_code == 400
+    assert started == []
+
+
+@pytest.mark.parametrize('model_path', ['../next.onnx', '/etc/passwd', '', 'sub/../../x.h5', ['next.onnx']])
+def test_paths_outside_the_model_dir_are_rejected(model_dir, monkeypatch, model_path):
+    started = []
+    monkeypatch.setattr(backend, 'start_model_load', started.append)
+    monkeypatch.setattr(backend, 'start_small_model_load', started.append)
+    client = backend.app.test_client()
+    for body in ({"model_path": model_path}, {"model_path": model_path, "tier": "small"}):
+        assert client.post('/reload-model', json=body).status_code == 400
+    assert started == []
+
+
+def test_symlinks_out_of_the_model_dir_are_rejected(model_dir, tmp_path_factory):
+    outside = tmp_path_factory.mktemp('outside') / 'evil.h5'
+    outside.write_bytes(b'')
+    os.symlink(outside, model_dir / 'link.h5')
+    assert backend.resolve_reload_path('link.h5') is None
+
+
+def test_files_in_the_model_dir_are_loaded(model_dir, monkeypatch):
+    started = []
+    monkeypatch.setattr(backend, 'start_model_load', lambda path=None: started.append(path) or True)
+    response = backend.app.test_client().post('/reload-model', json={"model_path": "next.onnx"})
+    assert response.status_code == 200
+    assert started == [os.path.join(os.path.realpath(model_dir), 'next.onnx')]
+
+
+class RecordingBackend:
+    """Stands in for the loaded model and remembers the backend it was loaded with"""
+    pixel_input = False
+    cache_hit = False
+
+    def __init__(self, kind):
+        self.name = kind
+
+    def predict(self, batch):
+        return np.full((len(batch), len(backend.labels)), 1.0 / len(backend.labels), dtype=np.float32)
+
+
+def test_reloaded_files_use_the_backend_for_their_extension(model_dir, monkeypatch):
+    loaded = []
+
+    def load_inference_backend(kind, model_path, **kwargs):
+        loaded.append((kind, model_path))
+        return RecordingBackend(kind)
+
+    monkeypatch.setattr(backend, 'INFERENCE_BACKEND', 'keras')
+    monkeypatch.setattr(backend, 'load_inference_backend', load_inference_backend)
+    monkeypatch.setattr(backend, 'model_slot', ModelSlot())
+    client = backend.app.test_client()
+    assert client.post('/reload-model', json={"model_path": "next.onnx"}).status_code == 200
+    # The load runs in the background and releases the lock when it is done
+    with backend.model_load_lock:
+        pass
+
+    assert loaded == [('onnx', os.path.join(os.path.realpath(model_dir), 'next.onnx'))]
+    assert client.get('/model-status').get_json()["backend"] == 'onnx'
+    backend.model_slot.current.scheduler.close()
+
+
+def test_files_of_unknown_type_are_rejected(model_dir, monkeypatch):
+    started = []
+    monkeypatch.setattr(backend, 'start_model_load', started.append)
+    (model_dir / 'next.bin').write_bytes(b'')
+    response = backend.app.test_client().post('/reload-model', json={"model_path": "next.bin"})
+    assert response.status_code == 400
+    assert started == []
@@ -0,0 +1,180 @@
+"""Train the hand landmark classifier served by /detect-sign/landmarks.
+
+Examples:
+    python train_landmark_model.py ~/datasets/asl_alphabet_train
+    python train_landmark_model.py ~/datasets/asl_alphabet_train --features landmarks.npz --epochs 80
+
+The dataset has the layout the image models were trained on: one folder of
+photos per sign, named after its label in recognition.labels (A ... Z, space,
+del, nothing). MediaPipe extracts the 21 hand landmarks of every photo with
+the detector settings the server uses. Photos without a hand are skipped,
+so `nothing` usually gets no samples; clients only send landmarks when
+their own tracker found a hand. The extracted landmarks are saved to
+--features and reused by later runs, so changing the model or training
+settings does not require running MediaPipe over the dataset again.
+
+Training data is doubled with mirrored hands (left and right) and extended
+with --augment randomly rotated and scaled copies. The model is a small MLP
+over landmark_features() with one output per label. It is saved as H5 and
+can be converted with convert_tflite.py or export_onnx.py.
+"""
+import argparse
+import json
+import logging
+import os
+
+import cv2
+import numpy as np
+
+import recognition
+from landmarks import FEATURE_SIZE, hand_landmarks_array, landmark_features
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def extract_landmarks(dataset_dir, max_per_class=0):
+    """Landmarks, frame aspect ratios and label indices of every photo with a hand"""
+    detector = recognition.create_static_hands()
+    points, aspects, targets = [], [], []
+    for folder in sorted(os.listdir(dataset_dir)):
+        path = os.path.join(dataset_dir, folder)
+        if not os.path.isdir(path):
+            continue
+        if folder not in recognition.labels:
+            logger.warning(f"Skipping folder '{folder}', it is not one of the served labels")
+            continue
+
+        files = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        if max_per_class:
+            files = files[:max_per_class]
+        found = 0
+        for name in files:
+            image = cv2.imread(os.path.join(path, name))
+            if image is None:
+                logger.warning(f"Could not read {os.path.join(path, name)}")
+                continue
+            results = detector.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            if not results.multi_hand_landmarks:
+                continue
+            points.append(hand_landmarks_array(results.multi_hand_landmarks[0]))
+            aspects.append(image.shape[1] / image.shape[0])
+            targets.append(recognition.labels.index(folder))
+            found += 1
+        logger.info(f"{folder}: hands in {found} of {len(files)} photos")
+
+    detector.close()
+    if not points:
+        raise SystemExit(f"No hands found in {dataset_dir}")
+    return np.stack(points), np.array(aspects, dtype=np.float32), np.array(targets)
+
+
+def mirror(points):
+    """The same hands seen mirrored, i.e. the other hand making the sign"""
+    mirrored = points.copy()
+    mirrored[..., 0] = 1.0 - mirrored[..., 0]
+    return mirrored
+
+
+def augment(features, rng, max_rotation=15, max_scale=0.1):
+    """Randomly rotate features in the image plane and scale them"""
+    points = features.reshape(-1, FEATURE_SIZE // 3, 3).copy()
+    angles = np.radians(rng.uniform(-max_rotation, max_rotation, len(points)))
+    cos, sin = np.cos(angles)[:, np.newaxis], np.sin(angles)[:, np.newaxis]
+    x, y = points[..., 0].copy(), points[..., 1].copy()
+    points[..., 0] = x * cos - y * sin
+    points[..., 1] = x * sin + y * cos
+    points *= rng.uniform(1 - max_scale, 1 + max_scale, (len(points), 1, 1))
+    return points.reshape(len(points), FEATURE_SIZE)
+
+
+def split(targets, validation, rng):
+    """Stratified train and validation indices"""
+    train, val = [], []
+    for label in np.unique(targets):
+        indices = rng.permutation(np.flatnonzero(targets == label))
+        count = int(round(len(indices) * validation)) if len(indices) > 1 else 0
+        val.extend(indices[:count])
+        train.extend(indices[count:])
+    return np.array(train), np.array(val)
+
+
+def build_model(num_classes):
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    model = keras.Sequential([
+        layers.Input(shape=(FEATURE_SIZE,)),
+        layers.Dense(128, activation='relu'),
+        layers.Dropout(0.3),
+        layers.Dense(64, activation='relu'),
+        layers.Dropout(0.3),
+        layers.Dense(num_classes, activation='softmax')
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the hand landmark sign classifier")
+    parser.add_argument('dataset', nargs='?', help="Folder with one sub-folder of photos per label")
+    parser.add_argument('--features', default='landmark_features.npz',
+                        help="Landmarks extracted from the dataset, reused when the file exists")
+    parser.add_argument('--max-per-class', type=int, default=0, help="Photos used per label (0: all)")
+    parser.add_argument('--output', default=recognition.LANDMARK_MODEL_PATH, help="Where to save the H5 model")
+    parser.add_argument('--epochs', type=int, default=60)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--validation', type=float, default=0.2, help="Share of each label held out")
+    parser.add_argument('--augment', type=int, default=4, help="Rotated and scaled copies of the training set")
+    parser.add_argument('--report', help="Write accuracy and sample counts to this JSON file")
+    args = parser.parse_args()
+
+    if os.path.exists(args.features):
+        logger.info(f"Using landmarks from {args.features}")
+        saved = np.load(args.features)
+        points, aspects, targets = saved['points'], saved['aspects'], saved['targets']
+    else:
+        if not args.dataset:
+            parser.error(f"{args.features} does not exist, pass the dataset folder to extract it")
+        points, aspects, targets = extract_landmarks(args.dataset, args.max_per_class)
+        np.savez_compressed(args.features, points=points, aspects=aspects, targets=targets)
+        logger.info(f"Saved {len(points)} hands to {args.features}")
+
+    rng = np.random.default_rng(42)
+    train, val = split(targets, args.validation, rng)
+    # Both hands of every training sample, plus randomly rotated and scaled copies
+    x_train = np.concatenate([landmark_features(points[train], aspects[train]),
+                              landmark_features(mirror(points[train]), aspects[train])])
+    x_train = np.concatenate([x_train] + [augment(x_train, rng) for _ in range(args.augment)])
+    y_train = np.tile(targets[train], 2 * (args.augment + 1))
+
+    from tensorflow import keras
+
+    model = build_model(len(recognition.labels))
+    callbacks = [keras.callbacks.ReduceLROnPlateau(monitor='loss', factor=0.5, patience=5)]
+    validation_data = None
+    if len(val):
+        validation_data = (landmark_features(points[val], aspects[val]), targets[val])
+        callbacks.append(keras.callbacks.EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True))
+
+    history = model.fit(x_train, y_train, batch_size=args.batch_size, epochs=args.epochs, shuffle=True,
+                        validation_data=validation_data, callbacks=callbacks, verbose=2)
+    epochs = len(history.history['loss'])
+    metrics = {key: float(values[-1]) for key, values in history.history.items()}
+    logger.info(f"Trained for {epochs} epochs: {metrics}")
+
+    model.save(args.output)
+    logger.info(f"Saved landmark model to {args.output}")
+
+    if args.report:
+        counts = {recognition.labels[label]: int((targets == label).sum()) for label in np.unique(targets)}
+        with open(args.report, 'w') as f:
+            json.dump({"samples": counts, "train": len(train), "validation": len(val),
+                       "epochs": epochs, "metrics": metrics}, f, indent=2)
+        logger.info(f"Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
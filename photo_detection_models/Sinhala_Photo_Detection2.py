@@ -4,14 +4,21 @@ import base64
 import time
 import logging
 import os
+import sys
 import traceback
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from cvzone.HandTrackingModule import HandDetector
-from cvzone.ClassificationModule import Classifier
 from PIL import Image, ImageDraw, ImageFont
 import io
 
+# Admission control is shared with the translator backend; its directory is
+# found from this file, so the script runs from any working directory. It is
+# appended so the backend's modules never shadow installed packages
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                              '..', 'Home', 'Backend', 'TranslatorBackend')))
+from admission import AdmissionController, Deadline, DeadlineExceeded, OverloadedError, DEADLINE_HEADER  # noqa: E402
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -20,10 +27,47 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})  # Enable CORS for all routes and origins
 
-# Custom classifier that forces the input size to our desired value
-class MyClassifier(Classifier):
+# ONNX Runtime threads for exported .onnx models (0 lets ONNX Runtime decide)
+ONNX_THREADS = int(os.environ.get('ONNX_THREADS', 0))
+
+# Admission control for /detect: the hand detector is shared, so by default one
+# request runs at a time and up to MAX_QUEUED_REQUESTS wait QUEUE_TIMEOUT_MS for
+# it; everything else gets 429. Clients may send X-Request-Deadline-Ms. The
+# limits are enforced by the translator backend's admission.py.
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', 1))
+MAX_QUEUED_REQUESTS = int(os.environ.get('MAX_QUEUED_REQUESTS', 8))
+QUEUE_TIMEOUT_MS = float(os.environ.get('QUEUE_TIMEOUT_MS', 1000))
+
+admission = AdmissionController(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT_MS / 1000.0)
+
+def expired_response(stage):
+    logger.info(f"Deadline exceeded before {stage}")
+    return jsonify({"error": "Request deadline exceeded"}), 504
+
+class OnnxModel:
+    """Keras-style predict() on top of an ONNX Runtime session"""
+    def __init__(self, modelPath, num_threads=0):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(modelPath, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, blob):
+        return self.session.run(None, {self.input_name: blob.astype(np.float32, copy=False)})[0]
+
+# Custom classifier that forces the input size to our desired value.
+# Keras .h5 models are loaded through cvzone; .onnx models exported with
+# Home/Backend/TranslatorBackend/export_onnx.py run on ONNX Runtime without
+# importing TensorFlow at all.
+class MyClassifier:
     def __init__(self, modelPath, input_size=200):
-        super().__init__(modelPath)
+        if modelPath.endswith('.onnx'):
+            self.model = OnnxModel(modelPath, num_threads=ONNX_THREADS)
+        else:
+            from cvzone.ClassificationModule import Classifier
+            self.model = Classifier(modelPath).model
         self.input_size = input_size
         logger.info(f"Classifier initialized with input size: {input_size}")
 
@@ -48,14 +92,14 @@ logger.info("Initializing hand detector...")
 detector = HandDetector(maxHands=2)
 
 # Load classifier model safely
-model_path = "../hand_gesture_model_sinhala.h5"
+model_path = os.environ.get('MODEL_PATH', "../hand_gesture_model_sinhala.h5")
 try:
     logger.info(f"Loading classifier model from: {model_path}")
     if not os.path.exists(model_path):
         logger.warning(f"Model file not found at {model_path}, searching in current directory...")
         # Try to find model in current directory
-        if os.path.exists("hand_gesture_model_sinhala.h5"):
-            model_path = "hand_gesture_model_sinhala.h5"
+        if os.path.exists(os.path.basename(model_path)):
+            model_path = os.path.basename(model_path)
             logger.info(f"Found model in current directory: {model_path}")
         else:
             logger.error("Model file not found!")
@@ -124,6 +168,18 @@ imgSize = 200
 
 @app.route('/detect', methods=['POST'])
 def detect_gesture():
+    """Run detection once a slot is free, shedding load when saturated"""
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
+    try:
+        with admission.admit(deadline):
+            return run_detection(deadline)
+    except OverloadedError as e:
+        logger.warning("Server is overloaded, shedding request")
+        return jsonify({"error": "Server is overloaded. Please try again later."}), 429, {"Retry-After": str(e.retry_after)}
+    except DeadlineExceeded as e:
+        return expired_response(e.stage)
+
+def run_detection(deadline):
     try:
         logger.info("Received detection request")
         
@@ -193,6 +249,11 @@ def detect_gesture():
                     imgResize = cv2.resize(imgCrop, (imgSize, imgSize))
                     imgWhite[:imgResize.shape[0], :imgResize.shape[1]] = imgResize
                 
+                    # Nobody is waiting for the answer any more, skip inference
+                    if deadline is not None and deadline.expired():
+                        admission.record_expired()
+                        return expired_response("predict")
+                    
                     # Get prediction
                     logger.info(f"Getting prediction for hand {i+1}")
                     prediction, index = classifier.getPrediction(imgWhite, draw=False)
@@ -251,7 +312,8 @@ def test():
     return jsonify({
         "status": "ok", 
         "message": "Python gesture detection service is running",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "admission": admission.stats()
     })
 
 @app.route('/api/message', methods=['GET'])